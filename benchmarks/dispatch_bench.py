@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+"""
+dispatch_bench.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Measure how many messages per second Bot.on_message gets through when most
+of them are ordinary chat, with and without the prefix pre-filter:
+
+    python -m benchmarks.dispatch_bench --messages 200000 --command-ratio 0.05
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import discord
+from discord.ext import commands
+
+from benchmarks.intents_bench import BOT_ID, GUILD_ID, guild_fixture, message, user
+from bot import Bot
+
+
+class Commands(commands.Cog):
+    """ Commands named like the real ones that do nothing, so only dispatch is measured """
+
+    def __init__(self):
+        self.invoked = 0
+
+    @commands.command(name="play")
+    async def play_command(self, ctx, *, query: str = None):
+        self.invoked += 1
+
+    @commands.command(name="skip", aliases=["next"])
+    async def skip_command(self, ctx):
+        self.invoked += 1
+
+    @commands.command(name="queue")
+    async def queue_command(self, ctx, page: int = 1):
+        self.invoked += 1
+
+
+async def original_process_commands(bot, msg):
+    """ Bot.process_commands before the pre-filter """
+    ctx = await bot.get_context(msg, cls=commands.Context)
+
+    if ctx.command is not None:
+        await bot.invoke(ctx)
+
+
+def make_messages(state, count, ratio):
+    channel = state._get_guild(GUILD_ID).text_channels[0]
+    chat = ["lol", "anyone up for a game tonight?", "!!!", "brb", "that song slaps", "what's the homework",
+            "!not a command", "ok"]
+    cmds = ["!play never gonna give you up", "!skip", "!QUEUE 2", "!next"]
+
+    msgs = []
+    for i in range(count):
+        data = message(i, 1)
+        data["channel_id"] = str(channel.id)
+        data["content"] = random.choice(cmds) if random.random() < ratio else random.choice(chat)
+        msgs.append(discord.Message(state=state, channel=channel, data=data))
+
+    return msgs
+
+
+async def run(args):
+    bot = Bot(name="Bench", email=None, passwd=None, token=None, profile="minimal-music")
+    state = bot._connection
+    state._chunk_guilds = False
+    state.user = state.store_user({**user(-1), "id": str(BOT_ID), "bot": True})
+    state.parse_guild_create(guild_fixture(10, 1))
+
+    cog = Commands()
+    bot.add_cog(cog)
+    msgs = make_messages(state, args.messages, args.command_ratio)
+
+    print(f"{args.messages} messages, {args.command_ratio:.0%} commands\n")
+
+    for name, handler in (("get_context for everything", original_process_commands),
+                          ("prefix pre-filter", Bot.process_commands)):
+        cog.invoked = 0
+        start = time.perf_counter()
+        for msg in msgs:
+            if not msg.author.bot:
+                await handler(bot, msg)
+        took = time.perf_counter() - start
+
+        print(f"{name:28} {len(msgs) / took:12,.0f} msg/s   ({cog.invoked} commands invoked)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message dispatch through Bot.on_message")
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--command-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=9616)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+
+if __name__ == "__main__":
+    main()
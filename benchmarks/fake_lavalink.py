@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+
+"""
+fake_lavalink.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+A small stand-in for a Lavalink v3 server. It answers loadtracks and
+decodetrack, sends stats, and plays tracks by sending TrackStart/TrackEnd
+events on a timer, which is enough to drive wavelink without Java or
+YouTube. Track strings are in lavaplayer's format and sessions can be
+resumed with configureResuming. Start a few of them to try out multi-node
+placement and failover:
+
+    python -m benchmarks.fake_lavalink --port 2333 --port 2334 --load 0.5
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import struct
+from collections import Counter
+
+from aiohttp import web
+
+from bot.snapshots import decode_track as read_track
+
+PASSWORD = "youshallnotpass"
+
+
+def _utf(text):
+    data = text.encode()
+    return struct.pack(">H", len(data)) + data
+
+
+def encode_track(info):
+    """ Encode track info the way lavaplayer does (track info version 2) """
+    body = (bytes([2]) + _utf(info["title"]) + _utf(info["author"]) + struct.pack(">q", info["length"])
+            + _utf(info["identifier"]) + bytes([info["isStream"]]) + b"\x01" + _utf(info["uri"])
+            + _utf("youtube") + struct.pack(">q", 0))
+    return base64.b64encode(struct.pack(">I", len(body) | 1 << 30) + body).decode()
+
+
+def make_track(identifier, title=None, length=180000):
+    info = {
+        "identifier": identifier,
+        "isSeekable": True,
+        "author": "Fake Lavalink",
+        "length": length,
+        "isStream": False,
+        "position": 0,
+        "title": title or f"Track {identifier}",
+        "uri": f"https://www.youtube.com/watch?v={identifier}"
+    }
+    return {"track": encode_track(info), "info": info}
+
+
+def decode_track(track):
+    return {**read_track(track), "position": 0}
+
+
+class Session:
+    """ One bot connection. If the bot asked for resuming, the session's
+        players keep going for timeout seconds after it disconnects """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.key = None
+        self.timeout = 60
+        self.expiry = None
+
+
+class FakePlayer:
+    def __init__(self, session, track, start):
+        self.session = session
+        self.track = track
+        self.start = start
+        self.started = None
+        self.task = None
+
+    def position(self, now):
+        return self.start if self.started is None else self.start + int((now - self.started) * 1000)
+
+
+class FakeNode:
+    """ One fake lavalink server """
+
+    def __init__(self, port, host="127.0.0.1", load=0.0, track_length=180000, playlist_size=300,
+                 search_delay=0.0, stats_interval=1.0, load_delay=0, page_delay=0.0):
+        self.host = host
+        self.port = port
+        self.load = load
+        self.track_length = track_length
+        self.playlist_size = playlist_size
+        self.search_delay = search_delay
+        self.page_delay = page_delay
+        self.load_delay = load_delay
+        self.stats_interval = stats_interval
+        self.sockets = set()
+        self.players = {}
+        self.requests = 0
+        self.resumes = 0
+        self.ops = Counter()
+        self._resumable = {}
+        self.gaps = []
+        self.cuts = []
+        self._natural_end = {}
+        self._audio_end = {}
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_get("/", self.websocket)
+        self.app.router.add_get("/loadtracks", self.load_tracks)
+        self.app.router.add_get("/decodetrack", self.decode_track)
+        self.app.router.add_get("/version", self.version)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        for ws in list(self.sockets):
+            await ws.close()
+        for player in self.players.values():
+            player.task.cancel()
+
+        await self._runner.cleanup()
+
+    def _authorized(self, request):
+        return request.headers.get("Authorization") == PASSWORD
+
+    async def version(self, request):
+        return web.Response(text="3.4-fake")
+
+    async def load_tracks(self, request):
+        if not self._authorized(request):
+            return web.Response(status=401)
+
+        self.requests += 1
+        if self.search_delay:
+            await asyncio.sleep(self.search_delay)
+
+        identifier = request.query.get("identifier", "")
+
+        if "list=" in identifier:
+            # Lavalink fetches a playlist 100 tracks at a time and only answers once it has every page
+            await asyncio.sleep(self.page_delay * -(-self.playlist_size // 100))
+            tracks = [make_track(f"pl{i:09d}", length=self.track_length) for i in range(self.playlist_size)]
+            return web.json_response({
+                "loadType": "PLAYLIST_LOADED",
+                "playlistInfo": {"name": "Fake playlist", "selectedTrack": -1},
+                "tracks": tracks
+            })
+
+        if identifier.startswith("ytsearch:"):
+            terms = identifier[len("ytsearch:"):]
+            tracks = [make_track(f"s{abs(hash((terms, i))) % 10 ** 10:010d}", f"{terms} ({i + 1})",
+                                 self.track_length) for i in range(5)]
+            return web.json_response({"loadType": "SEARCH_RESULT", "playlistInfo": {}, "tracks": tracks})
+
+        return web.json_response({
+            "loadType": "TRACK_LOADED",
+            "playlistInfo": {},
+            "tracks": [make_track(identifier[-11:] or "unknown0000", length=self.track_length)]
+        })
+
+    async def decode_track(self, request):
+        if not self._authorized(request):
+            return web.json_response({"status": 401, "error": "Unauthorized"}, status=401)
+
+        return web.json_response(decode_track(request.query["track"]))
+
+    async def websocket(self, request):
+        if not self._authorized(request):
+            return web.Response(status=401)
+
+        loop = asyncio.get_event_loop()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        stats = loop.create_task(self._send_stats(ws))
+
+        if (session := self._resumable.pop(request.headers.get("Resume-Key"), None)) is not None:
+            # Like lavalink, tell the bot where each of its players is straight away
+            session.expiry.cancel()
+            session.ws = ws
+            self.resumes += 1
+            for guild_id, player in list(self.players.items()):
+                if player.session is session:
+                    await ws.send_json({"op": "playerUpdate", "guildId": guild_id,
+                                        "state": {"time": 0, "position": player.position(loop.time())}})
+        else:
+            session = Session(ws)
+
+        try:
+            async for msg in ws:
+                await self._handle(session, json.loads(msg.data))
+        finally:
+            stats.cancel()
+            self.sockets.discard(ws)
+
+            if session.ws is ws:
+                if session.key is not None:
+                    self._resumable[session.key] = session
+                    session.expiry = loop.call_later(session.timeout, self._expire, session)
+                else:
+                    self._expire(session)
+
+        return ws
+
+    def _expire(self, session):
+        """ Destroy a session's players once nobody can resume it """
+        self._resumable.pop(session.key, None)
+        for guild_id, player in list(self.players.items()):
+            if player.session is session:
+                self._end(guild_id)
+
+    async def _send_stats(self, ws):
+        while not ws.closed:
+            await ws.send_json({
+                "op": "stats",
+                "players": len(self.players),
+                "playingPlayers": len(self.players),
+                "uptime": 0,
+                "memory": {"free": 0, "used": 0, "allocated": 0, "reservable": 0},
+                "cpu": {"cores": 4, "systemLoad": self.load, "lavalinkLoad": self.load},
+                "frameStats": {"sent": 3000, "nulled": 0, "deficit": int(self.load * 300)}
+            })
+            await asyncio.sleep(self.stats_interval)
+
+    async def _handle(self, session, data):
+        guild_id = data.get("guildId")
+        now = asyncio.get_event_loop().time()
+        self.ops[data["op"]] += 1
+
+        if data["op"] == "configureResuming":
+            session.key = data.get("key")
+            session.timeout = data.get("timeout", 60)
+
+        elif data["op"] == "play":
+            if data.get("noReplace") and guild_id in self.players:
+                return
+
+            if (replaced := self._end(guild_id)) is not None:
+                self.cuts.append(max(0.0, self._natural_end.pop(guild_id, now) - now))
+                self._audio_end[guild_id] = now
+                await self._event(session, guild_id, "TrackEndEvent", track=replaced, reason="REPLACED")
+
+            player = self.players[guild_id] = FakePlayer(session, data["track"], int(data.get("startTime") or 0))
+            player.task = asyncio.get_event_loop().create_task(self._play(guild_id, player))
+
+        elif data["op"] in ("stop", "destroy"):
+            if (stopped := self._end(guild_id)) is not None:
+                self._audio_end[guild_id] = now
+                await self._event(session, guild_id, "TrackEndEvent", track=stopped, reason="STOPPED")
+
+            if data["op"] == "destroy":
+                self._audio_end.pop(guild_id, None)
+
+    def _end(self, guild_id):
+        """ Stop the guild's track, returning it if there was one """
+        if (player := self.players.pop(guild_id, None)) is not None:
+            player.task.cancel()
+            return player.track
+
+        return None
+
+    async def _play(self, guild_id, player):
+        loop = asyncio.get_event_loop()
+        track, start = player.track, player.start
+        length = decode_track(track).get("length", self.track_length)
+
+        if self.load_delay:
+            await asyncio.sleep(self.load_delay / 1000)
+
+        # Silence since the guild's last track stopped. A play long after that is someone
+        # queueing something new rather than a transition between tracks
+        if (ended := self._audio_end.pop(guild_id, None)) is not None and loop.time() - ended < 5:
+            self.gaps.append(loop.time() - ended)
+
+        player.started = loop.time()
+        self._natural_end[guild_id] = loop.time() + max(0, length - start) / 1000
+        await self._event(player.session, guild_id, "TrackStartEvent", track=track)
+        await self._send(player.session, {"op": "playerUpdate", "guildId": guild_id,
+                                          "state": {"time": 0, "position": start}})
+        await asyncio.sleep(max(0, length - start) / 1000)
+
+        self.players.pop(guild_id, None)
+        self._natural_end.pop(guild_id, None)
+        self._audio_end[guild_id] = loop.time()
+        await self._event(player.session, guild_id, "TrackEndEvent", track=track, reason="FINISHED")
+
+    async def _event(self, session, guild_id, kind, **data):
+        await self._send(session, {"op": "event", "type": kind, "guildId": guild_id, **data})
+
+    @staticmethod
+    async def _send(session, data):
+        # Lavalink queues these for a session that's waiting to be resumed; they're dropped here
+        if not session.ws.closed:
+            try:
+                await session.ws.send_json(data)
+            except ConnectionResetError:
+                pass
+
+
+async def serve(args):
+    nodes = [FakeNode(port, load=args.load, track_length=args.track_length, load_delay=args.load_delay)
+             for port in args.port]
+
+    for node in nodes:
+        await node.start()
+        print(f"Fake lavalink listening on {node.host}:{node.port}")
+
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one or more fake lavalink servers")
+    parser.add_argument("--port", type=int, action="append", help="port to listen on (repeatable)")
+    parser.add_argument("--load", type=float, default=0.0, help="systemLoad reported in stats (0-1)")
+    parser.add_argument("--track-length", type=int, default=180000, help="length of every track in ms")
+    parser.add_argument("--load-delay", type=int, default=0, help="ms taken to load a track before it starts")
+    args = parser.parse_args()
+    args.port = args.port or [2333]
+
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
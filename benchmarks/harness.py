@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+
+"""
+harness.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Run the real Bot and Music cog against a fake Discord gateway, a fake
+Discord REST API and the fake lavalink node, with no network access or
+tokens. Synthetic guilds are created with GUILD_CREATE, a listener joins
+voice in each one and then sends a script of commands, and the tracks
+they queue are left to play out. Reports commands per second, command
+latency, the silence between one track ending and the next starting
+and memory per guild:
+
+    python -m benchmarks.harness --guilds 500 --rounds 3
+"""
+
+import argparse
+import asyncio
+import gc
+import statistics
+import time
+from collections import Counter, defaultdict, deque
+
+import discord
+
+from benchmarks.fake_lavalink import FakeNode, PASSWORD
+from benchmarks.intents_bench import BOT_ID, GUILD_ID, message, rss_kib, user
+from bot import Bot
+
+SCRIPT = [
+    "!play https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "!play https://youtu.be/y6120QOlsfU",
+    "!queue",
+    "!play never gonna give you up",
+    "!play https://www.youtube.com/watch?v=9bZkp7q19f0",
+    "!skip",
+    "!queue",
+    "!shuffle"
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def guild_data(index):
+    guild_id = GUILD_ID + (index << 22)
+    return {
+        "id": str(guild_id),
+        "name": f"Synthetic guild {index}",
+        "owner_id": user(index)["id"],
+        "region": "us-west",
+        "member_count": 1,
+        "large": False,
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "104324673", "position": 0,
+                   "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+        "emojis": [],
+        "features": [],
+        "channels": [
+            {"id": str(guild_id + 1), "type": 0, "name": "general", "position": 0, "permission_overwrites": []},
+            {"id": str(guild_id + 2), "type": 2, "name": "music", "position": 1, "bitrate": 64000,
+             "user_limit": 0, "permission_overwrites": []}
+        ],
+        "members": [],
+        "presences": [],
+        "voice_states": []
+    }
+
+
+def voice_state(guild_id, user_data, channel_id, session_id):
+    return {
+        "guild_id": str(guild_id),
+        "channel_id": None if channel_id is None else str(channel_id),
+        "user_id": user_data["id"],
+        "member": {"user": user_data, "roles": [], "joined_at": "2021-07-12T00:00:00+00:00", "deaf": False,
+                   "mute": False},
+        "session_id": session_id,
+        "deaf": False,
+        "mute": False,
+        "self_deaf": False,
+        "self_mute": False,
+        "suppress": False
+    }
+
+
+class FakeGateway:
+    """ Stands in for a shard's websocket. Voice connections are answered the
+        way Discord would, with a voice state and a voice server update """
+
+    latency = 0.0
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.voice_requests = 0
+
+    async def voice_state(self, guild_id, channel_id, self_mute=False, self_deaf=False):
+        self.voice_requests += 1
+        state = voice_state(guild_id, {"id": str(BOT_ID)}, channel_id, f"session-{guild_id}")
+        del state["member"]
+
+        self.bot.dispatch("socket_response", {"t": "VOICE_STATE_UPDATE", "d": state})
+        self.bot.dispatch("socket_response", {"t": "VOICE_SERVER_UPDATE", "d": {
+            "guild_id": str(guild_id), "token": "fake", "endpoint": "us-west.discord.invalid"
+        }})
+
+
+class FakeShard:
+    def __init__(self, shard_id, ws):
+        self.id = shard_id
+        self.ws = ws
+
+
+class FakeHTTP:
+    """ Replaces HTTPClient.request. Sent messages get a plausible payload
+        back, and song choices are replied to as soon as they're sent """
+
+    def __init__(self, harness, latency=0.0, channel_limit=None, channel_period=5.0):
+        self.harness = harness
+        self.latency = latency
+        self.channel_limit = channel_limit
+        self.channel_period = channel_period
+        self.calls = Counter()
+        self._sent = defaultdict(deque)
+        self._ids = iter(range(GUILD_ID + 10 ** 9, GUILD_ID + 10 ** 12))
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        self.calls[f"{route.method} {route.path}"] += 1
+
+        # Like discord.py, hold the route's lock for the request and until a spent rate limit resets
+        locks = self.harness.bot.http._locks
+        if (lock := locks.get(route.bucket)) is None:
+            lock = locks[route.bucket] = asyncio.Lock()
+
+        async with lock:
+            if self.channel_limit and route.method == "POST":
+                await self.rate_limit(route.bucket)
+            if self.latency:
+                await asyncio.sleep(self.latency)
+
+        if route.method == "POST" and route.path == "/channels/{channel_id}/messages":
+            return self.message(int(route.channel_id), kwargs.get("json") or {})
+
+        return None
+
+    async def rate_limit(self, bucket):
+        """ Discord lets a bot send channel_limit messages to a channel every channel_period seconds """
+        loop = asyncio.get_event_loop()
+        sent = self._sent[bucket]
+
+        while sent and sent[0] <= loop.time() - self.channel_period:
+            sent.popleft()
+        if len(sent) >= self.channel_limit:
+            await asyncio.sleep(sent.popleft() + self.channel_period - loop.time())
+
+        sent.append(loop.time())
+
+    def message(self, channel_id, payload):
+        data = message(0, 1)
+        data.update({
+            "id": str(next(self._ids)),
+            "channel_id": str(channel_id),
+            "guild_id": str(channel_id - 1),
+            "author": {**user(-1), "id": str(BOT_ID), "bot": True},
+            "content": payload.get("content") or "",
+            "embeds": [payload["embed"]] if payload.get("embed") else []
+        })
+        del data["member"]
+
+        if data["embeds"] and data["embeds"][0].get("title") == "Choose a song:":
+            self.harness.reply(channel_id, "1")
+
+        return data
+
+
+class Harness:
+    def __init__(self, guilds, port=2399, track_length=2000, rest_latency=0.0, think_time=0.0, load_delay=0,
+                 transition_lead=0.05, node=None, snapshot_path=None, channel_limit=None, outbox_window=0.5,
+                 history_path=None):
+        self.guild_count = guilds
+        self.node = node or FakeNode(port, track_length=track_length, stats_interval=1.0, load_delay=load_delay)
+        port = self.node.port
+        self.bot = Bot(name="Bench", email=None, passwd=None, token=None, profile="minimal-music", shard_count=1,
+                       transition_lead=transition_lead, snapshot_path=snapshot_path, outbox_window=outbox_window,
+                       history_path=history_path,
+                       nodes={"BENCH": {"host": "127.0.0.1", "port": port, "rest_uri": f"http://127.0.0.1:{port}",
+                                        "password": PASSWORD, "identifier": "BENCH", "region": "us_west"}})
+        self.state = self.bot._connection
+        self.gateway = FakeGateway(self.bot)
+        self.http = FakeHTTP(self, rest_latency, channel_limit)
+        self.think_time = think_time
+        self.latencies = []
+        self._message_ids = iter(range(GUILD_ID + 10 ** 12, GUILD_ID + 10 ** 13))
+
+        self.bot.http.request = self.http.request
+        self.bot._AutoShardedClient__shards[0] = FakeShard(0, self.gateway)
+        self.state._chunk_guilds = False
+        self.state.user = self.state.store_user({**user(-1), "id": str(BOT_ID), "bot": True})
+
+    @property
+    def music(self):
+        return self.bot.get_cog("Music")
+
+    async def start(self, start_node=True):
+        if start_node:
+            await self.node.start()
+
+        self.bot.load_extension("bot.cogs.Music")
+        self.bot._ready.set()
+
+        while not self.music.nodes.available:
+            await asyncio.sleep(0.01)
+
+    async def stop(self):
+        self.music.cog_unload()
+        for node in list(self.music.wavelink.nodes.values()):
+            await node.destroy()
+
+        await self.music.wavelink.session.close()
+        await self.node.stop()
+
+    async def crash(self):
+        """ Drop everything without telling lavalink, like a killed process would """
+        music = self.music
+        music.nodes.cancel()
+        if music._snapshot_task is not None:
+            music._snapshot_task.cancel()
+
+        for player in music.wavelink.players.values():
+            player._cancel_transition()
+        for node in music.wavelink.nodes.values():
+            node._websocket._task.cancel()
+
+        await music.wavelink.session.close()
+        music.snapshots.close()
+
+    def create_guilds(self):
+        for i in range(self.guild_count):
+            self.state.parse_guild_create(guild_data(i))
+            guild_id = GUILD_ID + (i << 22)
+            self.state.parse_voice_state_update(voice_state(guild_id, user(i), guild_id + 2, str(i)))
+
+    def reply(self, channel_id, content):
+        """ The listener answers the song choice think_time after it's sent """
+        def send():
+            channel = self.bot.get_channel(channel_id)
+            data = message((channel_id - 1 - GUILD_ID) >> 22, 1)
+            data.update({"id": str(next(self._message_ids)), "channel_id": str(channel_id),
+                         "guild_id": str(channel_id - 1), "content": content})
+            self.bot.dispatch("message", discord.Message(state=self.state, channel=channel, data=data))
+
+        # choose_track starts waiting as soon as the embed request returns
+        self.bot.loop.call_later(self.think_time, send)
+
+    async def command(self, index, content):
+        guild_id = GUILD_ID + (index << 22)
+        channel = self.bot.get_channel(guild_id + 1)
+        data = message(index, 1)
+        data.update({"id": str(next(self._message_ids)), "channel_id": str(channel.id), "guild_id": str(guild_id),
+                     "content": content})
+        msg = discord.Message(state=self.state, channel=channel, data=data)
+
+        start = time.perf_counter()
+        await self.bot.on_message(msg)
+        self.latencies.append(time.perf_counter() - start)
+
+    async def run_script(self, index, rounds):
+        for _ in range(rounds):
+            for content in SCRIPT:
+                await self.command(index, content)
+
+
+async def run(args):
+    harness = Harness(args.guilds, port=args.port, track_length=args.track_length,
+                      rest_latency=args.rest_latency / 1000, think_time=args.think_time / 1000,
+                      load_delay=args.load_delay, transition_lead=None if args.lead < 0 else args.lead / 1000,
+                      channel_limit=args.channel_limit, outbox_window=args.outbox_window / 1000)
+    await harness.start()
+
+    gc.collect()
+    before = rss_kib()
+    harness.create_guilds()
+    gc.collect()
+    guild_kib = (rss_kib() - before) / args.guilds
+
+    start = time.perf_counter()
+    await asyncio.gather(*(harness.run_script(i, args.rounds) for i in range(args.guilds)))
+    took = time.perf_counter() - start
+
+    gc.collect()
+    player_kib = (rss_kib() - before) / args.guilds - guild_kib
+    commands_sent = len(harness.latencies)
+
+    # Let the queued tracks play out so there are natural track ends to measure
+    await asyncio.sleep(args.track_length / 1000 * args.play_tracks + 0.5)
+    gaps, cuts = harness.node.gaps, harness.node.cuts
+
+    print(f"{args.guilds} guilds, {commands_sent} commands, {args.rest_latency:g} ms fake REST latency\n")
+    print(f"commands/s              {commands_sent / took:10,.0f}")
+    print(f"command latency p50     {percentile(harness.latencies, 50) * 1000:10.2f} ms")
+    print(f"command latency p99     {percentile(harness.latencies, 99) * 1000:10.2f} ms")
+    print(f"transition gap p50      {percentile(gaps, 50) * 1000:10.2f} ms   ({len(gaps)} transitions)")
+    print(f"transition gap p99      {percentile(gaps, 99) * 1000:10.2f} ms")
+    print(f"transition gap mean     {statistics.fmean(gaps) * 1000 if gaps else float('nan'):10.2f} ms")
+    print(f"track end cut off mean  {statistics.fmean(cuts) * 1000 if cuts else 0.0:10.2f} ms   "
+          f"({len(cuts)} tracks replaced before they ended)")
+    print(f"memory per guild        {guild_kib:10.2f} KiB   (+{player_kib:.2f} KiB with a player and queue)")
+    print(f"lavalink searches       {harness.node.requests:10d}")
+    print(f"voice connects          {harness.gateway.voice_requests:10d}")
+    choices = harness.music.track_choices._counts.get(("chosen",))
+    if choices is not None:
+        music = harness.music
+        print(f"song choices            {sum(choices):10d}   "
+              f"{music.track_choices._sums['chosen',] / sum(choices) * 1000:.1f} ms to choose, "
+              f"{music.choice_requests._sums['chosen',] / sum(choices):.1f} REST calls each")
+    outbox = harness.bot.outbox
+    print(f"replies sent            {sum(outbox.queued._values.values()):10.0f}   "
+          f"in {sum(outbox.sent._values.values()):.0f} messages")
+    for kind in ("urgent", "plain"):
+        if (count := outbox.sent._values.get((kind,))):
+            print(f"{kind + ' reply delay':24}{outbox.delay._sums[kind,] / sum(outbox.delay._counts[kind,]) * 1000:10.2f} ms"
+                  f"   (mean)")
+    print("\nREST calls")
+    for call, count in harness.http.calls.most_common():
+        print(f"  {count:8d}  {call}")
+
+    await harness.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the bot end to end against fake Discord and lavalink")
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=2, help="times each guild runs the command script")
+    parser.add_argument("--port", type=int, default=2399, help="port for the fake lavalink node")
+    parser.add_argument("--track-length", type=int, default=1000, help="length of every fake track in ms")
+    parser.add_argument("--play-tracks", type=int, default=3, help="tracks to let play out after the commands")
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="added to every fake REST call, in ms")
+    parser.add_argument("--think-time", type=float, default=0.0, help="ms before the listener picks a song")
+    parser.add_argument("--load-delay", type=int, default=50, help="ms the fake node takes to load a track")
+    parser.add_argument("--lead", type=float, default=50, help="ms before a track ends to start the next one, "
+                                                                 "or -1 to wait for lavalink's TrackEnd")
+    parser.add_argument("--channel-limit", type=int, default=None,
+                        help="messages each channel accepts every 5 seconds, like Discord's limit of 5")
+    parser.add_argument("--outbox-window", type=float, default=500, help="ms within which replies are merged")
+    args = parser.parse_args()
+
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+history_bench.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Fill a play history with made up plays spread over many guilds, plus one
+guild that has played far more than the rest, then measure writing plays,
+loading a guild's title index and looking searches up in it. Half the
+searches are for titles the guild has played, typed loosely, and half for
+titles it hasn't:
+
+    python -m benchmarks.history_bench --rows 300000 --guilds 1000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.harness import percentile
+from bot.history import PlayHistory
+
+WORDS = ("love", "night", "dance", "heart", "fire", "summer", "dream", "blue", "city", "light", "rain", "gold",
+         "wild", "young", "forever", "home", "road", "star", "time", "river", "shadow", "electric", "paradise",
+         "midnight", "stranger", "lonely", "crazy", "sweet", "broken", "ocean", "thunder", "glass", "echo")
+SUFFIXES = ("", " (Official Video)", " (Lyrics)", " [Official Audio]", " (Live)", " - Remastered 2011")
+SYLLABLES = ("ka", "lo", "mi", "ra", "ten", "vo", "shi", "an", "bel", "dor", "e", "fin", "gra", "hu", "jo", "ne",
+             "pa", "qui", "sol", "tu", "ur", "za", "mar", "ly", "so", "ri", "den", "ko")
+
+
+def vocabulary(rng, size):
+    """ The common words above followed by size made up ones, so titles aren't all built from a few words """
+    words = list(WORDS)
+    while len(words) < len(WORDS) + size:
+        words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+
+    return words
+
+
+class FakeTrack:
+    def __init__(self, number, rng, words, artists):
+        # Word popularity falls off like it does in real titles, the first few words turn up everywhere
+        chosen = {words[min(len(words) - 1, int(rng.paretovariate(0.5)) - 1)] for _ in range(rng.randint(2, 4))}
+        self.id = f"QAAA{number:012d}"
+        self.title = f"{rng.choice(artists)} - {' '.join(chosen).title()}{rng.choice(SUFFIXES)}"
+        self.length = rng.randint(120_000, 400_000)
+        self.uri = f"https://www.youtube.com/watch?v={number:011d}"
+
+
+def song(title):
+    """ The title without the suffix, the same song for anyone searching for it """
+    return title.split(" (")[0].split(" [")[0].split(" - Remastered")[0]
+
+
+def loosely(title, rng):
+    """ What someone might type to find a title: lower case, without the suffix, maybe a typo """
+    words = song(title).replace(" -", "").lower().split()
+    if rng.random() < 0.5:
+        i = rng.randrange(len(words))
+        if len(words[i]) > 4:
+            words[i] = words[i][:-1]
+
+    return " ".join(words)
+
+
+def fill(history, rows, guilds, big_guild_rows, rng):
+    """ Record rows plays, big_guild_rows of them in guild 0, each guild drawing from its own few favourites """
+    words = vocabulary(rng, 5000)
+    artists = [" ".join(rng.sample(words[len(WORDS):], rng.randint(1, 2))).title() for _ in range(3000)]
+    tracks = [FakeTrack(n, rng, words, artists) for n in range(rows // 2)]
+    played = {}
+    start = time.perf_counter()
+
+    for n in range(rows):
+        guild_id = 0 if n < big_guild_rows else 1 + n % guilds
+        track = rng.choice(tracks) if guild_id == 0 else tracks[(guild_id * 97 + rng.randrange(rows // guilds))
+                                                                  % len(tracks)]
+        history.record(guild_id, track)
+        played.setdefault(guild_id, {})[track.id] = track
+
+        if len(history._unsaved) >= 5000:
+            history.write(history.take())
+
+    history.write(history.take())
+    return played, tracks, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark play history writes and title lookups")
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--big-guild", type=int, default=50_000, help="Plays recorded in the busiest guild")
+    parser.add_argument("--searches", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = PlayHistory(os.path.join(tmp, "history.db"))
+        played, tracks, took = fill(history, args.rows, args.guilds, args.big_guild, rng)
+        size = os.path.getsize(os.path.join(tmp, "history.db"))
+        print(f"recorded and wrote {args.rows} plays in {took:.2f} s ({took / args.rows * 1e6:.1f} µs per play), "
+              f"database {size / 2 ** 20:.1f} MiB")
+
+        for guild_id, name in ((0, "busiest guild"), (1, "typical guild")):
+            start = time.perf_counter()
+            index = history.set_index(guild_id, history.read_guild(guild_id))
+            loaded = time.perf_counter() - start
+            print(f"{name}: {len(index)} tracks, index loaded in {loaded * 1000:.1f} ms")
+
+            # Only the guild's most played tracks are indexed
+            known = [t for t in played[guild_id].values() if t.id in index.tracks]
+            unknown = [t for t in rng.sample(tracks, min(len(tracks), 5000)) if t.id not in played[guild_id]]
+            results = {"played": [], "not played": []}
+            found_song = other_song = 0
+
+            for n in range(args.searches):
+                kind = "played" if n % 2 == 0 else "not played"
+                track = rng.choice(known if kind == "played" else unknown)
+                start = time.perf_counter()
+                found = index.search(loosely(track.title, rng))
+                results[kind].append(time.perf_counter() - start)
+
+                if found is not None and song(found.title) == song(track.title):
+                    found_song += 1
+                elif found is not None:
+                    other_song += 1
+
+            for kind, times in results.items():
+                print(f"  {kind:11} search p50 {percentile(times, 50) * 1e6:7.0f} µs  "
+                      f"p99 {percentile(times, 99) * 1e6:7.0f} µs")
+            print(f"  searches answered with the song searched for {found_song}/{args.searches}, "
+                  f"with a different song {other_song}/{args.searches}")
+
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
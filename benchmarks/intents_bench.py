@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+"""
+intents_bench.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Report the resident memory of a bot that has received a synthetic large
+guild (members, presences, voice states and a stream of messages) under
+each intent/cache profile in bot/profiles.py. Every profile is measured
+in a fresh process so the numbers don't bleed into each other:
+
+    python -m benchmarks.intents_bench --members 50000 --messages 5000
+"""
+
+import argparse
+import asyncio
+import gc
+import subprocess
+import sys
+
+from discord.ext import commands
+
+from bot.profiles import PROFILES, get_profile
+
+GUILD_ID = 800000000000000000
+BOT_ID = 700000000000000000
+
+
+def rss_kib():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+
+def user(i):
+    return {
+        "id": str(BOT_ID + 1 + i),
+        "username": f"user{i}",
+        "discriminator": f"{i % 10000:04d}",
+        "avatar": None
+    }
+
+
+def guild_fixture(members, channels):
+    text = [{"id": str(GUILD_ID + 1 + i), "type": 0, "name": f"text-{i}", "position": i,
+             "permission_overwrites": []} for i in range(channels)]
+    voice = [{"id": str(GUILD_ID + 10001 + i), "type": 2, "name": f"voice-{i}", "position": i,
+              "bitrate": 64000, "user_limit": 0, "permission_overwrites": []} for i in range(channels)]
+
+    return {
+        "id": str(GUILD_ID),
+        "name": "Synthetic large guild",
+        "owner_id": str(BOT_ID + 1),
+        "region": "us-west",
+        "member_count": members,
+        "large": True,
+        "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "104324673", "position": 0,
+                   "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+        "emojis": [],
+        "features": [],
+        "channels": text + voice,
+        "members": [{"user": user(i), "roles": [], "joined_at": "2021-07-12T00:00:00+00:00", "deaf": False,
+                     "mute": False} for i in range(members)],
+        "presences": [{"user": {"id": user(i)["id"]}, "status": "online", "activities": [],
+                       "client_status": {"desktop": "online"}} for i in range(0, members, 3)],
+        "voice_states": [{"user_id": user(i)["id"], "channel_id": voice[i % channels]["id"], "session_id": str(i),
+                          "deaf": False, "mute": False, "self_deaf": False, "self_mute": False,
+                          "suppress": False} for i in range(0, members, 50)]
+    }
+
+
+def message(i, channels):
+    return {
+        "id": str(GUILD_ID + 100000 + i),
+        "channel_id": str(GUILD_ID + 1 + i % channels),
+        "guild_id": str(GUILD_ID),
+        "author": user(i),
+        "member": {"roles": [], "joined_at": "2021-07-12T00:00:00+00:00", "deaf": False, "mute": False},
+        "content": f"just chatting, message number {i}",
+        "timestamp": "2021-07-12T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0
+    }
+
+
+def measure(profile, members, channels, messages):
+    """ Runs in the child process """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    client = commands.Bot(command_prefix="!", loop=loop, **get_profile(profile))
+    state = client._connection
+    # There is no gateway to chunk over; the fixture already carries every member
+    state._chunk_guilds = False
+    state.user = state.store_user({**user(-1), "id": str(BOT_ID), "bot": True})
+
+    # Build the payloads up front so they aren't counted
+    guild_data = guild_fixture(members, channels)
+    message_data = [message(i, channels) for i in range(messages)]
+
+    gc.collect()
+    before = rss_kib()
+
+    state.parse_guild_create(guild_data)
+    for data in message_data:
+        state.parse_message_create(data)
+    loop.run_until_complete(asyncio.sleep(0.1))
+
+    gc.collect()
+    guild = client.get_guild(GUILD_ID)
+    print(f"{profile:15} {rss_kib() - before:10d} KiB   cached members: {len(guild._members):6d}   "
+          f"cached messages: {len(state._messages or ()):5d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory use of the intent/cache profiles")
+    parser.add_argument("--members", type=int, default=25000)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--profile", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile is not None:
+        measure(args.profile, args.members, args.channels, args.messages)
+        return
+
+    print(f"RSS growth after loading a guild with {args.members} members and {args.messages} messages\n")
+    for profile in PROFILES:
+        subprocess.run([sys.executable, "-m", "benchmarks.intents_bench", "--profile", profile,
+                        "--members", str(args.members), "--channels", str(args.channels),
+                        "--messages", str(args.messages)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+"""
+players_bench.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Count the music players kept for a large number of guilds and the memory
+they take. Every guild looks at its queue, some of them then play music,
+most of those stop, and the registry is left to evict the idle players.
+Finally the memory budget is lowered under what the playing guilds use
+and more guilds try to play. Also measures what a player and each queued
+track cost, which the estimates in the Music cog are based on:
+
+    python -m benchmarks.players_bench --guilds 10000 --playing 1000
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from benchmarks.harness import GUILD_ID, Harness
+from benchmarks.intents_bench import rss_kib
+
+
+def report(harness, label, took=None):
+    gc.collect()
+    music = harness.music
+    took = f"{took:6.2f} s" if took is not None else ""
+    print(f"{label:34} {len(music.wavelink.players):6} players  {len(music.players):6} registered  "
+          f"~{music.players.memory / 2 ** 20:6.1f} MiB estimated  RSS {rss_kib() / 1024:7.1f} MiB  {took}")
+
+
+async def run_all(harness, indexes, content):
+    start = time.perf_counter()
+    for chunk in range(0, len(indexes), 500):
+        await asyncio.gather(*(harness.command(i, content) for i in indexes[chunk:chunk + 500]))
+    return time.perf_counter() - start
+
+
+async def measure_footprint(harness, first, count, tracks):
+    """ tracemalloc the players made for count guilds, then the tracks queued in them """
+    # Imported once the harness has loaded the cog, so it's the same module
+    from bot.cogs.Music import TrackRecord
+
+    music = harness.music
+    guilds = [harness.bot.get_guild(GUILD_ID + (i << 22)) for i in range(first, first + count)]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    players = [music.get_player(guild) for guild in guilds]
+    gc.collect()
+    per_player = (tracemalloc.get_traced_memory()[0] - before) / count
+
+    record = (await music.tracks.get_tracks("https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+                                            music.wavelink.get_tracks))[0]
+    before = tracemalloc.get_traced_memory()[0]
+    for n, player in enumerate(players):
+        # Distinct ids and titles, like a real queue
+        player.queue.add(*(TrackRecord(f"{record.id}{n}-{i}", f"{record.title} {n}-{i}", record.length,
+                                        f"{record.uri}&t={i}") for i in range(tracks)))
+    gc.collect()
+    per_track = (tracemalloc.get_traced_memory()[0] - before) / (count * tracks)
+    tracemalloc.stop()
+
+    for player in players:
+        await music.players.evict(player)
+
+    return per_player, per_track
+
+
+async def run(args):
+    harness = Harness(args.guilds, port=args.port, track_length=args.track_length)
+    await harness.start()
+    harness.create_guilds()
+    music = harness.music
+    music._sweep_task.cancel()
+    report(harness, "guilds created")
+
+    per_player, per_track = await measure_footprint(harness, args.guilds - 200, 200, 50)
+    print(f"measured: {per_player / 1024:.1f} KiB per empty player, {per_track:.0f} bytes per queued track")
+
+    everyone = list(range(args.guilds))
+    await run_all(harness, everyone, "!queue")
+    report(harness, f"after !queue in {args.guilds} guilds")
+
+    playing = everyone[:args.playing]
+    took = await run_all(harness, playing, "!play https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    report(harness, f"after !play in {args.playing} guilds", took)
+
+    stopped = playing[:args.playing * 9 // 10]
+    await run_all(harness, stopped, "!stop")
+    await asyncio.sleep(0.5)
+    music.players.idle_timeout = 0.1
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    evicted = await music.players.evict_idle()
+    report(harness, f"after {len(stopped)} stopped, evicted {evicted}", time.perf_counter() - start)
+
+    from bot.cogs.Music import PLAYER_BYTES, TRACK_BYTES
+    music.players.budget = music.players.memory + 50 * (PLAYER_BYTES + TRACK_BYTES)
+    more = everyone[args.playing:args.playing + 200]
+    took = await run_all(harness, more, "!play https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    report(harness, f"budget for 50 more, {len(more)} tried", took)
+    print(f"evictions: {music.players.evicted}")
+
+    await harness.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark player counts and memory with many guilds")
+    parser.add_argument("--guilds", type=int, default=10_000)
+    parser.add_argument("--playing", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=2400)
+    parser.add_argument("--track-length", type=int, default=600_000, help="ms, long enough not to end mid-run")
+    args = parser.parse_args()
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+
+if __name__ == "__main__":
+    main()
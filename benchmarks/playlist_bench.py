@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""
+playlist_bench.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Measure how long a queued playlist takes to start playing and to finish
+being added to the queue, and how late the event loop runs while it's
+added. Half the guilds play a bare playlist link, the other half a link to
+a video in a playlist. One more guild runs !stop while its playlist is
+still loading:
+
+    python -m benchmarks.playlist_bench --guilds 20 --playlist-size 2000
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_lavalink import FakeNode
+from benchmarks.harness import GUILD_ID, Harness, percentile
+
+
+async def watch_lag(lags, interval=0.001):
+    loop = asyncio.get_event_loop()
+
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - start - interval))
+
+
+async def play(harness, index, url, size, results):
+    guild_id = GUILD_ID + (index << 22)
+    start = time.perf_counter()
+    task = asyncio.ensure_future(harness.command(index, f"!play {url}"))
+    first = None
+
+    while True:
+        if first is None and str(guild_id) in harness.node.players:
+            first = time.perf_counter() - start
+
+        player = harness.music.wavelink.players.get(guild_id)
+        if player is not None and player.queue.length >= size:
+            break
+
+        await asyncio.sleep(0.001)
+
+    await task
+    results.append((first, time.perf_counter() - start))
+
+
+async def run(args):
+    node = FakeNode(args.port, track_length=args.track_length, playlist_size=args.playlist_size,
+                    search_delay=args.search_delay / 1000, page_delay=args.page_delay / 1000)
+    harness = Harness(args.guilds + 1, node=node, track_length=args.track_length)
+    harness.create_guilds()
+    await harness.start()
+
+    lags = []
+    watcher = asyncio.ensure_future(watch_lag(lags))
+    bare, selected = [], []
+
+    await asyncio.gather(*(
+        play(harness, i, f"https://www.youtube.com/playlist?list=PL{i:08d}", args.playlist_size, bare)
+        if i % 2 else
+        play(harness, i, f"https://www.youtube.com/watch?v=sel{i:08d}&list=PL{i:08d}", args.playlist_size, selected)
+        for i in range(args.guilds)
+    ))
+
+    stopped = args.guilds
+    await harness.command(stopped, "!play https://www.youtube.com/playlist?list=PLstopped")
+    loading = asyncio.ensure_future(harness.command(stopped, "!play https://www.youtube.com/playlist?list=PLstop"))
+    await asyncio.sleep(0.001)
+    await harness.command(stopped, "!stop")
+    await loading
+    await asyncio.sleep(0.05)
+    left = harness.music.wavelink.players[GUILD_ID + (stopped << 22)].queue.length
+
+    watcher.cancel()
+    await harness.stop()
+
+    print(f"\n{args.guilds} guilds, {args.playlist_size} track playlists, "
+          f"{args.page_delay} ms per page of 100\n")
+    for name, results in (("playlist link", bare), ("video in a playlist", selected)):
+        if not results:
+            continue
+
+        firsts = [f for f, _ in results]
+        fulls = [f for _, f in results]
+        print(f"{name:20} first track  p50 {percentile(firsts, 50) * 1000:8.1f} ms   "
+              f"p99 {percentile(firsts, 99) * 1000:8.1f} ms")
+        print(f"{'':20} whole queue  p50 {percentile(fulls, 50) * 1000:8.1f} ms   "
+              f"p99 {percentile(fulls, 99) * 1000:8.1f} ms")
+
+    print(f"\nloop lag             p99 {percentile(lags, 99) * 1000:8.2f} ms   max {max(lags) * 1000:8.2f} ms")
+    print(f"queued after !stop   {left:8d} tracks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark queueing long playlists")
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--playlist-size", type=int, default=2000)
+    parser.add_argument("--page-delay", type=float, default=20, help="ms lavalink takes to fetch each page")
+    parser.add_argument("--search-delay", type=float, default=20, help="ms lavalink takes to load anything")
+    parser.add_argument("--track-length", type=int, default=180000)
+    parser.add_argument("--port", type=int, default=2399)
+    args = parser.parse_args()
+
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+
+if __name__ == "__main__":
+    main()
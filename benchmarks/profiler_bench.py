@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""
+profiler_bench.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Measure what the sampling profiler costs the bot while it's busy. Every
+guild runs the harness's command script, over several trials that take
+turns running with the profiler off and on at each sampling interval.
+Throughput under the harness is noisy, so the CPU time the sampling
+thread used is shown as well. Then shows where the last capture says the
+time went:
+
+    python -m benchmarks.profiler_bench --guilds 200 --trials 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.harness import Harness, percentile
+from bot.profiler import SamplingProfiler
+
+
+async def trial(harness, guilds):
+    harness.latencies.clear()
+    start = time.perf_counter()
+    await asyncio.gather(*(harness.run_script(i, 1) for i in range(guilds)))
+    return len(harness.latencies) / (time.perf_counter() - start), percentile(harness.latencies, 99)
+
+
+async def run(args, directory):
+    harness = Harness(args.guilds, port=args.port, track_length=args.track_length, load_delay=0)
+    harness.create_guilds()
+    await harness.start()
+    # Warm up, so the first trial isn't the one making every player
+    await trial(harness, args.guilds)
+
+    modes = [None, *args.intervals]
+    results = defaultdict(list)
+    cpu = defaultdict(float)
+    samples = defaultdict(float)
+    capture = None
+
+    for n in range(args.trials):
+        # A different mode goes first each time, so none of them always runs on the busiest state
+        for interval in modes[n % len(modes):] + modes[:n % len(modes)]:
+            if interval is not None:
+                profiler = SamplingProfiler(directory, interval=interval / 1000)
+                running = profiler.start(3600)
+
+            results[interval].append(await trial(harness, args.guilds))
+
+            if interval is not None:
+                profiler.stop()
+                capture = await running
+                cpu[interval] += capture.cpu / capture.seconds / args.trials
+                samples[interval] += capture.samples / capture.seconds / args.trials
+
+    off = statistics.median(rate for rate, _ in results[None])
+    for interval in modes:
+        rate = statistics.median(rate for rate, _ in results[interval])
+        p99 = statistics.median(p99 for _, p99 in results[interval])
+        label = "profiler off" if interval is None else f"sampling every {interval:g} ms"
+        print(f"{label:26} {rate:8,.0f} commands/s  ({rate / off - 1:+6.1%})  p99 {p99 * 1000:7.2f} ms  "
+              f"{samples[interval]:5.0f} samples/s using {cpu[interval]:5.1%} of a core")
+
+    print(f"\nlast capture: {capture.samples} samples over {capture.seconds:.2f} s")
+    for tag, n in capture.tags.most_common(args.top):
+        print(f"  {n / capture.samples:6.1%}  {tag}")
+
+    await harness.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sampling profiler's overhead under load")
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--trials", type=int, default=4, help="runs of each mode, the median is shown")
+    parser.add_argument("--intervals", type=float, nargs="+", default=[10, 1], help="sampling intervals in ms")
+    parser.add_argument("--top", type=int, default=8, help="tags to show from the last capture")
+    parser.add_argument("--port", type=int, default=2401)
+    parser.add_argument("--track-length", type=int, default=600_000, help="ms, long enough not to end mid-run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.get_event_loop().run_until_complete(run(args, directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+"""
+queue_bench.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Compare the record based Queue in bot/cogs/Music.py with the list slicing
+Queue it replaced. Run from the repository root:
+
+    python -m benchmarks.queue_bench
+"""
+
+import random
+import sys
+import timeit
+import tracemalloc
+
+import wavelink
+
+from bot.cogs.Music import Queue, RepeatMode
+
+TRACKS = 5000
+
+
+class ListQueue:
+    """ The original Queue implementation, kept here as the baseline """
+
+    def __init__(self):
+        self._queue = []
+        self.position = 0
+        self.repeat_mode = RepeatMode.NONE
+
+    @property
+    def up_next(self):
+        return self._queue[self.position + 1:]
+
+    @property
+    def history(self):
+        return self._queue[:self.position]
+
+    def add(self, *args):
+        self._queue.extend(args)
+
+    def get_next_track(self):
+        self.position += 1
+        if self.position > len(self._queue) - 1:
+            return None
+        return self._queue[self.position]
+
+    def shuffle(self):
+        up_next = self.up_next
+        random.shuffle(up_next)
+        self._queue = self._queue[:self.position + 1]
+        self._queue.extend(up_next)
+
+
+def make_tracks(n):
+    return [
+        wavelink.Track(f"QAAAjQIAJVJpY2sgQXN0bGV5IC0gTmV2ZXIgR29ubmEgR2l2ZSBZb3UgVXA{i:06d}", {
+            "identifier": f"dQw4w9W{i:04d}",
+            "isSeekable": True,
+            "author": "RickAstleyVEVO",
+            "length": 212000,
+            "isStream": False,
+            "position": 0,
+            "title": f"Rick Astley - Never Gonna Give You Up ({i})",
+            "uri": f"https://www.youtube.com/watch?v=dQw4w9W{i:04d}"
+        })
+        for i in range(n)
+    ]
+
+
+def measure_memory(cls):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracks = make_tracks(TRACKS)
+    queue = cls()
+    queue.add(*tracks)
+    del tracks
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return queue, after - before
+
+
+def main():
+    print(f"Queue benchmark with {TRACKS} tracks (python {sys.version.split()[0]})\n")
+
+    for name, cls in (("list slicing", ListQueue), ("records + views", Queue)):
+        queue, memory = measure_memory(cls)
+        queue.position = TRACKS // 2
+
+        up_next = timeit.timeit(lambda: queue.up_next, number=10000) / 10000
+        first = timeit.timeit(lambda: queue.up_next[:10], number=10000) / 10000
+        history = timeit.timeit(lambda: len(queue.history), number=10000) / 10000
+        shuffle = timeit.timeit(queue.shuffle, number=100) / 100
+
+        print(f"{name}:")
+        print(f"  retained memory      {memory / 1024:10.1f} KiB")
+        print(f"  up_next              {up_next * 1e6:10.2f} us")
+        print(f"  up_next[:10]         {first * 1e6:10.2f} us")
+        print(f"  len(history)         {history * 1e6:10.2f} us")
+        print(f"  shuffle              {shuffle * 1e6:10.2f} us\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""
+recovery_bench.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Measure how long the bot takes to get every guild's queue back after a
+crash. A bot fills queues in a few hundred guilds against the fake
+lavalink node, saves its snapshots and is killed without saying goodbye.
+A fresh bot then starts on the same snapshot file and node. With
+--lavalink-restarted the node forgets its sessions too, so every player
+has to be replayed instead of resumed:
+
+    python -m benchmarks.recovery_bench --guilds 300
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.fake_lavalink import FakeNode
+from benchmarks.harness import GUILD_ID, Harness
+
+
+async def run(args):
+    node = FakeNode(args.port, track_length=args.track_length, load_delay=args.load_delay)
+    await node.start()
+    path = os.path.join(tempfile.mkdtemp(), "queues.db")
+
+    before = Harness(args.guilds, node=node, snapshot_path=path)
+    before.create_guilds()
+    await before.start(start_node=False)
+    await asyncio.gather(*(before.command(i, f"!play https://www.youtube.com/watch?v={i:06d}{n:05d}")
+                           for i in range(args.guilds) for n in range(args.tracks)))
+    await asyncio.sleep(0.5)
+
+    music = before.music
+    music.snapshots.save(*music.collect_snapshots())
+    await before.crash()
+    while node.sockets:
+        await asyncio.sleep(0.01)
+
+    if args.lavalink_restarted:
+        for session in list(node._resumable.values()):
+            session.expiry.cancel()
+            node._expire(session)
+
+    start = time.perf_counter()
+    after = Harness(args.guilds, node=node, snapshot_path=path)
+    after.create_guilds()
+    await after.start(start_node=False)
+
+    while not after.music.recovery_time._values:
+        await asyncio.sleep(0.01)
+    took = time.perf_counter() - start
+
+    players = after.music.wavelink.players
+    playing = sum(1 for p in players.values() if p.is_playing)
+    queued = sum(p.queue.length for p in players.values())
+    first = players.get(GUILD_ID)
+
+    print(f"\n{args.guilds} guilds with {args.tracks} tracks each, "
+          f"lavalink {'restarted' if args.lavalink_restarted else 'kept running'}\n")
+    print(f"recovered in            {took * 1000:10.1f} ms   "
+          f"({after.music.recovery_time._values[()] * 1000:.1f} ms after the bot was ready)")
+    print(f"players playing         {playing:10d} / {len(players)}")
+    print(f"tracks queued           {queued:10d}")
+    print(f"sessions resumed        {node.resumes:10d}")
+    print(f"voice reconnects        {after.gateway.voice_requests:10d}")
+    print(f"lavalink searches       {node.requests - args.guilds * args.tracks:10d}   (after the crash)")
+    print(f"snapshot file           {os.path.getsize(path) / 1024:10.1f} KiB")
+    if first is not None:
+        print(f"guild 0 is at           {first.queue.position:10d} in its queue, "
+              f"{first.track_position() / 1000:.1f}s into \"{first.current}\"")
+
+    await after.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure queue recovery after a crash")
+    parser.add_argument("--guilds", type=int, default=300)
+    parser.add_argument("--tracks", type=int, default=20, help="tracks queued in each guild")
+    parser.add_argument("--port", type=int, default=2397)
+    parser.add_argument("--track-length", type=int, default=180000)
+    parser.add_argument("--load-delay", type=int, default=50)
+    parser.add_argument("--lavalink-restarted", action="store_true",
+                        help="have the node drop every session, so players are replayed rather than resumed")
+    args = parser.parse_args()
+
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+
+if __name__ == "__main__":
+    main()
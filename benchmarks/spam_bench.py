@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+spam_bench.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Measure what a burst of !skip and !back does to each guild's player. Every
+guild queues a playlist, then several users press !skip (or a mix of !skip
+and !back) at the same moment, a few times over. Reports the lavalink ops
+sent for the burst and whether every queue ended up where the commands
+that were accepted say it should:
+
+    python -m benchmarks.spam_bench --guilds 50 --users 5 --bursts 4
+"""
+
+import argparse
+import asyncio
+import random
+from collections import Counter
+
+from benchmarks.fake_lavalink import FakeNode
+from benchmarks.harness import GUILD_ID, Harness
+
+
+async def run(args):
+    node = FakeNode(args.port, track_length=args.track_length, playlist_size=args.playlist_size)
+    harness = Harness(args.guilds, node=node)
+    harness.create_guilds()
+    await harness.start()
+
+    await asyncio.gather(*(harness.command(i, f"!play https://www.youtube.com/playlist?list=PL{i:08d}")
+                           for i in range(args.guilds)))
+    await asyncio.sleep(0.3)
+
+    players = harness.music.wavelink.players
+    start = {i: players[GUILD_ID + (i << 22)].queue.position for i in range(args.guilds)}
+    expected = dict(start)
+    ops_before = Counter(node.ops)
+
+    for _ in range(args.bursts):
+        bursts = []
+        for i in range(args.guilds):
+            commands = [random.choice(("!skip", "!back")) if args.mixed else "!skip" for _ in range(args.users)]
+            # The commands check there's somewhere to go before any of them has moved the queue
+            position = expected[i]
+            moves = [1 if c == "!skip" else -1 for c in commands]
+            accepted = [m for m in moves if (m > 0 and position < args.playlist_size - 1) or (m < 0 and position > 0)]
+            expected[i] = min(max(position + sum(accepted), 0), args.playlist_size - 1)
+            bursts.append(asyncio.gather(*(harness.command(i, c) for c in commands)))
+
+        await asyncio.gather(*bursts)
+        await asyncio.sleep(0.05)
+
+    ops = node.ops - ops_before
+    commands = args.guilds * args.users * args.bursts
+    wrong = sum(1 for i in range(args.guilds) if players[GUILD_ID + (i << 22)].queue.position != expected[i])
+    playing = sum(1 for p in players.values() if p.current is not None and p.current.id == p.queue.current_track.id)
+
+    print(f"\n{args.guilds} guilds, {args.bursts} bursts of {args.users} "
+          f"{'!skip/!back' if args.mixed else '!skip'} at once\n")
+    print(f"commands                {commands:10d}")
+    print(f"lavalink ops            {sum(ops.values()):10d}   ({dict(ops)})")
+    print(f"actions merged          {sum(p.actions.merged for p in players.values()):10d}")
+    print(f"queues where expected   {args.guilds - wrong:10d} / {args.guilds}")
+    print(f"playing the queue track {playing:10d} / {args.guilds}")
+
+    await harness.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bursts of skip and back commands")
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--users", type=int, default=5, help="commands in each burst")
+    parser.add_argument("--bursts", type=int, default=4)
+    parser.add_argument("--mixed", action="store_true", help="mix !back in with !skip")
+    parser.add_argument("--playlist-size", type=int, default=100)
+    parser.add_argument("--track-length", type=int, default=180000)
+    parser.add_argument("--port", type=int, default=2399)
+    parser.add_argument("--seed", type=int, default=9616)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+
+if __name__ == "__main__":
+    main()
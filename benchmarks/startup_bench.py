@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+"""
+startup_bench.py
+Ultex/benchmarks
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+
+Measure how long a fresh process takes to get through Bot.setup with
+every cog imported up front and with cogs loaded on their first command,
+and what that first command then pays. Each run is a new interpreter so
+nothing is already imported:
+
+    python -m benchmarks.startup_bench --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+CHILD = """
+import time
+start = time.perf_counter()
+
+import asyncio, contextlib, io, json, sys
+from bot import Bot
+
+bot = Bot(name="Bench", email=None, passwd=None, token=None, profile="minimal-music",
+          eager_cogs=json.loads(sys.argv[1]))
+
+
+async def setup():
+    # Music starts its wavelink client during setup, which wants a running loop
+    bot.setup()
+
+with contextlib.redirect_stdout(io.StringIO()):
+    bot.loop.run_until_complete(setup())
+setup = time.perf_counter() - start
+
+first_use = {}
+for cog in sorted(set(bot._lazy.values())):
+    began = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.loop.run_until_complete(bot.load_lazy(cog))
+    first_use[cog] = time.perf_counter() - began
+
+print(json.dumps({"setup": setup, "first_use": first_use}))
+"""
+
+
+def run_child(eager):
+    out = subprocess.run([sys.executable, "-c", CHILD, json.dumps(eager)], capture_output=True, text=True,
+                         check=True)
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bot startup with eager and lazy cog loading")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    cogs = [p.stem for p in Path("bot/cogs").glob("*.py")]
+
+    for name, eager in (("every cog at startup", cogs), ("cogs on first use", ["Music"])):
+        runs = [run_child(eager) for _ in range(args.runs)]
+        print(f"{name:22} import + setup {statistics.median(r['setup'] for r in runs) * 1000:8.1f} ms")
+
+        for cog in runs[0]["first_use"]:
+            took = statistics.median(r["first_use"][cog] for r in runs)
+            print(f"{'':22} first {cog + ' command':18} +{took * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+actor.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import contextvars
+from collections import deque
+
+
+class ActorFull(Exception):
+    pass
+
+
+class _Job:
+    __slots__ = ("func", "args", "future")
+
+    def __init__(self, func, args, future):
+        self.func = func
+        self.args = args
+        self.future = future
+
+
+class Actor:
+    """ Runs coroutine functions one at a time in the order they're submitted,
+        with at most maxsize waiting. A job can be merged into the one waiting at
+        the back of the queue if it's for the same function, so a burst of the
+        same request runs once """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.ran = 0
+        self.merged = 0
+        self.rejected = 0
+        self._jobs = deque()
+        self._task = None
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def submit(self, func, *args, merge=None, force=False):
+        """ Queue func(*args) and return a future for its result. merge(waiting, new)
+            combines the arguments of a waiting call to func with these ones, or
+            returns None if they can't be. Raises ActorFull if maxsize jobs are
+            already waiting, unless force is set """
+        if merge is not None and self._jobs and self._jobs[-1].func == func:
+            job = self._jobs[-1]
+            if (merged := merge(job.args, args)) is not None:
+                job.args = merged
+                self.merged += 1
+                return job.future
+
+        if len(self._jobs) >= self.maxsize and not force:
+            self.rejected += 1
+            raise ActorFull
+
+        loop = asyncio.get_event_loop()
+        job = _Job(func, args, loop.create_future())
+        self._jobs.append(job)
+
+        if self._task is None:
+            # Started from an empty context, or it'd keep the log context (command, user) of whichever
+            # call happened to start it for every job after
+            self._task = contextvars.Context().run(loop.create_task, self._run())
+
+        return job.future
+
+    def cancel(self):
+        """ Drop every waiting job """
+        for job in self._jobs:
+            job.future.cancel()
+
+        self._jobs.clear()
+
+    async def _run(self):
+        try:
+            while self._jobs:
+                job = self._jobs.popleft()
+                self.ran += 1
+
+                try:
+                    result = await job.func(*job.args)
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+        finally:
+            self._task = None
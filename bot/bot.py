@@ -6,62 +6,243 @@ Created by Kaleb Rosborough on 12/07/2021
 Copyright © Shock9616 2021 All rights reserved
 """
 
+import asyncio
+import importlib
+import logging
+import signal
+import sys
+import time
 from pathlib import Path
 
-import discord
 from discord.ext import commands
 
+from . import logs
+from .content import ContentStore
+from .loader import scan_cog
+from .metrics import Registry, watch_loop_lag
+from .outbox import Outbox
+from .prefixes import PrefixStore
+from .profiler import SamplingProfiler
+from .profiles import get_profile
 
-class Bot(commands.Bot):
-    def __init__(self, name, email, passwd, token, cmd_prefix='!', excluded_cogs=None):
-        super().__init__(command_prefix=cmd_prefix, case_insensitive=True, intents=discord.Intents.all())
+log = logging.getLogger(__name__)
+command_log = logging.getLogger(f"{__name__}.commands")
+
+MAX_PREFIX_LENGTH = 10
+
+
+def valid_prefix(prefix):
+    """ Whether a guild's messages can be checked for prefix. It can't be empty or have spaces in it """
+    return isinstance(prefix, str) and 0 < len(prefix) <= MAX_PREFIX_LENGTH and not any(c.isspace() for c in prefix)
+
+
+class CogNotReloadable(commands.ExtensionError):
+    pass
+
+
+class Bot(commands.AutoShardedBot):
+    def __init__(self, name, email, passwd, token, cmd_prefix='!', excluded_cogs=None, track_cache_path=None,
+                 nodes=None, wolfram_app_id=None, smtp_host="smtp.gmail.com", smtp_port=587, profile="full",
+                 prefixes_path=None, shard_ids=None, shard_count=None, cluster=None, metrics_port=None,
+                 transition_lead=0.05, snapshot_path=None, snapshot_interval=15, outbox_window=0.5,
+                 eager_cogs=None, history_path=None, player_idle_timeout=600, player_memory_budget=256 * 2 ** 20,
+                 profiler_dir="logs", profiler_interval=0.01, profiler_seconds=30):
+        super().__init__(command_prefix=Bot.prefix_for, case_insensitive=True, shard_ids=shard_ids,
+                         shard_count=shard_count, **get_profile(profile))
         self.name = name
         self.email = email
         self.passwd = passwd
         self.excluded_cogs = [] if excluded_cogs is None else excluded_cogs
+        # Cogs imported at startup without reading their source first. Other cogs are too if they
+        # listen for events, and the rest wait for their first command
+        self.eager_cogs = [] if eager_cogs is None else eager_cogs
         self.token = token
+        self.profile = profile
+        self.track_cache_path = track_cache_path
+        self.nodes = nodes
+        self.wolfram_app_id = wolfram_app_id
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        # Seconds before the end of a track to start the next one. None waits for lavalink's TrackEnd
+        self.transition_lead = transition_lead
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        # Tracks each guild has played, so repeated searches can skip lavalink
+        self.history_path = history_path
+        # Music players idle for this many seconds are torn down, and idle ones go sooner if the
+        # players' estimated memory would pass the budget (bytes, None for no limit)
+        self.player_idle_timeout = player_idle_timeout
+        self.player_memory_budget = player_memory_budget
+        # Stack samples of the event loop, captured on !profile or SIGUSR1 for profiler_seconds
+        self.profiler = SamplingProfiler(profiler_dir, interval=profiler_interval)
+        self.profiler_seconds = profiler_seconds
         self.dev_team = "shock9616@gmail.com"
+        self.started_at = time.perf_counter()
+        self.content = ContentStore("data")
+        self.default_prefix = cmd_prefix
+        self.prefixes_path = prefixes_path
+        self.prefix_store = PrefixStore(prefixes_path) if prefixes_path is not None else None
+        self.prefixes = self.load_prefixes()
+        self._prefix_starts = {p[0] for p in (cmd_prefix, *self.prefixes.values())}
+        self.cluster = cluster
 
-        self._cogs = [p.stem for p in Path(".").glob("./bot/cogs/*.py")]
+        if cluster is not None:
+            cluster.handlers["guild"] = self.guild_summary
+
+        self.metrics_port = metrics_port
+        self.metrics = Registry()
+        self.command_latency = self.metrics.histogram("ultex_command_duration_seconds",
+                                                      "Time taken to run each command", labels=("command",))
+        self.loop_lag = self.metrics.gauge("ultex_event_loop_lag_seconds",
+                                           "How late the event loop last woke up from a sleep")
+        self.loop_lag_histogram = self.metrics.histogram("ultex_event_loop_lag_histogram_seconds",
+                                                         "How late the event loop wakes up from sleeps",
+                                                         buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5))
+        self.metrics.gauge("ultex_gateway_latency_seconds", "Discord gateway heartbeat latency per shard",
+                           labels=("shard",), callback=lambda: {(s,): lat for s, lat in self.latencies})
+        self.metrics.gauge("ultex_guilds", "Number of guilds the bot is in", callback=lambda: len(self.guilds))
+        self.cog_load_time = self.metrics.gauge("ultex_cog_load_seconds", "Time taken to import and add each cog",
+                                                labels=("cog",))
+        self.ready_time = self.metrics.gauge("ultex_ready_seconds", "Time from startup to the bot being ready")
+        self.metrics.gauge("ultex_log_records_pending", "Log records waiting for the writer thread",
+                           callback=lambda: logs.pipeline.pending if logs.pipeline is not None else 0)
+        self.metrics.gauge("ultex_log_records_dropped", "Log records dropped because the writer fell behind",
+                           callback=lambda: logs.pipeline.dropped if logs.pipeline is not None else 0)
+        # Confirmations sent to a channel within outbox_window seconds of each other are merged
+        self.outbox = Outbox(self.http, self.metrics, window=outbox_window)
+
+        self._cogs = {p.stem: p for p in Path(".").glob("./bot/cogs/*.py")}
+        self._lazy = {}
+        self._loading = {}
+        self._loaded_mtimes = {}
 
     def setup(self):
-        print("Running setup...")
+        log.info("Running setup...")
+        start = time.perf_counter()
+
+        for cog, path in self._cogs.items():
+            if cog in self.excluded_cogs:
+                log.info("Excluded cog: %s", cog)
+                continue
+
+            if cog in self.eager_cogs or (info := scan_cog(path)).listeners:
+                self.load_cog(cog)
+            else:
+                self._lazy.update(dict.fromkeys(info.commands, cog))
+                log.info("Registered cog: %s (loaded on first use of %s)", cog, ", ".join(info.commands))
+
+        log.info("Setup complete (%.1f ms).", (time.perf_counter() - start) * 1000)
+
+    def load_cog(self, cog):
+        """ Import a cog and add it to the bot, timing how long that takes """
+        start = time.perf_counter()
+        self.load_extension(f"bot.cogs.{cog}")
+        took = time.perf_counter() - start
 
-        for cog in self._cogs:
-            if cog not in self.excluded_cogs:
-                self.load_extension(f"bot.cogs.{cog}")
-                print(f"Loaded cog: {cog}")
+        self._lazy = {name: c for name, c in self._lazy.items() if c != cog}
+        self._loaded_mtimes[cog] = self._cogs[cog].stat().st_mtime
+        self.cog_load_time.set(took, cog)
+        log.info("Loaded cog: %s (%.1f ms)", cog, took * 1000)
+
+    async def load_lazy(self, cog):
+        """ Load a cog registered at startup. Its module is imported on a worker
+            thread first, so its dependencies don't hold up the event loop """
+        if (loading := self._loading.get(cog)) is not None:
+            return await asyncio.shield(loading)
+
+        # Other messages for the same cog wait on this rather than loading it again
+        loading = self._loading[cog] = self.loop.create_future()
+        try:
+            await self.loop.run_in_executor(None, importlib.import_module, f"bot.cogs.{cog}")
+            if f"bot.cogs.{cog}" not in self.extensions:
+                self.load_cog(cog)
+        finally:
+            del self._loading[cog]
+            loading.set_result(None)
+
+    def reload_cogs(self, cog=None):
+        """ Reload a cog, or with None every loaded cog whose file changed since it
+            was loaded. Cogs that haven't been loaded yet have their commands read
+            again. Returns the names of the cogs that were reloaded. Raises
+            CogNotReloadable for a cog whose module sets RELOADABLE = False, those
+            are skipped when reloading every changed cog """
+        if cog is not None:
+            if not self.reloadable(cog):
+                raise CogNotReloadable(f"{cog} can't be reloaded while the bot is running, restart the bot instead",
+                                       name=f"bot.cogs.{cog}")
+
+            self.reload_extension(f"bot.cogs.{cog}")
+            self._loaded_mtimes[cog] = self._cogs[cog].stat().st_mtime
+            return [cog]
+
+        reloaded = []
+        for cog, mtime in list(self._loaded_mtimes.items()):
+            if self._cogs[cog].stat().st_mtime == mtime:
+                continue
+
+            if self.reloadable(cog):
+                reloaded.extend(self.reload_cogs(cog))
             else:
-                print(f"Excluded cog: {cog}")
+                log.warning("%s changed but can't be reloaded, restart the bot to pick up the change", cog)
+
+        for cog in set(self._lazy.values()):
+            self._lazy = {name: c for name, c in self._lazy.items() if c != cog}
+            self._lazy.update(dict.fromkeys(scan_cog(self._cogs[cog]).commands, cog))
 
-        print("Setup complete.")
+        return reloaded
+
+    @staticmethod
+    def reloadable(cog):
+        return getattr(sys.modules.get(f"bot.cogs.{cog}"), "RELOADABLE", True)
 
     def run(self):
         self.setup()
 
+        if self.cluster is not None:
+            self.cluster.start(self)
+
+        self.loop.create_task(watch_loop_lag(self.loop_lag, self.loop_lag_histogram))
+        if hasattr(signal, "SIGUSR1"):
+            self.loop.add_signal_handler(signal.SIGUSR1, self.toggle_profiler)
+        if self.metrics_port is not None:
+            self.loop.create_task(self.metrics.serve(port=self.metrics_port))
+
         TOKEN = self.token
 
-        print("Running bot...")
+        log.info("Running bot...")
         super().run(TOKEN, reconnect=True)
 
+    def toggle_profiler(self):
+        """ Start a capture of profiler_seconds, or end the running one early """
+        if self.profiler.running:
+            self.profiler.stop()
+            return
+
+        capture = self.profiler.start(self.profiler_seconds)
+        capture.add_done_callback(lambda done: done.cancelled() or done.exception())
+
     async def shutdown(self):
-        print("Closing connection to Discord.")
+        self.profiler.stop()
+        log.info("Closing connection to Discord.")
+        self.outbox.close()
+        if self.prefix_store is not None:
+            self.prefix_store.close()
         await super().close()
 
     async def close(self):
-        print("Closing on keyboard Interrupt...")
+        log.info("Closing on keyboard Interrupt...")
         await self.shutdown()
 
     async def on_connect(self):
-        print(f"Connected to Discord (latency: {self.latency * 1000} ms.")
+        log.info("Connected to Discord (latency: %.1f ms).", self.latency * 1000)
 
     @staticmethod
     async def on_resumed():
-        print("Bot resumed.")
+        log.info("Bot resumed.")
 
     @staticmethod
     async def on_disconnect():
-        print("Bot disconnected.")
+        log.warning("Bot disconnected.")
 
     async def on_error(self, err, *args, **kwargs):
         raise
@@ -69,14 +250,127 @@ class Bot(commands.Bot):
     async def on_command_error(self, ctx, exc):
         raise getattr(exc, "original", exc)
 
+    def cluster_stats(self):
+        """ Stats this process reports to the other clusters. Cogs can add
+            their own by defining a cluster_stats method """
+        stats = {
+            "guilds": len(self.guilds),
+            "shards": sorted(self.shards),
+            "latency": self.latency
+        }
+
+        for cog in self.cogs.values():
+            if hasattr(cog, "cluster_stats"):
+                stats.update(cog.cluster_stats())
+
+        return stats
+
+    async def guild_summary(self, guild_id):
+        """ Answer cross-cluster lookups for a guild on one of our shards """
+        if (guild := self.get_guild(guild_id)) is None:
+            return None
+
+        return {"id": guild.id, "name": guild.name, "member_count": guild.member_count, "shard_id": guild.shard_id}
+
+    def lavalink_restarted(self):
+        """ Called from the lavalink supervisor's thread after it restarts lavalink """
+        self.loop.call_soon_threadsafe(self.dispatch, "lavalink_restart")
+
     async def on_ready(self):
-        print("Bot ready!")
-        print("--------------------\n"
-              f"Logged in as {self.user.name}\n"
-              f"Client id: {self.user.id}\n"
-              "--------------------")
+        self.ready_time.set(time.perf_counter() - self.started_at)
+        log.info("Bot ready! (%.2fs after startup) Logged in as %s, client id %s",
+                 time.perf_counter() - self.started_at, self.user.name, self.user.id)
+
+    def load_prefixes(self):
+        """ Load the per-guild custom prefixes """
+        if self.prefix_store is None:
+            return {}
+
+        prefixes = self.prefix_store.load()
+
+        # Skips anything a bad !prefix saved before it was checked, it would stop that guild's commands working
+        for guild_id, prefix in prefixes.items():
+            if not valid_prefix(prefix):
+                log.warning("Ignoring invalid prefix %r saved for guild %s", prefix, guild_id)
+
+        return {guild_id: prefix for guild_id, prefix in prefixes.items() if valid_prefix(prefix)}
+
+    def set_prefix(self, guild_id, prefix):
+        """ Set (or with None, reset) a guild's custom prefix """
+        if prefix is not None and not valid_prefix(prefix):
+            raise ValueError(f"Invalid prefix: {prefix!r}")
+
+        if prefix == self.default_prefix:
+            prefix = None
+
+        if prefix is None:
+            self.prefixes.pop(guild_id, None)
+        else:
+            self.prefixes[guild_id] = prefix
+
+        self._prefix_starts = {p[0] for p in (self.default_prefix, *self.prefixes.values())}
+
+        # Only this guild's row is written, other clusters' guilds are theirs to change
+        if self.prefix_store is not None:
+            self.prefix_store.set(guild_id, prefix)
+
+    def prefix_for(self, msg):
+        """ Return the command prefix used in the message's guild """
+        if msg.guild is None:
+            return self.default_prefix
+
+        return self.prefixes.get(msg.guild.id, self.default_prefix)
+
+    def invoked_name(self, msg):
+        """ Cheap check that rejects ordinary chat before any context is built.
+            Returns the name of the command the message might invoke, or None.
+            It can let through messages that aren't commands, but never the opposite """
+        content = msg.content
+
+        if not content or content[0] not in self._prefix_starts:
+            return None
+
+        prefix = self.prefix_for(msg)
+        if not content.startswith(prefix):
+            return None
+
+        invoker = content[len(prefix):].split(maxsplit=1)
+        if not invoker or content[len(prefix)].isspace():
+            return None
+
+        # all_commands is already keyed case-insensitively (case_insensitive=True)
+        if invoker[0] in self.all_commands or invoker[0].lower() in self._lazy:
+            return invoker[0].lower()
+
+    def could_be_command(self, msg):
+        return self.invoked_name(msg) is not None
+
+    async def invoke(self, ctx):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+
+        name = ctx.command.qualified_name
+        start = time.perf_counter()
+
+        # Everything logged while the command runs says which command and guild it was for
+        with logs.log_context(command=name, guild_id=getattr(ctx.guild, "id", None), channel_id=ctx.channel.id,
+                              user_id=ctx.author.id):
+            with self.command_latency.time(name):
+                await super().invoke(ctx)
+
+            command_log.info("%s %s in %.1f ms", name, "failed" if ctx.command_failed else "ran",
+                             (time.perf_counter() - start) * 1000)
 
     async def process_commands(self, msg):
+        if (name := self.invoked_name(msg)) is None:
+            return
+
+        if self._lazy:
+            # help lists every command, so it needs every cog
+            for cog in set(self._lazy.values()) if name == "help" else [self._lazy.get(name)]:
+                if cog is not None:
+                    await self.load_lazy(cog)
+
         ctx = await self.get_context(msg, cls=commands.Context)
 
         if ctx.command is not None:
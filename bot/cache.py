@@ -0,0 +1,253 @@
+"""
+cache.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import wavelink
+
+from . import db
+
+# Query string parameters that don't change which track a URL points to
+IGNORED_PARAMS = {"feature", "si", "pp", "ab_channel", "t", "start_radio"}
+
+
+def normalize_query(query):
+    """ Return a cache key for a search query or URL so that
+        equivalent lookups share the same entry """
+    query = query.strip()
+
+    if ":" in query and not query.lower().startswith(("http://", "https://")):
+        source, _, terms = query.partition(":")
+        return f"{source.lower()}:{' '.join(terms.casefold().split())}"
+
+    parts = urlsplit(query)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.startswith("m."):
+        host = host[2:]
+
+    params = [(k, v) for k, v in parse_qsl(parts.query) if k not in IGNORED_PARAMS and not k.startswith("utm_")]
+    path = parts.path
+
+    if host == "youtu.be" and path.strip("/"):
+        params.append(("v", path.strip("/")))
+        host, path = "youtube.com", "/watch"
+
+    return urlunsplit(("https", host, path.rstrip("/"), urlencode(sorted(params)), ""))
+
+
+def _dump(result):
+    """ Turn a get_tracks result into the JSON that lavalink's loadtracks returns """
+    if isinstance(result, wavelink.TrackPlaylist):
+        return json.dumps(result.data)
+
+    return json.dumps({
+        "playlistInfo": {},
+        "tracks": [{"track": track.id, "info": track.info} for track in result]
+    })
+
+
+def _load(raw):
+    """ Turn JSON written by _dump back into a get_tracks result """
+    data = json.loads(raw)
+
+    if data["playlistInfo"]:
+        return wavelink.TrackPlaylist(data=data)
+
+    return [wavelink.Track(id_=track["track"], info=track["info"]) for track in data["tracks"]]
+
+
+class DiskTier:
+    """ SQLite backed second tier for the track cache so that lookups survive restarts.
+        Expired rows are deleted at startup and every prune_every writes, when the
+        rows expiring soonest also go if there are more than maxsize """
+
+    def __init__(self, path, maxsize=50_000, prune_every=1000):
+        self.maxsize = maxsize
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS tracks (key TEXT PRIMARY KEY, expires REAL, data TEXT);
+            CREATE INDEX IF NOT EXISTS tracks_expires ON tracks (expires);
+        """)
+        self._db.commit()
+        self.prune()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT expires, data FROM tracks WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            return None
+
+        expires, data = row
+        if expires < time.time():
+            self.delete(key)
+            return None
+
+        return expires, data
+
+    def set(self, key, expires, data):
+        with self._lock:
+            self._db.execute("REPLACE INTO tracks VALUES (?, ?, ?)", (key, expires, data))
+            self._db.commit()
+            self._writes += 1
+
+        if self._writes >= self.prune_every:
+            self.prune()
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM tracks WHERE key = ?", (key,))
+            self._db.commit()
+
+    def prune(self):
+        """ Delete expired rows, then the ones expiring soonest until at most maxsize are left """
+        with self._lock:
+            self._writes = 0
+            with self._db:
+                self._db.execute("DELETE FROM tracks WHERE expires < ?", (time.time(),))
+                self._db.execute("DELETE FROM tracks WHERE key IN (SELECT key FROM tracks ORDER BY expires "
+                                 "LIMIT max(0, (SELECT COUNT(*) FROM tracks) - ?))", (self.maxsize,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class TrackCache:
+    """ LRU + TTL cache in front of wavelink's get_tracks.
+        Identical lookups that arrive while one is already in flight wait on it
+        instead of sending another request to lavalink. With a path, lookups are also
+        kept on disk, up to disk_maxsize of them """
+
+    def __init__(self, maxsize=1024, ttl=6 * 60 * 60, path=None, disk_maxsize=50_000):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._disk = DiskTier(path, disk_maxsize) if path is not None else None
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def get_tracks(self, query, fetch):
+        """ Return the tracks for query, only calling fetch(query) on a miss """
+        key = normalize_query(query)
+
+        if (result := self._get(key)) is not None:
+            self.hits += 1
+            return self._copy(result)
+
+        if (pending := self._pending.get(key)) is not None:
+            self.hits += 1
+            return self._copy(await asyncio.shield(pending))
+
+        # The lookup runs as a task of its own so that cancelling whoever started it
+        # doesn't cancel it for everyone else waiting on the same query
+        lookup = self._pending[key] = asyncio.get_event_loop().create_task(self._lookup(key, query, fetch))
+        lookup.add_done_callback(self._finished)
+        return self._copy(await asyncio.shield(lookup))
+
+    async def _lookup(self, key, query, fetch):
+        try:
+            if (result := await self._from_disk(key)) is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                if result := await fetch(query):
+                    self._set(key, result)
+                    await self._to_disk(key, result)
+
+            return result
+
+        finally:
+            del self._pending[key]
+
+    @staticmethod
+    def _finished(lookup):
+        # Mark the exception as retrieved in case everyone waiting on it was cancelled
+        if not lookup.cancelled():
+            lookup.exception()
+
+    def invalidate(self, query):
+        """ Drop a single query from the cache """
+        key = normalize_query(query)
+        self._entries.pop(key, None)
+
+        if self._disk is not None:
+            self._disk.delete(key)
+
+    def clear(self):
+        self._entries.clear()
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+
+    def _get(self, key):
+        try:
+            expires, result = self._entries[key]
+        except KeyError:
+            return None
+
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return result
+
+    def _set(self, key, result, ttl=None):
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), result)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def _from_disk(self, key):
+        if self._disk is None:
+            return None
+
+        loop = asyncio.get_event_loop()
+        if (row := await loop.run_in_executor(None, self._disk.get, key)) is None:
+            return None
+
+        expires, data = row
+        result = _load(data)
+        self._set(key, result, ttl=expires - time.time())
+        return result
+
+    async def _to_disk(self, key, result):
+        if self._disk is None:
+            return
+
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._disk.set, key, time.time() + self.ttl, _dump(result))
+
+    @staticmethod
+    def _copy(result):
+        """ Hand out a new list each time so callers can't change what's cached """
+        if isinstance(result, list):
+            return list(result)
+
+        return result
@@ -0,0 +1,263 @@
+"""
+cluster.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import urllib.request
+from multiprocessing.connection import Client, Listener
+
+log = logging.getLogger(__name__)
+
+GATEWAY_URL = "https://discord.com/api/v8/gateway/bot"
+
+
+def recommended_shards(token):
+    """ Ask Discord how many shards the bot should run """
+    request = urllib.request.Request(GATEWAY_URL, headers={"Authorization": f"Bot {token}",
+                                                           "User-Agent": "Ultex (cluster launcher)"})
+    with urllib.request.urlopen(request, timeout=10) as resp:
+        return json.load(resp)["shards"]
+
+
+def shard_ranges(shard_count, clusters):
+    """ Split shard ids 0..shard_count-1 into (nearly) even contiguous ranges """
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    ranges, start = [], 0
+
+    for i in range(clusters):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+
+    return ranges
+
+
+def shard_for(guild_id, shard_count):
+    return (guild_id >> 22) % shard_count
+
+
+class ClusterHub:
+    """ Runs in the launcher process. Clusters connect to it to report their
+        stats, ask for everyone's stats and send queries to whichever cluster
+        owns a guild's shard """
+
+    def __init__(self, shard_count, address=("127.0.0.1", 0), authkey=None):
+        self.shard_count = shard_count
+        self.authkey = authkey or os.urandom(16)
+        self.stats = {}
+        self._owners = {}
+        self._clusters = {}
+        self._locks = {}
+        self._listener = Listener(address, authkey=self.authkey)
+        self.address = self._listener.address
+
+    def start(self):
+        threading.Thread(target=self._accept, name="cluster-hub", daemon=True).start()
+
+    def broadcast(self, msg):
+        for cluster_id in list(self._clusters):
+            self._send(cluster_id, msg)
+
+    def dispatch(self, event):
+        """ Have every cluster dispatch event on its bot, e.g. lavalink_restart """
+        self.broadcast({"op": "event", "name": event})
+
+    def close(self):
+        self._listener.close()
+
+    def _send(self, cluster_id, msg):
+        try:
+            with self._locks[cluster_id]:
+                self._clusters[cluster_id].send(msg)
+        except (KeyError, OSError):
+            pass
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        hello = conn.recv()
+        cluster_id = hello["cluster"]
+        self._clusters[cluster_id] = conn
+        self._locks[cluster_id] = threading.Lock()
+        for shard_id in hello["shards"]:
+            self._owners[shard_id] = cluster_id
+
+        try:
+            while True:
+                self._handle(cluster_id, conn.recv())
+        except (EOFError, OSError):
+            pass
+        finally:
+            self._clusters.pop(cluster_id, None)
+            self.stats.pop(cluster_id, None)
+
+    def _handle(self, cluster_id, msg):
+        op = msg["op"]
+
+        if op == "stats":
+            self.stats[cluster_id] = {**msg["data"], "updated": time.time()}
+
+        elif op == "all_stats":
+            self._send(cluster_id, {"op": "reply", "nonce": msg["nonce"], "data": self.stats})
+
+        elif op == "query":
+            owner = self._owners.get(shard_for(msg["guild_id"], self.shard_count))
+            if owner is None or owner not in self._clusters:
+                self._send(cluster_id, {"op": "reply", "nonce": msg["nonce"], "error": "No cluster owns that guild"})
+            else:
+                self._send(owner, {**msg, "from": cluster_id})
+
+        elif op == "reply":
+            self._send(msg.pop("to"), msg)
+
+
+class ClusterClient:
+    """ A cluster's connection to the hub. Blocking reads happen on a thread
+        and are handed to the bot's event loop """
+
+    def __init__(self, cluster_id, shard_ids, address, authkey, stats_interval=15):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.address = address
+        self.authkey = authkey
+        self.stats_interval = stats_interval
+        self.handlers = {}
+        self._conn = None
+        self._bot = None
+        self._lock = None
+        self._nonces = None
+        self._waiting = {}
+
+    def start(self, bot):
+        # Created here rather than in __init__ so the client can be pickled into its process
+        self._lock = threading.Lock()
+        self._nonces = itertools.count()
+        self._bot = bot
+        self._conn = Client(self.address, authkey=self.authkey)
+        self._send({"op": "hello", "cluster": self.cluster_id, "shards": self.shard_ids})
+
+        threading.Thread(target=self._read, name="cluster-client", daemon=True).start()
+        bot.loop.create_task(self._report())
+
+    def handler(self, name):
+        """ Decorator registering a coroutine that answers queries called name """
+        def decorator(func):
+            self.handlers[name] = func
+            return func
+
+        return decorator
+
+    async def query(self, guild_id, name, timeout=5, **kwargs):
+        """ Run the handler called name on the cluster that owns guild_id.
+            The handler is called as handler(guild_id, **kwargs) """
+        return await self._request({"op": "query", "guild_id": guild_id, "name": name, "kwargs": kwargs}, timeout)
+
+    async def all_stats(self, timeout=5):
+        """ Return the last stats every cluster reported, keyed by cluster id """
+        return await self._request({"op": "all_stats"}, timeout)
+
+    async def _request(self, msg, timeout):
+        nonce = next(self._nonces)
+        future = self._waiting[nonce] = self._bot.loop.create_future()
+
+        try:
+            await self._bot.loop.run_in_executor(None, self._send, {**msg, "nonce": nonce})
+            reply = await asyncio.wait_for(future, timeout)
+        finally:
+            self._waiting.pop(nonce, None)
+
+        if "error" in reply:
+            raise LookupError(reply["error"])
+
+        return reply["data"]
+
+    def _send(self, msg):
+        with self._lock:
+            self._conn.send(msg)
+
+    def _read(self):
+        while True:
+            try:
+                msg = self._conn.recv()
+            except (EOFError, OSError):
+                return
+
+            self._bot.loop.call_soon_threadsafe(self._received, msg)
+
+    def _received(self, msg):
+        op = msg["op"]
+
+        if op == "reply":
+            if (future := self._waiting.get(msg["nonce"])) is not None and not future.done():
+                future.set_result(msg)
+
+        elif op == "query":
+            self._bot.loop.create_task(self._answer(msg))
+
+        elif op == "event":
+            self._bot.dispatch(msg["name"])
+
+    async def _answer(self, msg):
+        reply = {"op": "reply", "nonce": msg["nonce"], "to": msg["from"]}
+
+        if (handler := self.handlers.get(msg["name"])) is None:
+            reply["error"] = f"No handler for {msg['name']}"
+        else:
+            try:
+                reply["data"] = await handler(msg["guild_id"], **msg["kwargs"])
+            except Exception as e:
+                reply["error"] = f"{type(e).__name__}: {e}"
+
+        await self._bot.loop.run_in_executor(None, self._send, reply)
+
+    async def _report(self):
+        await self._bot.wait_until_ready()
+
+        while True:
+            stats = self._bot.cluster_stats()
+            await self._bot.loop.run_in_executor(None, self._send, {"op": "stats", "data": stats})
+            await asyncio.sleep(self.stats_interval)
+
+
+def launch(target, shard_count, clusters, on_hub=None):
+    """ Start one process per shard range. target(cluster_client, shard_ids, shard_count)
+        runs in each process. Blocks until every cluster has exited """
+    hub = ClusterHub(shard_count)
+    hub.start()
+
+    if on_hub is not None:
+        on_hub(hub)
+
+    processes = []
+    for cluster_id, shard_ids in enumerate(shard_ranges(shard_count, clusters)):
+        client = ClusterClient(cluster_id, shard_ids, hub.address, hub.authkey)
+        process = multiprocessing.Process(target=target, args=(client, shard_ids, shard_count),
+                                          name=f"cluster-{cluster_id}")
+        process.start()
+        processes.append(process)
+        log.info("Started cluster %s with shards %s-%s (pid %s)", cluster_id, shard_ids[0], shard_ids[-1], process.pid)
+
+    try:
+        for process in processes:
+            process.join()
+    finally:
+        hub.close()
@@ -0,0 +1,87 @@
+"""
+Admin.py
+Ultex/cogs
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import time
+
+from discord.ext import commands
+
+# Longest capture !profile will start, the samples are held in memory until it ends
+MAX_PROFILE_SECONDS = 300
+
+
+class ProfilerRunning(commands.CommandError):
+    pass
+
+
+class InvalidProfileLength(commands.CommandError):
+    pass
+
+
+class Admin(commands.Cog):
+    def __init__(self, client):
+        self.client = client
+
+    # ----- Commands -----
+
+    @commands.command(name="reload")
+    @commands.is_owner()
+    async def reload_command(self, ctx, cog: str = None):
+        """ Reload a cog, or every cog whose file has changed, without restarting the bot """
+        if reloaded := self.client.reload_cogs(cog):
+            await self.client.outbox.send(ctx, f"Reloaded {', '.join(reloaded)}")
+        else:
+            await self.client.outbox.send(ctx, "No cogs have changed since they were loaded")
+
+    @reload_command.error
+    async def reload_command_error(self, ctx, exc):
+        """ Display any errors related to the reload command """
+        if isinstance(exc, commands.NotOwner):
+            await self.client.outbox.send(ctx, "Only the bot's owner can reload cogs", error=True)
+
+        exc = getattr(exc, "original", exc)
+        if isinstance(exc, commands.ExtensionError):
+            await self.client.outbox.send(ctx, f"Couldn't reload: {exc}", error=True)
+
+    @commands.command(name="profile")
+    @commands.is_owner()
+    async def profile_command(self, ctx, seconds: float = None):
+        """ Sample what the event loop is doing for a while and write the stacks to a file """
+        profiler = self.client.profiler
+        seconds = self.client.profiler_seconds if seconds is None else seconds
+
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            raise InvalidProfileLength
+        if profiler.running:
+            raise ProfilerRunning
+
+        await self.client.outbox.send(ctx, f"Profiling for {seconds:.0f} seconds...")
+        capture = await profiler.start(seconds)
+
+        busy = {tag: n for tag, n in capture.tags.most_common() if tag != "(idle)"}
+        lines = [f"Wrote {capture.samples} samples over {capture.seconds:.1f} s to {capture.path}",
+                 f"Busy in {sum(busy.values()) / max(1, capture.samples):.0%} of them"]
+        lines.extend(f"{n / capture.samples:6.1%}  {tag}" for tag, n in list(busy.items())[:5])
+        await self.client.outbox.send(ctx, "\n".join(lines))
+
+    @profile_command.error
+    async def profile_command_error(self, ctx, exc):
+        """ Display any errors related to the profile command """
+        if isinstance(exc, commands.NotOwner):
+            await self.client.outbox.send(ctx, "Only the bot's owner can profile the bot", error=True)
+        elif isinstance(exc, commands.BadArgument):
+            await self.client.outbox.send(ctx, "The number of seconds to profile for has to be a number", error=True)
+        elif isinstance(exc, ProfilerRunning):
+            left = max(0, (self.client.profiler.ends_at or 0) - time.monotonic())
+            await self.client.outbox.send(ctx, f"Already profiling, it'll finish in {left:.0f} seconds", error=True)
+        elif isinstance(exc, InvalidProfileLength):
+            await self.client.outbox.send(ctx, f"Profiles can be up to {MAX_PROFILE_SECONDS} seconds long",
+                                          error=True)
+
+
+def setup(client):
+    client.add_cog(Admin(client))
@@ -6,11 +6,14 @@ Created by Kaleb Rosborough on 12/07/2021
 Copyright © Shock9616 2021 All rights reserved
 """
 
-import random
-
 from discord.ext import commands
 
 
+# ---------- Custom Error Classes ----------
+class NothingToSay(commands.CommandError):
+    pass
+
+
 class FunStuff(commands.Cog, name="Fun Stuff"):
     def __init__(self, client):
         self.client = client
@@ -20,10 +23,23 @@ class FunStuff(commands.Cog, name="Fun Stuff"):
     @commands.command(name="joke", aliases=["dadjoke"])
     async def joke_command(self, ctx):
         """ Send a really bad joke """
-        with open("data/jokes.txt", "r") as file:
-            jokes = file.read().splitlines()
-            joke = random.choice(jokes)
-            await ctx.send(f"{joke}")
+        if (joke := self.client.content.random_line("jokes")) is None:
+            raise NothingToSay
+
+        await self.client.outbox.send(ctx, joke)
+
+    @commands.command(name="verse", aliases=["bibleverse"])
+    async def verse_command(self, ctx):
+        """ Send an encouraging bible verse """
+        if (verse := self.client.content.random_line("verses")) is None:
+            raise NothingToSay
+
+        await self.client.outbox.send(ctx, verse)
+
+    async def cog_command_error(self, ctx, exc):
+        """ Display errors any of the fun commands can raise """
+        if isinstance(exc, NothingToSay):
+            await self.client.outbox.send(ctx, "There's nothing to send right now, try again later", error=True)
 
 
 def setup(client):
@@ -7,23 +7,60 @@ Copyright © Shock9616 2021 All rights reserved
 """
 import asyncio
 import datetime as dt
+import itertools
+import logging
 import random
 import re
+import time
 import typing as t
+from collections import abc, deque
 from enum import Enum
+from urllib.parse import parse_qs, urlsplit
 
 import discord
 import wavelink
 from discord.ext import commands
 
+from bot.actor import Actor, ActorFull
+from bot.cache import TrackCache
+from bot.history import PlayHistory
+from bot.logs import log_context
+from bot.nodes import NodePool
+from bot.players import PlayerRegistry
+from bot.snapshots import QueueSnapshot, SnapshotStore, decode_track
+from bot.voice import VoiceOccupancy
+
+log = logging.getLogger(__name__)
+# Every track start and end, sampled in production
+track_log = logging.getLogger(f"{__name__}.tracks")
+
 URL_REGEX = r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’]))"
-OPTIONS = {
-    "1️⃣": 0,
-    "2⃣": 1,
-    "3⃣": 2,
-    "4⃣": 3,
-    "5⃣": 4,
-}
+# Number of search results to choose from
+OPTIONS = 5
+# Lavalink reports streams as being Long.MAX_VALUE ms long
+STREAM_LENGTH = 2 ** 63 - 1
+# Snapshots older than this are from a queue nobody is waiting on any more
+SNAPSHOT_MAX_AGE = 60 * 60
+# How long restored players get to hear from a resumed lavalink session before they're replayed
+RESUME_GRACE = 2
+# Playlist tracks added to the queue per step of the event loop
+PLAYLIST_CHUNK = 100
+# Upcoming tracks listed on each page of !queue, and the longest title shown
+QUEUE_PAGE_SIZE = 10
+QUEUE_TITLE_LENGTH = 90
+# Discord rejects embeds with a field value longer than this
+EMBED_FIELD_LENGTH = 1024
+# Player actions that can wait for the ones before them before commands are turned away
+PLAYER_ACTIONS = 8
+# Seconds between writing the plays recorded in the history to disk
+HISTORY_WRITE_INTERVAL = 30
+# Seconds between looking for idle players to tear down
+PLAYER_SWEEP_INTERVAL = 30
+# Estimated memory of a player with an empty queue, and of each track queued (benchmarks/players_bench.py)
+PLAYER_BYTES = 6 * 1024
+TRACK_BYTES = 600
+# The cog's wavelink client, voice connections and players can't be handed over to a reloaded copy
+RELOADABLE = False
 
 
 # ---------- Custom Error Classes ----------
@@ -63,17 +100,114 @@ class InvalidRepeatMode(commands.CommandError):
     pass
 
 
+class PlayerBusy(commands.CommandError):
+    pass
+
+
+class PlayerLimitReached(commands.CommandError):
+    pass
+
+
+class PlaylistTruncated(commands.CommandError):
+    pass
+
+
+def selected_video(query):
+    """ Return a link to just the video in a playlist link that also names one,
+        e.g. watch?v=...&list=..., or None """
+    params = parse_qs(urlsplit(query).query)
+
+    if "list" in params and "v" in params:
+        return f"https://www.youtube.com/watch?v={params['v'][0]}"
+
+
+def _add_offsets(waiting, new):
+    return (waiting[0] + new[0],)
+
+
+def _latest(waiting, new):
+    return new
+
+
+def _shorten(title, length=QUEUE_TITLE_LENGTH):
+    return title if len(title) <= length else f"{title[:length - 1]}…"
+
+
 class RepeatMode(Enum):
     NONE = 0
     ONE = 1
     ALL = 2
 
 
+class TrackRecord:
+    """ The few fields of a track that the queue needs. Full wavelink
+        tracks are only rebuilt from these when they're about to be played """
+    __slots__ = ("id", "title", "length", "uri")
+
+    def __init__(self, id_, title, length, uri=None):
+        self.id = id_
+        self.title = title
+        self.length = length
+        self.uri = uri
+
+    @classmethod
+    def from_track(cls, track):
+        if isinstance(track, cls):
+            return track
+
+        return cls(track.id, track.title, track.length, track.uri)
+
+    @classmethod
+    def from_id(cls, id_):
+        """ Rebuild a record from nothing but the lavalink track string """
+        info = decode_track(id_)
+        return cls(id_, info["title"], info["length"], info["uri"])
+
+    def resolve(self):
+        """ Build a wavelink Track that can be passed to Player.play. The fields the
+            record doesn't keep, like the author and whether it's a stream, are read
+            back out of the track string """
+        try:
+            info = decode_track(self.id)
+        except ValueError:
+            info = {"author": None, "identifier": "", "isStream": False}
+
+        return wavelink.Track(self.id, {**info, "title": self.title, "length": self.length, "uri": self.uri})
+
+    def __str__(self):
+        return self.title
+
+
+class QueueView(abc.Sequence):
+    """ Read-only window over part of a queue that doesn't copy it """
+
+    def __init__(self, tracks, start, stop):
+        self._tracks = tracks
+        self._range = range(start, max(start, stop))
+
+    def __len__(self):
+        return len(self._range)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._tracks[i] for i in self._range[item]]
+
+        return self._tracks[self._range[item]]
+
+    def __iter__(self):
+        return map(self._tracks.__getitem__, self._range)
+
+
 class Queue:
     def __init__(self):
         self._queue = []
+        self._resolved = None
         self.position = 0
         self.repeat_mode = RepeatMode.NONE
+        # Bumped on every change, so readers can tell whether the queue moved since they last looked
+        self.version = 0
+        self._pages = {}
+        self._pages_version = None
 
     @property
     def is_empty(self):
@@ -85,7 +219,7 @@ class Queue:
         if not self._queue:
             raise QueueIsEmpty
 
-        return self._queue[0]
+        return self._resolve(0)
 
     @property
     def current_track(self):
@@ -93,34 +227,57 @@ class Queue:
             raise QueueIsEmpty
 
         if self.position <= len(self._queue) - 1:
-            return self._queue[self.position]
+            return self._resolve(self.position)
 
     @property
     def up_next(self):
         if not self._queue:
             raise QueueIsEmpty
 
-        return self._queue[self.position + 1:]
+        return QueueView(self._queue, self.position + 1, len(self._queue))
 
     @property
     def history(self):
         if not self._queue:
             raise QueueIsEmpty
 
-        return self._queue[:self.position]
+        return QueueView(self._queue, 0, self.position)
 
     @property
     def length(self):
         return len(self._queue)
 
+    def iter_up_next(self):
+        """ Lazily iterate over the upcoming tracks """
+        return iter(self.up_next)
+
+    def iter_history(self):
+        """ Lazily iterate over the tracks that have already been played """
+        return iter(self.history)
+
     def add(self, *args):
         """ Add a song to the queue """
-        self._queue.extend(args)
+        self._queue.extend(map(TrackRecord.from_track, args))
+        self.version += 1
+
+    def load(self, records, position, repeat_mode):
+        """ Replace the queue with records, e.g. from a snapshot """
+        self._queue = list(records)
+        self._resolved = None
+        self.position = position
+        self.repeat_mode = repeat_mode
+        self.version += 1
+
+    def ids(self):
+        """ Return the lavalink track string of every track in the queue """
+        return [record.id for record in self._queue]
 
     def empty(self):
         """ Remove all tracks from the queue """
         self._queue.clear()
+        self._resolved = None
         self.position = 0
+        self.version += 1
 
     def get_next_track(self):
         """ Return the next track in the queue"""
@@ -128,6 +285,7 @@ class Queue:
             raise QueueIsEmpty
 
         self.position += 1
+        self.version += 1
 
         if self.position < 0:
             return None
@@ -137,17 +295,49 @@ class Queue:
             else:
                 return None
 
-        return self._queue[self.position]
+        return self._resolve(self.position)
+
+    def move(self, offset):
+        """ Move offset tracks along the queue (back if it's negative) and return the
+            track there. Wraps round with repeat all, otherwise stops at either end """
+        if not self._queue:
+            raise QueueIsEmpty
+
+        position = self.position + offset
+        if self.repeat_mode == RepeatMode.ALL:
+            position %= len(self._queue)
+
+        self.position = min(max(position, 0), len(self._queue) - 1)
+        self.version += 1
+
+        return self._resolve(self.position)
+
+    def peek_next_track(self):
+        """ Return the track get_next_track would, without moving the queue along """
+        if not self._queue:
+            return None
+
+        position = self.position + 1
+
+        if position < 0:
+            return None
+        elif position > len(self._queue) - 1:
+            if self.repeat_mode != RepeatMode.ALL:
+                return None
+            position = 0
+
+        return self._resolve(position)
 
     def shuffle(self):
         """ Shuffle the upcoming tracks in the queue """
         if not self._queue:
             raise QueueIsEmpty
 
-        up_next = self.up_next
+        # Shuffle the tail in place instead of rebuilding the whole queue
+        up_next = self._queue[self.position + 1:]
         random.shuffle(up_next)
-        self._queue = self._queue[:self.position + 1]
-        self._queue.extend(up_next)
+        self._queue[self.position + 1:] = up_next
+        self.version += 1
 
     def set_repeat_mode(self, mode):
         if mode == "none":
@@ -157,11 +347,86 @@ class Queue:
         elif mode == "all":
             self.repeat_mode = RepeatMode.ALL
 
+        self.version += 1
+
+    def page(self, number, size=QUEUE_PAGE_SIZE):
+        """ Return the page number (clamped to the pages there are), the number of
+            pages and the listing of that page of upcoming tracks. Pages are kept
+            until the queue next changes """
+        if not self._queue:
+            raise QueueIsEmpty
+
+        if self._pages_version != self.version:
+            self._pages.clear()
+            self._pages_version = self.version
+
+        up_next = self.up_next
+        pages = max(1, -(-len(up_next) // size))
+        number = min(max(number, 1), pages)
+
+        if (listing := self._pages.get(number)) is None:
+            start = (number - 1) * size
+            listing = self._pages[number] = self._listing(up_next[start:start + size], start + 1)
+
+        return number, pages, listing
+
+    @staticmethod
+    def _listing(records, first):
+        """ Number the records from first, one per line, shortening titles so the
+            whole listing fits in an embed field however long the numbers get """
+        prefixes = [f"**{first + i}.** " for i in range(len(records))]
+        # What the numbers and line breaks leave for the titles
+        room = EMBED_FIELD_LENGTH - sum(map(len, prefixes)) - (len(records) - 1)
+        lines = []
+
+        for i, (prefix, record) in enumerate(zip(prefixes, records)):
+            # Each title gets an even share of what's left, so short ones leave more for the rest
+            title = _shorten(record.title, min(QUEUE_TITLE_LENGTH, room // (len(records) - i)))
+            room -= len(title)
+            lines.append(prefix + title)
+
+        return "\n".join(lines)
+
+    def _resolve(self, index):
+        """ Return the full track at index, reusing the last one built if it's the same record """
+        record = self._queue[index]
+
+        if self._resolved is None or self._resolved[0] is not record:
+            self._resolved = (record, record.resolve())
+
+        return self._resolved[1]
+
 
 class Player(wavelink.Player):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.queue = Queue()
+        self.ended_at = None
+        self.synced = True
+        # Bumped by !stop, so lookups that finish afterwards know not to queue anything
+        self.generation = 0
+        self._transition = None
+        # Where the track last asked for starts, until lavalink says it has
+        self._starting = None
+        self._pending = deque()
+        self._ingest = None
+        # Everything that moves the queue or tells lavalink what to play goes through here, one at a time
+        self.actions = Actor(maxsize=PLAYER_ACTIONS)
+        self.last_active = 0.0
+        # Called with the player when its queue grows or shrinks, returns False if it's out of room
+        self.on_resize = None
+
+    @property
+    def is_active(self):
+        """ Whether the player is doing anything that tearing it down would interrupt """
+        return (self.is_playing and not self.is_paused) or len(self.actions) > 0 or self._ingest is not None
+
+    def footprint(self):
+        """ Estimate of the memory the player, its queue and any playlist still being added use """
+        return PLAYER_BYTES + TRACK_BYTES * (self.queue.length + len(self._pending))
+
+    def _resized(self):
+        return self.on_resize is None or self.on_resize(self)
 
     async def connect(self, ctx, channel=None):
         """ Connect to your current voice channel or the channel that you specify """
@@ -176,6 +441,9 @@ class Player(wavelink.Player):
 
     async def teardown(self):
         """ Disconnect from the current voice channel """
+        self.cancel_loading()
+        self.actions.cancel()
+
         try:
             await self.destroy()
         except KeyError:
@@ -186,63 +454,154 @@ class Player(wavelink.Player):
         if not tracks:
             raise NoTracksFound
 
-        if isinstance(tracks, wavelink.TrackPlaylist):
-            self.queue.add(*tracks.tracks)
+        try:
+            if isinstance(tracks, wavelink.TrackPlaylist):
+                self.add_playlist(tracks.tracks)
+
+            elif len(tracks) == 1:
+                self.enqueue(tracks[0])
+                await self.bot.outbox.send(ctx, f"Added \"{tracks[0].title}\" to the queue")
 
-        elif len(tracks) == 1:
-            self.queue.add(tracks[0])
-            await ctx.send(f"Added \"{tracks[0].title}\" to the queue")
+            else:
+                if (track := await self.choose_track(ctx, tracks)) is not None:
+                    self.enqueue(track)
+                    await self.bot.outbox.send(ctx, f"Added \"{track.title}\" to the queue")
 
+        finally:
+            # Whatever made it into the queue plays, even if a playlist was cut short
+            await self.perform(self.start_if_idle, merge=_latest, force=True)
+
+    def perform(self, func, *args, merge=None, force=False):
+        """ Queue one of the player's actions behind any that are still running.
+            Raises PlayerBusy if too many are already waiting """
+        try:
+            return self.actions.submit(func, *args, merge=merge, force=force)
+        except ActorFull:
+            raise PlayerBusy from None
+
+    def enqueue(self, *tracks):
+        """ Add tracks to the queue, after any playlist that's still being added """
+        if self._pending:
+            self._pending.extend(tracks)
+        else:
+            self.queue.add(*tracks)
+
+        # A few tracks are always let in, idle players are still evicted to make room if they can be
+        self._resized()
+
+    def add_playlist(self, tracks, skip=None):
+        """ Queue the first chunk of a playlist now and the rest a chunk at a time in the
+            background, so a long playlist doesn't hold up playback or the event loop.
+            skip is the identifier of a track that was already queued on its own. Raises
+            PlaylistTruncated, having queued only the first chunk, if the rest would take
+            the players past their memory budget """
+        if skip is not None:
+            tracks = [track for track in tracks if track.identifier != skip]
+
+        waiting = len(self._pending)
+        if self._pending:
+            self._pending.extend(tracks)
         else:
-            if (track := await self.choose_track(ctx, tracks)) is not None:
-                self.queue.add(track)
-                await ctx.send(f"Added \"{track.title}\" to the queue")
+            self.queue.add(*tracks[:PLAYLIST_CHUNK])
+            self._pending.extend(itertools.islice(tracks, PLAYLIST_CHUNK, None))
 
-        if not self.is_playing and not self.queue.is_empty:
-            await self.start_playback()
+        if self._resized():
+            if self._pending and self._ingest is None:
+                self._ingest = asyncio.get_event_loop().create_task(self._add_pending())
+            return
+
+        # Drop this playlist's tracks that aren't queued yet, a playlist already being added carries on
+        while len(self._pending) > waiting:
+            self._pending.pop()
+        self._resized()
+        raise PlaylistTruncated
+
+    async def _add_pending(self):
+        while self._pending:
+            await asyncio.sleep(0)
+            self.queue.add(*(self._pending.popleft() for _ in range(min(PLAYLIST_CHUNK, len(self._pending)))))
+
+        self._ingest = None
+
+    def cancel_loading(self):
+        """ Drop the rest of any playlist being added and anything still being looked up """
+        self.generation += 1
+        self._pending.clear()
+
+        if self._ingest is not None:
+            self._ingest.cancel()
+            self._ingest = None
+
+        self._resized()
 
     async def choose_track(self, ctx, tracks):
         """ Show an embed of the top 5 search results
-        and use reactions to detect the choice"""
+        and wait for a reply with the number of the choice.
+        Only the embed is sent and deleted, rather than a reaction per result """
+        options = {str(i + 1): track for i, track in enumerate(tracks[:OPTIONS])}
 
-        def _check(r, u):
+        def _check(m):
             return (
-                r.emoji in OPTIONS.keys()
-                and u == ctx.author
-                and r.message.id == msg.id
+                m.author == ctx.author
+                and m.channel == ctx.channel
+                and m.content.strip().lower() in (*options, "cancel")
             )
 
         embed = discord.Embed(
             title="Choose a song:",
             description=(
                 "\n".join(
-                    f"**{i + 1}.** {j.title} ({j.length // 60000}:{str(j.length % 60).zfill(2)})"
-                    for i, j in enumerate(tracks[:5])
+                    f"**{i}.** {j.title} ({j.length // 60000}:{str(j.length // 1000 % 60).zfill(2)})"
+                    for i, j in options.items()
                 )
             ),
             colour=ctx.author.colour,
             timestamp=dt.datetime.utcnow()
         )
         embed.set_author(name="Query Results")
-        embed.set_footer(text=f"Invoked by {ctx.author.display_name}", icon_url=ctx.author.avatar_url)
+        embed.set_footer(text=f"Invoked by {ctx.author.display_name} • Reply with 1-{len(options)} or \"cancel\"",
+                         icon_url=ctx.author.avatar_url)
 
-        msg = await ctx.send(embed=embed)
-        for emoji in list(OPTIONS.keys())[:min(len(tracks), len(OPTIONS))]:
-            await msg.add_reaction(emoji)
+        music = self.bot.get_cog("Music")
+        start = time.perf_counter()
+        msg = await self.bot.outbox.send(ctx, embed=embed, wait=True)
 
         try:
-            reaction, _ = await self.bot.wait_for("reaction_add", timeout=60.0, check=_check)
+            reply = await self.bot.wait_for("message", timeout=60.0, check=_check)
         except asyncio.TimeoutError:
             await msg.delete()
             await ctx.message.delete()
+            outcome, requests = "timeout", 3
         else:
             await msg.delete()
-            return tracks[OPTIONS[reaction.emoji]]
+            choice = reply.content.strip().lower()
+            outcome, requests = ("cancelled", 2) if choice == "cancel" else ("chosen", 2)
+
+        music.track_choices.observe(time.perf_counter() - start, outcome)
+        music.choice_requests.observe(requests, outcome)
+
+        if outcome == "chosen":
+            return options[choice]
 
     async def start_playback(self):
         """ Start playing the first track in the queue """
         await self.play(self.queue.current_track)
 
+    async def start_if_idle(self):
+        if not self.is_playing and not self.queue.is_empty:
+            await self.start_playback()
+
+    async def jump(self, offset):
+        """ Play the track offset tracks along the queue. A run of skips
+            is merged into one jump, so lavalink only hears about the last """
+        await self.play(self.queue.move(offset))
+
+    async def clear(self):
+        """ Empty the queue and stop playing """
+        self.queue.empty()
+        self._resized()
+        await self.stop()
+
     async def advance(self):
         """ Advance to the next track in the queue """
         try:
@@ -255,89 +614,544 @@ class Player(wavelink.Player):
     async def repeat_track(self):
         await self.play(self.queue.current_track)
 
+    async def play(self, track, *, replace=True, start=0, end=0):
+        """ Play a track and schedule the switch to whatever comes after it """
+        await super().play(track, replace=replace, start=start, end=end)
+
+        # Lavalink's first playerUpdate can be seconds away, so count from now until it arrives
+        self.last_update = time.time() * 1000
+        self.last_position = start
+        self._starting = start
+        self._schedule_transition(track)
+
+    def started(self):
+        """ Count the position from when lavalink started the track rather than from
+            when it was asked to, so the time spent loading it doesn't bring the
+            transition forward """
+        if self._starting is None:
+            return
+
+        self.last_position, self._starting = self._starting, None
+        if not self.paused:
+            self.last_update = time.time() * 1000
+            if self.current is not None:
+                self._schedule_transition(self.current)
+
+    async def stop(self):
+        self._cancel_transition()
+        await super().stop()
+
+    async def set_pause(self, pause):
+        # wavelink only moves the position on playerUpdates, which leaves it wrong after a pause
+        self.last_position = self.track_position()
+        self.last_update = time.time() * 1000
+        await super().set_pause(pause)
+
+        if pause:
+            self._cancel_transition()
+        elif self.current is not None:
+            self._schedule_transition(self.current)
+
+    def track_position(self):
+        """ Position in the current track in ms. Unlike wavelink's position it
+            isn't reset to 0 when it runs past the end of the track """
+        if self.paused or not self.last_update:
+            return self.last_position or 0
+
+        return self.last_position + time.time() * 1000 - self.last_update
+
+    async def update_state(self, state):
+        await super().update_state(state)
+
+        if not self.synced:
+            # The first playerUpdate of a resumed session, so lavalink is still playing our track
+            self.synced = True
+            if self.current is not None and not self.paused:
+                self._schedule_transition(self.current)
+
+    def snapshot(self):
+        return QueueSnapshot(self.guild_id, self.node.identifier, self.channel_id, self.queue.position,
+                             self.queue.repeat_mode.value, int(self.track_position()), self.paused, self.volume,
+                             self.queue.ids())
+
+    def load_snapshot(self, snapshot, records):
+        """ Put the queue and player state back as they were when the snapshot was saved.
+            Nothing is sent to lavalink; either its resumed session is already
+            playing or replay is called afterwards """
+        self.queue.load(records, snapshot.position, RepeatMode(snapshot.repeat_mode))
+        self.channel_id = snapshot.channel_id
+        self.volume = snapshot.volume
+        self.paused = bool(snapshot.paused)
+        self.last_position = snapshot.track_position
+        self.last_update = time.time() * 1000
+        self.current = self.queue.current_track
+        self.synced = False
+
+    async def replay(self):
+        """ Rejoin voice and start the current track where it was,
+            for when lavalink couldn't resume the session """
+        self.synced = True
+        await super().connect(self.channel_id)
+
+        if self.current is not None:
+            await self.play(self.current, start=int(self.last_position))
+            if self.paused:
+                await self.set_pause(True)
+
+        if self.volume != 100:
+            await self.set_volume(self.volume)
+
+    def _schedule_transition(self, track):
+        self._cancel_transition()
+
+        if self.bot.transition_lead is None or not track.length or track.length >= STREAM_LENGTH:
+            return
+
+        self._transition = asyncio.get_event_loop().create_task(self._transition_early(track))
+
+    def _cancel_transition(self):
+        if self._transition is not None:
+            self._transition.cancel()
+            self._transition = None
+
+    async def _transition_early(self, track):
+        """ Start the next track just before this one ends rather than waiting
+            for lavalink's TrackEnd, which leaves a gap while the next track loads """
+        lead = self.bot.transition_lead * 1000
+
+        # Resolve the next track now instead of at the transition
+        self.queue.peek_next_track()
+
+        while (remaining := track.length - self.track_position() - lead) > 0:
+            await asyncio.sleep(remaining / 1000)
+
+        # Playing the next track schedules its own transition, which mustn't cancel this one
+        self._transition = None
+        await self.perform(self._finish_early, track, force=True)
+
+    async def _finish_early(self, track):
+        # A skip may have got in first
+        if self.current is not track:
+            return
+
+        repeat = self.queue.repeat_mode == RepeatMode.ONE
+        if not repeat and self.queue.peek_next_track() is None:
+            # Nothing to move on to, so let the track play out
+            return
+
+        # Replacing a track stops it straight away, so the gap runs from here
+        self.ended_at = (asyncio.get_event_loop().time(), "early")
+
+        if repeat:
+            await self.repeat_track()
+        else:
+            await self.advance()
+
 
 class Music(commands.Cog, wavelink.WavelinkMixin):
     def __init__(self, client):
         self.client = client
         self.wavelink = wavelink.Client(bot=client)
+        self.tracks = TrackCache(path=client.track_cache_path)
+        self.nodes = NodePool(self.wavelink, client.nodes)
+        self.snapshots = SnapshotStore(client.snapshot_path) if client.snapshot_path is not None else None
+        self.history = PlayHistory(client.history_path) if client.history_path is not None else None
+        self.occupancy = VoiceOccupancy()
+        self._snapshotted = {}
+        self._snapshot_task = None
+        self._history_task = None
+        self._index_reads = {}
+        self.players = PlayerRegistry(Player.footprint, lambda p: p.is_active, idle_timeout=client.player_idle_timeout,
+                                      budget=client.player_memory_budget,
+                                      on_evict=lambda reason, n: self.players_evicted.inc(reason, amount=n))
+        self._sweep_task = self.client.loop.create_task(self.sweep_players())
+
+        if self.history is not None:
+            self._history_task = self.client.loop.create_task(self.save_history())
+
         self.client.loop.create_task(self.start_nodes())
+        self.register_metrics(client.metrics)
+
+    def cog_unload(self):
+        self.nodes.cancel()
+        self._sweep_task.cancel()
+        self.tracks.close()
+
+        if self.snapshots is not None:
+            if self._snapshot_task is not None:
+                self._snapshot_task.cancel()
+            self.snapshots.save(*self.collect_snapshots())
+            self.snapshots.close()
+
+        if self.history is not None:
+            self._history_task.cancel()
+            # Also writes the plays save_history took, if its write hasn't finished
+            self.history.close()
+
+        for name in self._gauges:
+            self.client.metrics.remove(name)
+
+    def register_metrics(self, metrics):
+        """ Player, queue and wavelink node metrics. The gauges are read when scraped """
+        self.track_transitions = metrics.histogram("ultex_track_transition_seconds",
+                                                   "Time from lavalink reporting a track stopped to the next "
+                                                   "one being sent", labels=("event",))
+        self.recovery_time = metrics.gauge("ultex_queue_recovery_seconds",
+                                           "Time taken to put the saved queues back after the last start")
+        self.track_gaps = metrics.histogram("ultex_track_gap_seconds",
+                                            "Silence between a track ending and the next one starting, by "
+                                            "whether it was started early or after lavalink's TrackEnd",
+                                            labels=("transition",),
+                                            buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+        self.track_choices = metrics.histogram("ultex_track_choice_seconds",
+                                               "Time from showing search results to the choice being made, by "
+                                               "whether a song was chosen, the choice was cancelled or it timed out",
+                                               labels=("outcome",), buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+        self.choice_requests = metrics.histogram("ultex_track_choice_rest_requests",
+                                                 "Discord REST requests made to show search results and take "
+                                                 "the choice", labels=("outcome",), buckets=(1, 2, 3, 5, 7, 10))
+        self.history_lookups = metrics.counter("ultex_history_lookups_total",
+                                               "Searches looked up in the guild's play history, by whether a "
+                                               "played track matched", labels=("result",))
+        self.players_evicted = metrics.counter("ultex_players_evicted_total",
+                                               "Players torn down for being idle or to stay in the memory budget",
+                                               labels=("reason",))
+
+        gauges = {
+            "ultex_players": ("Active music players", lambda: len(self.wavelink.players)),
+            "ultex_players_playing": ("Music players currently playing",
+                                      lambda: sum(1 for p in self.wavelink.players.values() if p.is_playing)),
+            "ultex_queued_tracks": ("Tracks in all queues",
+                                    lambda: sum(p.queue.length for p in self.wavelink.players.values())),
+            "ultex_voice_channels_tracked": ("Voice channels whose listeners are being counted",
+                                             lambda: len(self.occupancy)),
+            "ultex_player_memory_bytes": ("Estimated memory used by the players and their queues",
+                                          lambda: self.players.memory)
+        }
+        node_stats = {
+            "players": "Players on the node (lavalink stats)",
+            "playing_players": "Playing players on the node (lavalink stats)",
+            "system_load": "System CPU load of the node",
+            "lavalink_load": "CPU load of the lavalink process",
+            "frames_deficit": "Audio frames missing in the last minute",
+            "frames_nulled": "Audio frames nulled in the last minute",
+            "memory_used": "Memory used by lavalink in bytes"
+        }
+        for stat, doc in node_stats.items():
+            gauges[f"ultex_node_{stat}"] = (doc, self._node_stat(stat))
+        gauges["ultex_node_penalty"] = ("Load balancing penalty of the node",
+                                        lambda: {(n.identifier,): n.penalty for n in self.wavelink.nodes.values()})
+
+        for name, (doc, callback) in gauges.items():
+            metrics.gauge(name, doc, labels=("node",) if name.startswith("ultex_node_") else (), callback=callback)
+
+        self._gauges = list(gauges)
+
+    def _node_stat(self, stat):
+        def collect():
+            return {(n.identifier,): getattr(n.stats, stat) for n in self.wavelink.nodes.values() if n.stats}
+
+        return collect
+
+    def cluster_stats(self):
+        players = self.wavelink.players.values()
+        return {
+            "players": len(players),
+            "playing": sum(1 for p in players if p.is_playing),
+            "nodes": len(self.nodes.available)
+        }
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
-        """ When a user disconnects from the current voice channel,
-            and if they are the last non-bot user, disconnect """
-        if not member.bot and after.channel is None:
-            if not [m for m in before.channel.members if not m.bot]:
-                await self.get_player(member.guild).teardown()
+        """ When the last non-bot user leaves the bot's voice channel, disconnect """
+        if before.channel == after.channel:
+            return
+
+        if member.id == self.client.user.id:
+            self.occupancy.forget(member.guild.id)
+            return
+
+        if member.bot or (player := self.players.get(member.guild.id)) is None or not player.channel_id:
+            return
+
+        channel = member.guild.get_channel(int(player.channel_id))
+        if channel is not None and self.occupancy.update(channel, before, after) == 0:
+            self.occupancy.forget(member.guild.id)
+            await self.players.evict(player)
+
+    @commands.Cog.listener()
+    async def on_lavalink_restart(self):
+        """ Reconnect the nodes as soon as the supervisor has lavalink back up """
+        log.info("Lavalink restarted, reconnecting wavelink nodes")
+        await self.nodes.reconnect()
 
     @wavelink.WavelinkMixin.listener()
     async def on_node_ready(self, node):
         """ Let the console know that the wavelink node is ready """
-        print(f"Wavelink node '{node.identifier}' ready")
+        log.info("Wavelink node '%s' ready", node.identifier)
+        await self.nodes.enable_resuming(node)
 
     @wavelink.WavelinkMixin.listener("on_track_stuck")
     @wavelink.WavelinkMixin.listener("on_track_end")
     @wavelink.WavelinkMixin.listener("on_track_exception")
     async def on_player_stop(self, node, payload):
-        if payload.player.queue.repeat_mode == RepeatMode.ONE:
-            await payload.player.repeat_track()
-        else:
-            await payload.player.advance()
+        player = payload.player
+
+        # wavelink only keeps current after a TrackEnd if another track was already started,
+        # either by replacing this one or by an early transition that raced the end
+        if isinstance(payload, wavelink.TrackEnd) and (payload.reason == "REPLACED" or player.current is not None):
+            return
+
+        reason = getattr(payload, "reason", None) or str(payload)
+        player.ended_at = (self.client.loop.time(), reason)
+
+        with log_context(guild_id=player.guild_id, event=str(payload), reason=reason, node=node.identifier):
+            if isinstance(payload, wavelink.TrackEnd):
+                track_log.info("Track ended")
+            elif isinstance(payload, wavelink.TrackStuck):
+                track_log.warning("Track stuck for %d ms", payload.threshold)
+            else:
+                track_log.warning("Track failed: %s", payload.error)
+
+            with self.track_transitions.time(str(payload)):
+                if player.queue.repeat_mode == RepeatMode.ONE:
+                    await player.perform(player.repeat_track, force=True)
+                else:
+                    await player.perform(player.advance, force=True)
+
+    @wavelink.WavelinkMixin.listener()
+    async def on_track_start(self, node, payload):
+        """ Record the play in the guild's history and how long the player was silent between tracks """
+        player = payload.player
+
+        with log_context(guild_id=player.guild_id, event=str(payload), node=node.identifier,
+                         track=getattr(player.current, "title", None)):
+            track_log.info("Track started")
+            self.players.touch(player)
+            player.started()
+
+            if self.history is not None and player.current is not None:
+                self.history.record(player.guild_id, player.current)
+
+            if (ended := player.ended_at) is not None:
+                player.ended_at = None
+                ended_at, transition = ended
+                self.track_gaps.observe(max(0.0, self.client.loop.time() - ended_at), transition)
+
+    async def cog_command_error(self, ctx, exc):
+        """ Display errors any of the music commands can raise """
+        if isinstance(exc, PlayerBusy):
+            await self.client.outbox.send(ctx, "Too many music commands at once, try again in a moment", error=True)
+
+        if isinstance(exc, PlayerLimitReached):
+            await self.client.outbox.send(ctx, "Too many servers are playing music right now, try again later",
+                                          error=True)
+
+        if isinstance(exc, PlaylistTruncated):
+            await self.client.outbox.send(ctx, "Only the start of that playlist was queued, there isn't room for "
+                                               "the rest right now", error=True)
 
     async def cog_check(self, ctx):
         """ Make sure that the command is not being issued from a DM """
         if isinstance(ctx.channel, discord.DMChannel):
-            await ctx.send("Sorry, Music commands are not available in DMs")
+            await self.client.outbox.send(ctx, "Sorry, Music commands are not available in DMs", error=True)
             return False
 
         return True
 
     async def start_nodes(self):
-        """ Start wavelink nodes """
+        """ Start wavelink nodes and put back the queues saved before the last shutdown """
         await self.client.wait_until_ready()
 
-        nodes = {
-            "MAIN": {
-                "host": "127.0.0.1",
-                "port": 2333,
-                "rest_uri": "http://127.0.0.1:2333",
-                "password": "youshallnotpass",
-                "identifier": "MAIN",
-                "region": "us_west"
-            }
-        }
+        if self.snapshots is None:
+            await self.nodes.start()
+            return
+
+        started = time.perf_counter()
+        saved = await self.client.loop.run_in_executor(None, self.snapshots.load, SNAPSHOT_MAX_AGE)
+        restored = []
+
+        def prepare(node):
+            restored.extend(self.prepare_players(node, saved))
+
+        self.nodes.on_connecting = prepare
+        await self.nodes.start()
+        self.nodes.on_connecting = None
+
+        if restored:
+            await self.restore_players(restored, started)
+
+        self._snapshot_task = self.client.loop.create_task(self.save_snapshots())
+
+    def prepare_players(self, node, saved):
+        """ Create the players saved on node before it connects, so that if lavalink
+            resumes the session its playerUpdates and events have somewhere to go """
+        players = []
+
+        for guild_id, snapshot in list(saved.items()):
+            if snapshot.node != node.identifier or self.client.get_guild(guild_id) is None:
+                continue
+
+            records = []
+            for id_ in snapshot.tracks:
+                try:
+                    records.append(TrackRecord.from_id(id_))
+                except ValueError:
+                    pass
+
+            if not records:
+                continue
+
+            player = Player(self.client, guild_id, node)
+            player.load_snapshot(snapshot, records)
+            if not self.players.add(player):
+                log.warning("No room to restore the queue of %d tracks for guild %s", len(records), guild_id)
+                continue
+
+            player.on_resize = self.players.resize
+            node.players[guild_id] = player
+            self._snapshotted[guild_id] = self._snapshot_key(player)
+            players.append(player)
+            del saved[guild_id]
+
+        return players
+
+    async def restore_players(self, players, started):
+        """ Give resumed sessions a moment to report in, then replay the rest """
+        deadline = time.perf_counter() + RESUME_GRACE
+        while time.perf_counter() < deadline and not all(p.synced for p in players):
+            await asyncio.sleep(0.05)
+
+        replayed = [p for p in players if not p.synced]
+        await asyncio.gather(*(p.replay() for p in replayed), return_exceptions=True)
+
+        took = time.perf_counter() - started
+        self.recovery_time.set(took)
+        log.info("Restored %d queues in %.2fs (%d resumed by lavalink, %d replayed)", len(players), took,
+                 len(players) - len(replayed), len(replayed))
+
+    @staticmethod
+    def _snapshot_key(player):
+        return player.queue.version, player.channel_id, player.volume, player.node.identifier
+
+    def collect_snapshots(self):
+        """ Work out what changed since the last save: whole snapshots for queues
+            that changed, track positions for the rest and guilds to forget """
+        snapshots, positions, current = [], [], set()
+
+        for guild_id, player in self.wavelink.players.items():
+            if player.queue.is_empty or player.channel_id is None:
+                continue
+
+            current.add(guild_id)
+            if self._snapshotted.get(guild_id) != (key := self._snapshot_key(player)):
+                snapshots.append(player.snapshot())
+                self._snapshotted[guild_id] = key
+            else:
+                positions.append((guild_id, int(player.track_position()), player.paused))
+
+        removed = self._snapshotted.keys() - current
+        for guild_id in removed:
+            del self._snapshotted[guild_id]
+
+        return snapshots, positions, removed
+
+    async def save_snapshots(self):
+        """ Save every guild's queue every snapshot_interval seconds """
+        while True:
+            await asyncio.sleep(self.client.snapshot_interval)
+            await self.client.loop.run_in_executor(None, self.snapshots.save, *self.collect_snapshots())
+
+    async def save_history(self):
+        """ Write the plays recorded in the history every HISTORY_WRITE_INTERVAL seconds """
+        while True:
+            await asyncio.sleep(HISTORY_WRITE_INTERVAL)
+            if rows := self.history.take():
+                await self.client.loop.run_in_executor(None, self.history.write, rows)
+
+    async def played_before(self, guild_id, terms):
+        """ Return a track from the guild's history whose title matches the search
+            terms, or None if nothing it's played does and lavalink has to search """
+        if self.history is None:
+            return None
+
+        if (index := self.history.index(guild_id)) is None:
+            # Searches that come in while the guild's index is being read wait for the same read
+            if (reading := self._index_reads.get(guild_id)) is None:
+                reading = self._index_reads[guild_id] = self.client.loop.create_task(self.read_index(guild_id))
+            index = await asyncio.shield(reading)
+
+        if (known := index.search(terms)) is None:
+            self.history_lookups.inc("miss")
+            return None
 
-        for node in nodes.values():
-            await self.wavelink.initiate_node(**node)
+        self.history_lookups.inc("hit")
+        return TrackRecord(known.id, known.title, known.length, known.uri)
+
+    async def read_index(self, guild_id):
+        try:
+            return self.history.set_index(guild_id, await self.client.loop.run_in_executor(
+                None, self.history.read_guild, guild_id))
+        finally:
+            del self._index_reads[guild_id]
+
+    async def sweep_players(self):
+        """ Tear down idle players every PLAYER_SWEEP_INTERVAL seconds """
+        while True:
+            await asyncio.sleep(PLAYER_SWEEP_INTERVAL)
+            if evicted := await self.players.evict_idle():
+                log.info("Evicted %d idle players, %d left using about %d KiB", evicted, len(self.players),
+                         self.players.memory // 1024)
 
     def get_player(self, obj):
-        """ Return the player that issued the command """
-        if isinstance(obj, commands.Context):
-            return self.wavelink.get_player(obj.guild.id, cls=Player, context=obj)
-        elif isinstance(obj, discord.Guild):
-            return self.wavelink.get_player(obj.id, cls=Player)
+        """ Return the guild's player, making one if it doesn't have one yet. Only for
+            commands that need a player, the rest use existing_player """
+        guild = obj.guild if isinstance(obj, commands.Context) else obj
+
+        if (player := self.players.get(guild.id)) is not None:
+            self.players.touch(player)
+            return player
+
+        player = self.wavelink.get_player(guild.id, cls=Player, node_id=self.nodes.best_identifier())
+        if not self.players.add(player):
+            del player.node.players[guild.id]
+            log.warning("Refused a player for guild %s, %d players are using about %d KiB", guild.id,
+                        len(self.players), self.players.memory // 1024)
+            raise PlayerLimitReached
+
+        player.on_resize = self.players.resize
+        return player
+
+    def existing_player(self, ctx):
+        """ Return the guild's player. A guild without one has nothing queued """
+        if (player := self.players.get(ctx.guild.id)) is None:
+            raise QueueIsEmpty
+
+        self.players.touch(player)
+        return player
 
     @commands.command(name="connect", aliases=["join"])
     async def connect_command(self, ctx, *, channel: t.Optional[discord.VoiceChannel]):
         """ Connect to a voice channel """
         player = self.get_player(ctx)
         channel = await player.connect(ctx, channel)
-        await ctx.send(f"```Connected to {channel.name}.```")
+        await self.client.outbox.send(ctx, f"```Connected to {channel.name}.```")
 
     @connect_command.error
     async def connect_command_error(self, ctx, exc):
         """ Display any errors related to the connect command """
         if isinstance(exc, AlreadyConnectedToChannel):
-            await ctx.send("Already connected to a voice channel")
+            await self.client.outbox.send(ctx, "Already connected to a voice channel", error=True)
         elif isinstance(exc, NoVoiceChannel):
-            await ctx.send("No suitable voice channel was provided")
+            await self.client.outbox.send(ctx, "No suitable voice channel was provided", error=True)
 
     @commands.command(name="disconnect", aliases=["leave"])
     async def disconnect_command(self, ctx):
         """ Disconnect from the current voice channel """
-        player = self.get_player(ctx)
-        await player.disconnect()
-        await ctx.send("Disconnected from voice chat")
+        if (player := self.players.get(ctx.guild.id)) is not None:
+            await player.disconnect()
+
+        await self.client.outbox.send(ctx, "Disconnected from voice chat")
 
     @commands.command(name="play")
     async def play_command(self, ctx, *, query: t.Optional[str]):
@@ -354,128 +1168,178 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
             if player.is_playing:
                 raise PlayerIsAlreadyPlaying
 
-            await player.set_pause(False)
-            await ctx.send("Playback resumed")
+            await player.perform(player.set_pause, False, merge=_latest)
+            await self.client.outbox.send(ctx, "Playback resumed")
 
         else:
             query = query.strip("<>")
             if not re.match(URL_REGEX, query):
+                if (known := await self.played_before(ctx.guild.id, query)) is not None:
+                    await player.add_tracks(ctx, [known])
+                    return
+
                 query = f"ytsearch:{query}"
+            elif not player.is_playing and (video := selected_video(query)) is not None:
+                await self.quick_start(ctx, player, query, video)
+                return
+
+            generation = player.generation
+            tracks = await self.tracks.get_tracks(query, self.wavelink.get_tracks)
+
+            if player.generation == generation:
+                await player.add_tracks(ctx, tracks)
+
+    async def quick_start(self, ctx, player, query, video):
+        """ Lavalink only answers for a playlist once it has loaded every page of it,
+            so play the video the link points at while the rest of the playlist loads """
+        generation = player.generation
+        # Left to finish even if this command fails, other guilds may be waiting on the same lookup
+        playlist = self.client.loop.create_task(self.tracks.get_tracks(query, self.wavelink.get_tracks))
+        playlist.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        first = await self.tracks.get_tracks(video, self.wavelink.get_tracks)
+        if isinstance(first, list) and first and player.generation == generation:
+            await player.add_tracks(ctx, first[:1])
+        else:
+            first = None
+
+        tracks = await playlist
+
+        if player.generation != generation:
+            return
 
-            await player.add_tracks(ctx, await self.wavelink.get_tracks(query))
+        if first is None:
+            await player.add_tracks(ctx, tracks)
+        elif isinstance(tracks, wavelink.TrackPlaylist):
+            player.add_playlist(tracks.tracks, skip=first[0].identifier)
 
     @play_command.error
     async def play_command_error(self, ctx, exc):
         """ Display any errors related to the play command """
         if isinstance(exc, QueueIsEmpty):
-            await ctx.send("Queue is empty")
+            await self.client.outbox.send(ctx, "Queue is empty", error=True)
 
         if isinstance(exc, NoVoiceChannel):
-            await ctx.send("Please join a voice channel before playing music")
+            await self.client.outbox.send(ctx, "Please join a voice channel before playing music", error=True)
 
     @commands.command(name="pause")
     async def pause_command(self, ctx):
         """ Pause playback """
-        player = self.get_player(ctx)
+        player = self.existing_player(ctx)
 
         if player.is_paused:
             raise PlayerIsAlreadyPaused
 
-        await player.set_pause(True)
-        await ctx.send("Playback paused")
+        await player.perform(player.set_pause, True, merge=_latest)
+        await self.client.outbox.send(ctx, "Playback paused")
 
     @pause_command.error
     async def pause_command_error(self, ctx, exc):
         """ Display any errors related to the pause command """
         if isinstance(exc, PlayerIsAlreadyPaused):
-            await ctx.send("Playback is already paused")
+            await self.client.outbox.send(ctx, "Playback is already paused", error=True)
+
+        if isinstance(exc, QueueIsEmpty):
+            await self.client.outbox.send(ctx, "Nothing is playing", error=True)
 
     @commands.command(name="stop")
     async def stop_command(self, ctx):
         """ Stop playback and clear the queue """
-        player = self.get_player(ctx)
-        player.queue.empty()
-        await player.stop()
-        await ctx.send("Playback stopped")
+        if (player := self.players.get(ctx.guild.id)) is not None:
+            player.cancel_loading()
+            await player.perform(player.clear, merge=_latest)
+
+        await self.client.outbox.send(ctx, "Playback stopped")
 
     @commands.command(name="skip", aliases=["next"])
     async def skip_command(self, ctx):
         """ Skip to the next track in the queue """
-        player = self.get_player(ctx)
+        player = self.existing_player(ctx)
 
         if not player.queue.up_next:
             raise NoMoreTracks
 
-        await player.stop()
-        await ctx.send("Playing next track in queue")
+        await player.perform(player.jump, 1, merge=_add_offsets)
+        await self.client.outbox.send(ctx, "Playing next track in queue")
 
     @skip_command.error
     async def skip_command_error(self, ctx, exc):
         """ Display any errors related to the skip command"""
         if isinstance(exc, QueueIsEmpty):
-            await ctx.send("Could not skip as the queue is currently empty")
+            await self.client.outbox.send(ctx, "Could not skip as the queue is currently empty", error=True)
 
         if isinstance(exc, NoMoreTracks):
-            await ctx.send("Could not skip as there are no more tracks in the queue")
+            await self.client.outbox.send(ctx, "Could not skip as there are no more tracks in the queue", error=True)
 
     @commands.command(name="back", aliases=["previous"])
     async def back_command(self, ctx):
         """ Go back to the previous track in the queue """
-        player = self.get_player(ctx)
+        player = self.existing_player(ctx)
 
         if not player.queue.history:
             raise NoPreviousTracks
 
-        player.queue.position -= 2
-        await player.stop()
-        await ctx.send("Playing previous track in queue")
+        await player.perform(player.jump, -1, merge=_add_offsets)
+        await self.client.outbox.send(ctx, "Playing previous track in queue")
 
     @back_command.error
     async def back_command_error(self, ctx, exc):
         """ Display any errors related to the back command """
         if isinstance(exc, QueueIsEmpty):
-            await ctx.send("Could not go back as the queue is currently empty")
+            await self.client.outbox.send(ctx, "Could not go back as the queue is currently empty", error=True)
 
         if isinstance(exc, NoPreviousTracks):
-            await ctx.send("Could not go back as there are no previous tracks to go to")
+            await self.client.outbox.send(ctx, "Could not go back as there are no previous tracks to go to", error=True)
 
     @commands.command(name="shuffle")
     async def shuffle_command(self, ctx):
         """ Shuffle the upcoming tracks in the queue """
-        player = self.get_player(ctx)
+        player = self.existing_player(ctx)
 
         player.queue.shuffle()
-        await ctx.send("Shuffled queue")
+        await self.client.outbox.send(ctx, "Shuffled queue")
 
     @shuffle_command.error
     async def shuffle_command_error(self, ctx, exc):
         """ Display any errors related to the shuffle command """
         if isinstance(exc, QueueIsEmpty):
-            await ctx.send("Couldn't shuffle queue as the queue is currently empty")
+            await self.client.outbox.send(ctx, "Couldn't shuffle queue as the queue is currently empty", error=True)
 
     @commands.command(name="repeat", aliases=["loop"])
     async def repeat_command(self, ctx, mode: str):
         """ Set the music to repeat 1 song or the whole queue """
-        player = self.get_player(ctx)
+        player = self.existing_player(ctx)
 
         if mode not in ("none", "1", "all"):
             raise InvalidRepeatMode
 
         player.queue.set_repeat_mode(mode)
 
-        await ctx.send(f"The repeat mode has been set to {mode}")
+        await self.client.outbox.send(ctx, f"The repeat mode has been set to {mode}")
+
+    @repeat_command.error
+    async def repeat_command_error(self, ctx, exc):
+        """ Display any errors related to the repeat command """
+        if isinstance(exc, QueueIsEmpty):
+            await self.client.outbox.send(ctx, "Couldn't set the repeat mode as the queue is currently empty",
+                                          error=True)
+
+        if isinstance(exc, InvalidRepeatMode):
+            await self.client.outbox.send(ctx, "The repeat mode has to be none, 1 or all", error=True)
 
     @commands.command(name="queue")
-    async def queue_command(self, ctx, show: t.Optional[int] = 10):
-        """ Show the specified number of tracks. Defaults to 10 """
-        player = self.get_player(ctx)
+    async def queue_command(self, ctx, page: t.Optional[int] = 1):
+        """ Show a page of the upcoming tracks. Defaults to the first page """
+        player = self.existing_player(ctx)
 
         if player.queue.is_empty:
             raise QueueIsEmpty
 
+        page, pages, listing = player.queue.page(page)
+
         embed = discord.Embed(
             title="Queue",
-            description=f"Showing up to the next {show} tracks",
+            description=f"Page {page} of {pages} ({len(player.queue.up_next)} tracks up next)",
             colour=ctx.author.colour,
             timestamp=dt.datetime.utcnow()
         )
@@ -483,23 +1347,24 @@ class Music(commands.Cog, wavelink.WavelinkMixin):
         embed.set_footer(text=f"Requested by {ctx.author.display_name}", icon_url=ctx.author.avatar_url)
         embed.add_field(
             name="Currently playing",
-            value=getattr(player.queue.current_track, "title", "No tracks are currently playing "),
+            value=_shorten(getattr(player.queue.current_track, "title", "No tracks are currently playing "),
+                           EMBED_FIELD_LENGTH),
             inline=False
         )
-        if up_next := player.queue.up_next[:show]:
+        if listing:
             embed.add_field(
                 name="Next up",
-                value="\n".join(track.title for track in up_next),
+                value=listing,
                 inline=False
             )
 
-        await ctx.send(embed=embed)
+        await self.client.outbox.send(ctx, embed=embed)
 
     @queue_command.error
     async def queue_command_error(self, ctx, exc):
         """ Display any errors related to the queue command """
         if isinstance(exc, QueueIsEmpty):
-            await ctx.send("The queue is currently empty")
+            await self.client.outbox.send(ctx, "The queue is currently empty", error=True)
 
 
 def setup(client):
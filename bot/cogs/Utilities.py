@@ -8,14 +8,15 @@ Copyright © Shock9616 2021 All rights reserved
 
 import datetime as dt
 import random
-import smtplib
 from email.mime.text import MIMEText as text
 
 import discord
-import wikipedia
-import wolframalpha
 from discord.ext import commands
 
+from bot.bot import MAX_PREFIX_LENGTH, valid_prefix
+from bot.mail import MailDispatcher
+from bot.search import SearchBackend
+
 
 # ---------- Custom Error Classes ----------
 class NoAddressesProvided(commands.CommandError):
@@ -26,9 +27,20 @@ class NoSearchResults(commands.CommandError):
     pass
 
 
+class InvalidPrefix(commands.CommandError):
+    pass
+
+
 class Utilities(commands.Cog):
     def __init__(self, client):
         self.client = client
+        self.backend = SearchBackend(client.wolfram_app_id)
+        self.mail = MailDispatcher(client.email, client.passwd, host=client.smtp_host, port=client.smtp_port)
+        self.mail.start(client.loop)
+
+    def cog_unload(self):
+        self.client.loop.create_task(self.backend.close())
+        self.client.loop.create_task(self.mail.close())
 
     # ----- Commands -----
 
@@ -40,63 +52,91 @@ class Utilities(commands.Cog):
 
         link = await ctx.channel.create_invite(max_uses=len(recipients))
 
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(self.client.email, self.client.passwd)
-
-        msg = text(str("Greetings earthling!\n\n" + str(ctx.author) + " has invited you to join the " + str(
+        body = str("Greetings earthling!\n\n" + str(ctx.author) + " has invited you to join the " + str(
             ctx.guild) + " discord server.\nClick the link below to accept the invitation.\n" + str(
-            link) + "\n\nHope to talk to you soon!\n" + str(ctx.guild) + "."))
-        msg["Subject"] = str("Invite to " + str(ctx.guild))
-        msg["From"] = self.client.email
+            link) + "\n\nHope to talk to you soon!\n" + str(ctx.guild) + ".")
 
-        for i in range(len(recipients)):
-            msg["To"] = recipients[i]
-            server.sendmail(self.client.email, recipients[i], msg.as_string())
-
-        server.quit()
+        for recipient in recipients:
+            msg = text(body)
+            msg["Subject"] = str("Invite to " + str(ctx.guild))
+            msg["From"] = self.client.email
+            msg["To"] = recipient
+            await self.mail.send(msg)
 
         if len(recipients) > 1:
-            response = "Sent invite email to "
+            response = "Queued invite emails to "
             for i in range(len(recipients)):
                 if i == len(recipients) - 1:
                     response = response + "and " + recipients[i]
                 else:
                     response = response + recipients[i] + ", "
         else:
-            response = "Sent invite email to " + recipients[0]
+            response = "Queued an invite email to " + recipients[0]
 
-        await ctx.send({response})
+        await self.client.outbox.send(ctx, response)
 
     @invite_command.error
     async def invite_command_error(self, ctx, exc):
         """ Display any errors related to the invite command """
         if isinstance(exc, NoAddressesProvided):
-            await ctx.send("Please provide at least 1 email address")
+            await self.client.outbox.send(ctx, "Please provide at least 1 email address", error=True)
+
+    @commands.command(name="prefix")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def prefix_command(self, ctx, prefix: str = None):
+        """ Change the command prefix for this server. Leave it blank to reset it """
+        if prefix is not None and not valid_prefix(prefix):
+            raise InvalidPrefix
+
+        self.client.set_prefix(ctx.guild.id, prefix)
+        await self.client.outbox.send(ctx, f"The command prefix is now {self.client.prefix_for(ctx.message)}")
+
+    @prefix_command.error
+    async def prefix_command_error(self, ctx, exc):
+        """ Display any errors related to the prefix command """
+        if isinstance(exc, commands.MissingPermissions):
+            await self.client.outbox.send(ctx, "You need the Manage Server permission to change the prefix", error=True)
+        elif isinstance(exc, InvalidPrefix):
+            await self.client.outbox.send(ctx, f"The prefix has to be 1 to {MAX_PREFIX_LENGTH} characters with no "
+                                               f"spaces", error=True)
+
+    @commands.command(name="stats")
+    async def stats_command(self, ctx):
+        """ Show how many servers and music players the bot has across all of its clusters """
+        if self.client.cluster is not None:
+            clusters = await self.client.cluster.all_stats()
+        else:
+            clusters = {0: self.client.cluster_stats()}
+
+        embed = discord.Embed(
+            title="Stats",
+            colour=ctx.author.colour,
+            timestamp=dt.datetime.utcnow()
+        )
+        embed.set_footer(text=f"Requested by {ctx.author.display_name}", icon_url=ctx.author.avatar_url)
+        embed.add_field(name="Servers", value=str(sum(c["guilds"] for c in clusters.values())))
+        embed.add_field(name="Music players", value=str(sum(c.get("players", 0) for c in clusters.values())))
+        embed.add_field(name="Clusters", value=str(len(clusters)))
+        embed.add_field(name="Shards", value=str(sum(len(c["shards"]) for c in clusters.values())))
+
+        await self.client.outbox.send(ctx, embed=embed)
 
     @commands.command(name="rand", aliases=["random"])
     async def random_number_command(self, ctx, minimum: int = 0, maximum: int = 10):
         """ Generate a random integer and send it in a message.
             Defaults to a random number between 0 and 10 """
         random_int = str(random.randint(minimum, maximum))
-        await ctx.send(f"Your random number is {random_int}")
+        await self.client.outbox.send(ctx, f"Your random number is {random_int}")
 
     @commands.command(name="search", aliases=["ask"])
     async def search_command(self, ctx, *query: str):
         """ Search for literally anything
         The bot isn't always correct but it will certainly try its best to be """
-        # TODO: Import wolfram api key from config/secrets instead of hard-coding it
-        wolf = wolframalpha.Client("AA92HA-R4TPUE59R9")
         query = " ".join(query)
 
-        try:
-            res = wolf.query(query)
-            answer = next(res.results).text
-        except (StopIteration, AttributeError):
-            try:
-                answer = wikipedia.summary(query, sentences=2)
-            except wikipedia.exceptions.PageError:
-                raise NoSearchResults
+        if (answer := await self.backend.search(query)) is None:
+            raise NoSearchResults
 
         embed = discord.Embed(
             title=query,
@@ -106,13 +146,13 @@ class Utilities(commands.Cog):
         embed.set_footer(text=f"Requested by {ctx.author.display_name}", icon_url=ctx.author.avatar_url)
         embed.add_field(name="Search Results", value=answer, inline=False)
 
-        await ctx.send(embed=embed)
+        await self.client.outbox.send(ctx, embed=embed)
 
     @search_command.error
     async def search_command_error(self, ctx, exc):
         """ Display any errors related to the search command """
         if isinstance(exc, NoSearchResults):
-            await ctx.send("Unable to find any search results")
+            await self.client.outbox.send(ctx, "Unable to find any search results", error=True)
 
 
 def setup(client):
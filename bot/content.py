@@ -0,0 +1,104 @@
+"""
+content.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import os
+import random
+import time
+from array import array
+from pathlib import Path
+
+
+class LineFile:
+    """ A text file read into memory once, with an index of where each
+        non-blank line starts and ends so any line can be read in O(1).
+        The file is reloaded if its mtime changes, and a missing file reads as empty """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._data = b""
+        self._starts = array("Q")
+        self._ends = array("Q")
+        self._mtime = None
+        self._checked = 0
+        self.load()
+
+    def __len__(self):
+        self._check()
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        self._check()
+        return self._data[self._starts[index]:self._ends[index]].decode("utf-8")
+
+    def load(self):
+        """ (Re)read the file and rebuild the line index """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            mtime, data = None, b""
+
+        starts, ends = array("Q"), array("Q")
+        start = 0
+        while start < len(data):
+            if (end := data.find(b"\n", start)) == -1:
+                end = len(data)
+            line_end = end - 1 if end > start and data[end - 1] == 13 else end
+            if data[start:line_end].strip():
+                starts.append(start)
+                ends.append(line_end)
+            start = end + 1
+
+        self._data, self._starts, self._ends = data, starts, ends
+        self._mtime = mtime
+        self._checked = time.monotonic()
+
+    def random_line(self):
+        """ Return a random non-blank line, or None if the file has none """
+        self._check()
+
+        if not self._starts:
+            return None
+
+        i = random.randrange(len(self._starts))
+        return self._data[self._starts[i]:self._ends[i]].decode("utf-8")
+
+    def _check(self):
+        if time.monotonic() - self._checked < self.check_interval:
+            return
+
+        self._checked = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime != self._mtime:
+            self.load()
+
+
+class ContentStore:
+    """ Shared access to the line based data files (data/jokes.txt, data/verses.txt, ...).
+        Each file is loaded the first time it's asked for and kept afterwards """
+
+    def __init__(self, directory="data"):
+        self.directory = Path(directory)
+        self._files = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._files[name]
+        except KeyError:
+            file = self._files[name] = LineFile(self.directory / f"{name}.txt")
+            return file
+
+    def random_line(self, name):
+        """ Return a random non-blank line of the file, or None if it's empty or missing """
+        return self[name].random_line()
@@ -0,0 +1,28 @@
+"""
+db.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import sqlite3
+
+# Seconds a write waits for another process's write to finish before giving up
+BUSY_TIMEOUT = 10
+
+
+def connect(path):
+    """ Open one of the bot's SQLite files. With clusters, every cluster process has
+        the same files open, so they're in WAL mode to let the others read while one
+        writes, and writers wait for each other instead of failing.
+
+        Nothing coordinates the writes beyond that, so every store keeps to this:
+        a cluster only writes rows for guilds on its own shards (prefixes, queues,
+        plays), and rows any cluster might write (cached lookups, history's tracks)
+        hold the same data whichever cluster writes them. Writes are per row, never
+        a rewrite of everything, and what's kept in memory is only read back for the
+        cluster's own guilds, so no cluster needs to hear about another's writes """
+    db = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    return db
@@ -0,0 +1,246 @@
+"""
+history.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import math
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from . import db
+
+WORD = re.compile(r"\w+")
+# "(Official Video)", "[Lyrics]" and the like, which nobody searches for
+BRACKETED = re.compile(r"\([^)]*\)|\[[^]]*]")
+
+
+def trigrams(text):
+    """ The set of three character chunks of a title or query, ignoring case, punctuation
+        and anything in brackets """
+    text = f" {' '.join(WORD.findall(BRACKETED.sub(' ', text).casefold()))} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class KnownTrack:
+    __slots__ = ("id", "title", "length", "uri", "plays", "grams")
+
+    def __init__(self, id_, title, length, uri, plays, grams):
+        self.id = id_
+        self.title = title
+        self.length = length
+        self.uri = uri
+        self.plays = plays
+        self.grams = grams
+
+
+class GuildIndex:
+    """ Trigram index over the titles of every track a guild has played """
+
+    def __init__(self):
+        self.tracks = {}
+        self._postings = defaultdict(set)
+        # Plays numbered below this were in the database when the index was read from it
+        self.seen = 0
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def add(self, id_, title, length, uri, plays=1):
+        if (known := self.tracks.get(id_)) is not None:
+            known.plays += plays
+            return
+
+        grams = trigrams(title)
+        self.tracks[id_] = KnownTrack(id_, title, length, uri, plays, len(grams))
+        for gram in grams:
+            self._postings[gram].add(id_)
+
+    def search(self, terms, threshold=0.85, similarity=0.7, min_grams=4):
+        """ Return the known track whose title contains the largest share of the
+            query's trigrams, if that share is at least threshold and the title isn't
+            much longer than the query (the Dice coefficient of their trigrams is at
+            least similarity). Ties go to the closer title, then the more played track """
+        query = sorted(trigrams(terms), key=lambda g: len(self._postings.get(g, ())))
+        if len(query) < min_grams:
+            return None
+
+        # A title missing at most `allowed` of the query's trigrams has to have one of
+        # the rarest allowed + 1, so only those postings are read for candidates, and a
+        # candidate is dropped as soon as it's missing too many
+        allowed = len(query) - math.ceil(len(query) * threshold)
+        postings = [self._postings.get(g, ()) for g in query]
+        candidates = set().union(*postings[:allowed + 1])
+
+        best, best_key = None, None
+        for id_ in candidates:
+            missed = 0
+            for posting in postings:
+                if id_ not in posting:
+                    missed += 1
+                    if missed > allowed:
+                        break
+            else:
+                common = len(query) - missed
+                known = self.tracks[id_]
+                key = (common, 2 * common / (len(query) + known.grams), known.plays)
+                if key[1] >= similarity and (best_key is None or key > best_key):
+                    best, best_key = known, key
+
+        return best
+
+
+class _Batch:
+    """ Plays taken for writing, numbered start to end in the order they were recorded """
+    __slots__ = ("rows", "start", "end", "written")
+
+    def __init__(self, rows, start):
+        self.rows = rows
+        self.start = start
+        self.end = start + len(rows)
+        self.written = False
+
+
+class PlayHistory:
+    """ Every track each guild has played, in SQLite, with a trigram index of a
+        guild's titles kept in memory once it's been searched, for at most
+        max_guilds guilds and each guild's max_tracks most played tracks. Plays are
+        buffered and written in batches by whoever calls take and write, in the
+        order they were taken. Batches are kept until every index read from the
+        database before they were written has had them added """
+
+    def __init__(self, path, max_guilds=256, max_tracks=20_000):
+        self.max_guilds = max_guilds
+        self.max_tracks = max_tracks
+        self._indexes = OrderedDict()
+        self._unsaved = []
+        self._taken = deque()
+        # The number the next play taken will have
+        self._next = 0
+        # What the indexes being read from the database have seen
+        self._reading = []
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS tracks (id INTEGER PRIMARY KEY, track TEXT UNIQUE, title TEXT,
+                                               length INTEGER, uri TEXT);
+            CREATE TABLE IF NOT EXISTS plays (guild_id INTEGER, track_id INTEGER, plays INTEGER,
+                                              last_played REAL, PRIMARY KEY (guild_id, track_id)) WITHOUT ROWID;
+        """)
+        self._db.commit()
+
+    def record(self, guild_id, track):
+        """ Note that a guild played a track (anything with id, title, length and uri) """
+        row = (guild_id, track.id, track.title, track.length, getattr(track, "uri", None), time.time())
+        self._unsaved.append(row)
+
+        if (index := self._indexes.get(guild_id)) is not None:
+            index.add(track.id, track.title, track.length, row[4])
+
+    def index(self, guild_id):
+        """ Return the guild's index if it's in memory, otherwise None """
+        if (index := self._indexes.get(guild_id)) is not None:
+            self._indexes.move_to_end(guild_id)
+
+        return index
+
+    def set_index(self, guild_id, index):
+        """ Keep an index built by read_guild, adding the plays that weren't in the
+            database when it was read: ones still being written, written since or not
+            taken yet """
+        with self._lock:
+            if index.seen in self._reading:
+                self._reading.remove(index.seen)
+            batches = [batch for batch in self._taken if batch.end > index.seen]
+            self._forget_written()
+
+        for batch in batches:
+            for row in batch.rows[max(0, index.seen - batch.start):]:
+                if row[0] == guild_id:
+                    index.add(*row[1:5])
+
+        for row in self._unsaved:
+            if row[0] == guild_id:
+                index.add(*row[1:5])
+
+        self._indexes[guild_id] = index
+        while len(self._indexes) > self.max_guilds:
+            self._indexes.popitem(last=False)
+
+        return index
+
+    def read_guild(self, guild_id):
+        """ Build a guild's index from the database. Safe to call from a worker thread """
+        with self._lock:
+            rows = self._db.execute("SELECT t.track, t.title, t.length, t.uri, p.plays FROM plays p "
+                                    "JOIN tracks t ON t.id = p.track_id WHERE p.guild_id = ? "
+                                    "ORDER BY p.plays DESC, p.last_played DESC LIMIT ?",
+                                    (guild_id, self.max_tracks)).fetchall()
+            # Writes are in order, so every play before the first batch not written yet is in rows
+            seen = next((batch.start for batch in self._taken if not batch.written), self._next)
+            self._reading.append(seen)
+
+        index = GuildIndex()
+        index.seen = seen
+        for row in rows:
+            index.add(*row)
+
+        return index
+
+    def take(self):
+        """ Return the plays recorded since the last call, for write """
+        rows, self._unsaved = self._unsaved, []
+
+        with self._lock:
+            if rows:
+                self._taken.append(_Batch(rows, self._next))
+                self._next += len(rows)
+
+        return rows
+
+    def write(self, rows):
+        """ Save plays returned by take. Safe to call from a worker thread. Does
+            nothing if close has already written them """
+        with self._lock:
+            for batch in self._taken:
+                if batch.rows is rows and not batch.written:
+                    self._write(batch)
+                    break
+
+            self._forget_written()
+
+    def close(self):
+        """ Write every play not written yet, including ones taken by a write that
+            hasn't run, then close the database. Waits for a write in progress """
+        self.take()
+
+        with self._lock:
+            for batch in self._taken:
+                if not batch.written:
+                    self._write(batch)
+
+            self._db.close()
+            self._db = None
+
+    def _write(self, batch):
+        if self._db is None:
+            return
+
+        with self._db:
+            self._db.executemany("INSERT OR IGNORE INTO tracks (track, title, length, uri) VALUES (?, ?, ?, ?)",
+                                 [row[1:5] for row in batch.rows])
+            self._db.executemany("INSERT INTO plays SELECT ?, id, 1, ? FROM tracks WHERE track = ? "
+                                 "ON CONFLICT (guild_id, track_id) DO UPDATE SET plays = plays + 1, "
+                                 "last_played = excluded.last_played",
+                                 [(row[0], row[5], row[1]) for row in batch.rows])
+        batch.written = True
+
+    def _forget_written(self):
+        """ Drop written batches no index being read still needs. Called holding the lock """
+        oldest = min(self._reading, default=self._next)
+        while self._taken and self._taken[0].written and self._taken[0].end <= oldest:
+            self._taken.popleft()
@@ -0,0 +1,60 @@
+"""
+loader.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import ast
+from pathlib import Path
+
+COMMAND_DECORATORS = {"commands.command", "commands.group"}
+
+
+class CogInfo:
+    """ What the bot needs to know about a cog before importing it """
+    __slots__ = ("name", "path", "commands", "listeners", "mtime")
+
+    def __init__(self, name, path, commands, listeners, mtime):
+        self.name = name
+        self.path = path
+        self.commands = commands
+        self.listeners = listeners
+        self.mtime = mtime
+
+
+def _dotted(node):
+    if isinstance(node, ast.Attribute):
+        return f"{_dotted(node.value)}.{node.attr}"
+
+    return getattr(node, "id", "")
+
+
+def scan_cog(path):
+    """ Read the names and aliases of a cog's top level commands, and whether it
+        listens for any events, from its source without importing it """
+    path = Path(path)
+    tree = ast.parse(path.read_text(), filename=str(path))
+    names, listeners = [], False
+
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+
+        for decorator in node.decorator_list:
+            if not isinstance(decorator, ast.Call):
+                continue
+
+            func = _dotted(decorator.func)
+            if func.endswith(".listener"):
+                listeners = True
+
+            elif func in COMMAND_DECORATORS:
+                kwargs = {k.arg: k.value for k in decorator.keywords}
+                name = kwargs.get("name", decorator.args[0] if decorator.args else None)
+                names.append(node.name if name is None else ast.literal_eval(name))
+                if "aliases" in kwargs:
+                    names.extend(ast.literal_eval(kwargs["aliases"]))
+
+    return CogInfo(path.stem, path, [name.lower() for name in names], listeners, path.stat().st_mtime)
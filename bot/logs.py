@@ -0,0 +1,217 @@
+"""
+logs.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import datetime as dt
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+# Fields added to every record logged while handling a command or player event
+_context = contextvars.ContextVar("log_context", default={})
+# The same fields, by task, for the tasks inside a log_context block
+_task_context = {}
+
+# Libraries that log every gateway and lavalink event at INFO or below
+QUIET = ("discord", "wavelink")
+
+# The running pipeline, if start_logging has been called in this process
+pipeline = None
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """ Add fields to every record logged inside the block, including from tasks it starts """
+    context = {**_context.get(), **fields}
+    token = _context.set(context)
+
+    # A task's context can't be read from outside it, so the profiler's thread finds them here
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    outer = _task_context.get(task)
+    if task is not None:
+        _task_context[task] = context
+
+    try:
+        yield
+    finally:
+        _context.reset(token)
+        if task is not None and outer is None:
+            _task_context.pop(task, None)
+        elif task is not None:
+            _task_context[task] = outer
+
+
+def task_context(task):
+    """ The fields added by the innermost log_context block a task is in. Safe to
+        call from other threads. Tasks started inside the block aren't included """
+    return _task_context.get(task, {})
+
+
+class ContextQueueHandler(QueueHandler):
+    """ Runs on the event loop: finishes the record with the current context and
+        hands it to the writer thread. Drops it rather than blocking if the writer
+        has fallen maxsize records behind, or twice that for WARNING and above so
+        they aren't lost to a flood of less important records. Sampling is done by
+        a filter on this handler, so records sampled out are never formatted or
+        queued """
+
+    def __init__(self, records, maxsize):
+        super().__init__(records)
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Arguments are formatted now, they might change before the writer gets to them
+        record.msg = record.getMessage()
+        record.args = None
+        record.context = _context.get()
+
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+    def enqueue(self, record):
+        # A SimpleQueue, which is cheaper to put to than a Queue but has no maxsize of its own
+        if self.queue.qsize() >= (self.maxsize if record.levelno < logging.WARNING else self.maxsize * 2):
+            self.dropped += 1
+        else:
+            self.queue.put_nowait(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """ One JSON object per line, with the record's context as top level fields """
+
+    def format(self, record):
+        entry = {
+            "time": dt.datetime.fromtimestamp(record.created, dt.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "context", {})
+        }
+
+        if (sampled := getattr(record, "sampled", 1)) > 1:
+            entry["sampled"] = sampled
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """ The plain lines the bot used to print, with the context on the end """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record):
+        line = super().format(record)
+        if context := getattr(record, "context", None):
+            line += " [" + " ".join(f"{k}={v}" for k, v in context.items()) + "]"
+
+        return line
+
+
+class SampleFilter(logging.Filter):
+    """ Keeps one in every n records below WARNING from each of the given loggers
+        (and their children), noting n on the records it keeps. The counts aren't
+        locked, records logged from other threads at the same moment can make a
+        sample a little off """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._seen = dict.fromkeys(rates, 0)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        name = record.name
+        while name not in self.rates:
+            if "." not in name:
+                return True
+            name = name.rsplit(".", 1)[0]
+
+        seen = self._seen[name]
+        self._seen[name] += 1
+        record.sampled = self.rates[name]
+        return seen % self.rates[name] == 0
+
+
+class LogPipeline:
+    def __init__(self, handler, listener):
+        self.handler = handler
+        self.listener = listener
+
+    @property
+    def dropped(self):
+        return self.handler.dropped
+
+    @property
+    def pending(self):
+        return self.handler.queue.qsize()
+
+    def stop(self):
+        """ Write out everything still queued and detach from the root logger """
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+def start_logging(path=None, level=logging.INFO, console=True, sample=None, max_bytes=50 * 2 ** 20, backups=10,
+                  maxsize=10_000):
+    """ Send every log record through a queue to a writer thread, which writes JSON
+        lines to path (rotated at max_bytes, keeping backups old files) and plain
+        lines to stdout. sample maps logger names to n, to keep one in n of their
+        records below WARNING. Replaces a pipeline started earlier in the process,
+        e.g. one inherited by a cluster's forked process, whose thread didn't come
+        with it """
+    global pipeline
+
+    if pipeline is not None:
+        logging.getLogger().removeHandler(pipeline.handler)
+
+    handlers = []
+    if path is not None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        file = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        file.setFormatter(JsonFormatter())
+        handlers.append(file)
+
+    if console:
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(ConsoleFormatter())
+        handlers.append(stream)
+
+    handler = ContextQueueHandler(queue.SimpleQueue(), maxsize)
+    if sample:
+        handler.addFilter(SampleFilter(sample))
+    listener = QueueListener(handler.queue, *handlers)
+    listener.start()
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level)
+    for name in QUIET:
+        logging.getLogger(name).setLevel(max(root.level, logging.WARNING))
+
+    pipeline = LogPipeline(handler, listener)
+    return pipeline
@@ -0,0 +1,181 @@
+"""
+mail.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import logging
+import smtplib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class MailDispatcher:
+    """ Send queued emails in the background over one SMTP connection
+        that is kept open and reused between batches. smtplib is blocking,
+        so every SMTP call happens on a single worker thread """
+
+    def __init__(self, user, passwd, host="smtp.gmail.com", port=587, starttls=True,
+                 batch_size=20, idle_timeout=60, retries=4, max_queue=1000):
+        self.user = user
+        self.passwd = passwd
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.retries = retries
+        self.sent = 0
+        self.failed = 0
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mail")
+        self._server = None
+        self._task = None
+        # What's left of the batch being sent
+        self._sending = ()
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def start(self, loop):
+        if self._task is None:
+            self._task = loop.create_task(self._run())
+
+    async def send(self, msg):
+        """ Queue a message to be sent. Returns straight away unless the queue is full """
+        await self._queue.put(msg)
+
+    async def close(self, timeout=10):
+        """ Stop once everything queued has been sent, or after timeout seconds.
+            Each email that's still waiting then is logged as dropped """
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            self._task.cancel()
+            self._task = None
+
+        dropped = [*self._sending]
+        while not self._queue.empty():
+            dropped.append(self._queue.get_nowait())
+
+        self.failed += len(dropped)
+        for msg in dropped:
+            log.warning("Dropped email to %s, the mail dispatcher closed before it was sent", msg["To"])
+
+        # Not waited for, the worker may still be stuck in the send that timed out
+        self._executor.submit(self._disconnect)
+        self._executor.shutdown(wait=False)
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+
+        while True:
+            try:
+                batch = [await asyncio.wait_for(self._queue.get(), self.idle_timeout)]
+            except asyncio.TimeoutError:
+                await loop.run_in_executor(self._executor, self._disconnect)
+                continue
+
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            await self._deliver(loop, batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _deliver(self, loop, batch):
+        """ Send a batch, retrying what's left with backoff after transient failures """
+        batch = self._sending = deque(batch)
+        delay = 1
+
+        for attempt in range(self.retries + 1):
+            try:
+                await loop.run_in_executor(self._executor, self._send_batch, batch)
+            except smtplib.SMTPAuthenticationError as e:
+                log.error("Couldn't log in to %s, dropping %d email(s): %s", self.host, len(batch), e)
+                break
+            except (smtplib.SMTPException, OSError) as e:
+                log.warning("Sending email failed (%s), retrying %d email(s) in %ss", e, len(batch), delay)
+                await loop.run_in_executor(self._executor, self._disconnect)
+
+            if not batch:
+                self._sending = ()
+                return
+
+            if attempt < self.retries:
+                await asyncio.sleep(delay)
+                delay *= 2
+
+        self._sending = ()
+        self.failed += len(batch)
+        log.error("Gave up sending %d email(s)", len(batch))
+
+    def _send_batch(self, batch):
+        """ Runs on the worker thread. Messages are taken off the batch as
+            they're sent, so whatever is left in it afterwards (temporary 4xx
+            rejections, or everything after a dropped connection) gets retried """
+        server = self._connect()
+
+        for _ in range(len(batch)):
+            msg = batch.popleft()
+
+            try:
+                refused = server.send_message(msg)
+            except smtplib.SMTPRecipientsRefused as e:
+                refused = e.recipients
+            except smtplib.SMTPResponseException as e:
+                if 400 <= e.smtp_code < 500:
+                    batch.append(msg)
+                else:
+                    self.failed += 1
+                    log.warning("Email to %s was rejected: %s %s", msg["To"], e.smtp_code, e.smtp_error)
+                continue
+            except (smtplib.SMTPException, OSError):
+                batch.appendleft(msg)
+                raise
+
+            if any(400 <= code < 500 for code, _ in refused.values()):
+                batch.append(msg)
+            elif refused:
+                self.failed += 1
+                log.warning("Email to %s was rejected", ", ".join(refused))
+            else:
+                self.sent += 1
+
+    def _connect(self):
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._disconnect()
+
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            server.starttls()
+        if self.passwd:
+            server.login(self.user, self.passwd)
+
+        self._server = server
+        return server
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+
+        self._server = None
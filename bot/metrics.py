@@ -0,0 +1,202 @@
+"""
+metrics.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import bisect
+import logging
+import math
+import time
+from collections import defaultdict
+
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+
+    def header(self):
+        return f"# HELP {self.name} {self.doc}\n# TYPE {self.name} {self.kind}\n"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, doc, labels=()):
+        super().__init__(name, doc, labels)
+        self._values = defaultdict(float)
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] += amount
+
+    def expose(self):
+        return "".join(f"{self.name}{_labels(self.labels, k)} {_number(v)}\n" for k, v in self._values.items())
+
+
+class Gauge(Metric):
+    """ A value that is either set directly or read from a callback when scraped.
+        The callback returns a number, or a dict of label tuple -> number """
+    kind = "gauge"
+
+    def __init__(self, name, doc, labels=(), callback=None):
+        super().__init__(name, doc, labels)
+        self.callback = callback
+        self._values = {}
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+    def expose(self):
+        values = self._values
+        if self.callback is not None:
+            values = self.callback()
+            if not isinstance(values, dict):
+                values = {(): values}
+
+        return "".join(f"{self.name}{_labels(self.labels, k)} {_number(v)}\n" for k, v in values.items())
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+        self._counts = {}
+        self._sums = defaultdict(float)
+
+    def observe(self, value, *labels):
+        if (counts := self._counts.get(labels)) is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def expose(self):
+        lines = []
+        names = self.labels + ("le",)
+
+        for key, counts in self._counts.items():
+            total = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                total += count
+                le = "+Inf" if bound == math.inf else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(names, key + (le,))} {total}\n")
+
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(self._sums[key])}\n")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {total}\n")
+
+        return "".join(lines)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Registry:
+    """ In-process metrics, exposed in the Prometheus text format """
+
+    def __init__(self):
+        self._metrics = {}
+        self._runner = None
+
+    def _add(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, doc, labels=()):
+        return self._add(Counter(name, doc, labels))
+
+    def gauge(self, name, doc, labels=(), callback=None):
+        gauge = self._add(Gauge(name, doc, labels))
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, doc, labels, buckets))
+
+    def remove(self, name):
+        self._metrics.pop(name, None)
+
+    def expose(self):
+        out = []
+        for metric in list(self._metrics.values()):
+            try:
+                body = metric.expose()
+            except Exception as e:
+                body = f"# {metric.name} failed to collect: {e}\n"
+            out.append(metric.header() + body)
+
+        return "".join(out)
+
+    async def serve(self, host="127.0.0.1", port=9616):
+        """ Serve /metrics locally """
+        async def handler(request):
+            return web.Response(text=self.expose(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handler)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        log.info("Serving metrics on http://%s:%s/metrics", host, port)
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def watch_loop_lag(gauge, histogram, interval=0.5):
+    """ Measure how late the event loop wakes up from a sleep """
+    loop = asyncio.get_event_loop()
+
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        gauge.set(lag)
+        histogram.observe(lag)
@@ -0,0 +1,221 @@
+"""
+nodes.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import logging
+
+import wavelink
+
+log = logging.getLogger(__name__)
+
+DEFAULT_NODES = {
+    "MAIN": {
+        "host": "127.0.0.1",
+        "port": 2333,
+        "rest_uri": "http://127.0.0.1:2333",
+        "password": "youshallnotpass",
+        "identifier": "MAIN",
+        "region": "us_west"
+    }
+}
+
+
+class ResumingWebSocket(wavelink.WebSocket):
+    """ Asks lavalink to resume the node's last session when connecting """
+
+    @property
+    def headers(self):
+        headers = super().headers
+        if self._node.resume_key is not None:
+            headers["Resume-Key"] = self._node.resume_key
+
+        return headers
+
+
+class ResumableNode(wavelink.Node):
+    """ A node whose lavalink session outlives the websocket. After configureResuming,
+        lavalink keeps the players going for resume_timeout seconds when the bot
+        disconnects and hands them back when it reconnects with the same key """
+
+    def __init__(self, *args, resume_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resume_key = resume_key
+
+    async def connect(self, bot):
+        self._websocket = ResumingWebSocket(node=self, host=self.host, port=self.port, password=self.password,
+                                            shard_count=self.shards, user_id=self.uid, secure=self.secure,
+                                            dumps=self._dumps)
+        await self._websocket._connect()
+
+
+def node_load(node):
+    """ Score how busy a node is. Lavalink's stats give the CPU and frame
+        deficit penalties, and players placed since the last stats update
+        are counted so a burst of new players doesn't all land on one node """
+    if node.stats is None:
+        return len(node.players)
+
+    return node.penalty + max(0, len(node.players) - node.stats.players)
+
+
+class NodePool:
+    """ The set of lavalink nodes from config, with load-aware
+        placement of new players and failover when a node drops """
+
+    def __init__(self, client, nodes=None, check_interval=5, resume_timeout=60):
+        self.client = client
+        self.config = DEFAULT_NODES if not nodes else nodes
+        self.check_interval = check_interval
+        self.resume_timeout = resume_timeout
+        # Called with each node before its websocket connects, so players
+        # can be put on it before a resumed session's events arrive
+        self.on_connecting = None
+        self._monitor = None
+        self._orphaned = {}
+
+    @property
+    def available(self):
+        return [n for n in self.client.nodes.values() if n.is_available]
+
+    async def start(self):
+        """ Connect to every configured node and start watching them """
+        for identifier, node in self.config.items():
+            await self.connect(identifier, node)
+
+        if self._monitor is None:
+            self._monitor = asyncio.get_event_loop().create_task(self.monitor())
+
+    async def connect(self, identifier, node):
+        """ Does what wavelink's initiate_node does, with a ResumableNode """
+        if identifier in self.client.nodes:
+            return
+
+        try:
+            created = ResumableNode(node["host"], node["port"], self.client.shard_count, self.client.user_id,
+                                    client=self.client, session=self.client.session, rest_uri=node["rest_uri"],
+                                    password=node["password"], region=node["region"], identifier=identifier,
+                                    shard_id=node.get("shard_id"), secure=node.get("secure", False),
+                                    heartbeat=node.get("heartbeat"), dumps=self.client._dumps,
+                                    resume_key=self.resume_key(identifier))
+
+            if self.on_connecting is not None:
+                self.on_connecting(created)
+
+            await created.connect(bot=self.client.bot)
+            created.available = True
+            self.client.nodes[identifier] = created
+
+        except Exception as e:
+            log.warning("Couldn't connect to wavelink node '%s': %s", identifier, e)
+
+    def resume_key(self, identifier):
+        """ The same for every run of this bot and cluster, so a restarted process gets its session back """
+        bot = self.client.bot
+        return f"ultex-{bot.user.id}-{getattr(bot.cluster, 'cluster_id', 0)}-{identifier}"
+
+    async def enable_resuming(self, node):
+        """ Have lavalink keep the node's players alive while the bot is away """
+        if getattr(node, "resume_key", None) is not None:
+            await node._send(op="configureResuming", key=node.resume_key, timeout=self.resume_timeout)
+
+    async def reconnect(self):
+        """ Reconnect to nodes straight away instead of waiting on wavelink's
+            backoff, and give each player back to its node. A restarted
+            lavalink has no players, so the voice session and the current
+            track (at its last position) are sent again """
+        for node in list(self.client.nodes.values()):
+            if not node._websocket.is_connected:
+                await node._websocket._connect()
+
+            if not node.is_available:
+                continue
+
+            for player in list(node.players.values()):
+                await self.restore(player)
+
+    @staticmethod
+    async def restore(player):
+        if player._voice_state:
+            await player._dispatch_voice_update()
+
+        if player.current:
+            await player.play(player.current, start=int(player.position))
+            if player.paused:
+                await player.set_pause(True)
+
+        if player.volume != 100:
+            await player.set_volume(player.volume)
+
+    def best_node(self):
+        """ Return the least loaded available node, or None if none are up """
+        if not (nodes := self.available):
+            return None
+
+        return min(nodes, key=node_load)
+
+    def best_identifier(self):
+        if (node := self.best_node()) is not None:
+            return node.identifier
+
+    async def monitor(self):
+        """ Move players off nodes that have gone down """
+        while True:
+            await asyncio.sleep(self.check_interval)
+
+            # One bad node or player mustn't end monitoring for the rest of the process
+            try:
+                await self.check_nodes()
+            except Exception:
+                log.exception("Checking the wavelink nodes failed")
+
+    async def check_nodes(self):
+        for node in list(self.client.nodes.values()):
+            if node.is_available:
+                continue
+
+            if node.players:
+                self._orphaned.update(node.players)
+
+            if node._websocket._task is None:
+                # The first connection attempt failed, so wavelink won't retry on its own
+                await node._websocket._connect()
+
+        if self._orphaned:
+            await self.failover()
+
+    async def failover(self):
+        """ Give every orphaned player to a healthy node. change_node
+            resumes the current track at the player's last position
+            and the queue stays on the player, so nothing is lost """
+        for guild_id, player in list(self._orphaned.items()):
+            if (node := self.best_node()) is None:
+                return
+
+            if node is not player.node:
+                if player.node.players.get(guild_id) is not player:
+                    # The old node was dropped entirely, so reattach the player before moving it,
+                    # change_node deletes it from the old node's players
+                    player.node.players[guild_id] = player
+                try:
+                    await player.change_node(node.identifier)
+                except wavelink.WavelinkException as e:
+                    log.warning("Couldn't move player for guild %s to '%s': %s", guild_id, node.identifier, e)
+                    continue
+                except Exception:
+                    # Left orphaned to be tried again, the other players still get moved
+                    log.exception("Moving player for guild %s to '%s' failed", guild_id, node.identifier)
+                    continue
+
+                log.info("Moved player for guild %s to wavelink node '%s'", guild_id, node.identifier)
+
+            del self._orphaned[guild_id]
+
+    def cancel(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
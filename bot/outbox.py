@@ -0,0 +1,158 @@
+"""
+outbox.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import logging
+from collections import deque
+
+import discord
+from discord.http import Route
+
+log = logging.getLogger(__name__)
+
+
+class _Pending:
+    __slots__ = ("content", "embed", "future", "queued")
+
+    def __init__(self, content, embed, future, queued):
+        self.content = content
+        self.embed = embed
+        self.future = future
+        self.queued = queued
+
+
+class _ChannelQueue:
+    __slots__ = ("channel", "urgent", "plain", "task", "last_sent")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.urgent = deque()
+        self.plain = deque()
+        self.task = None
+        self.last_sent = float("-inf")
+
+
+class Outbox:
+    """ Sends the bot's replies one channel at a time. Plain confirmations that
+        pile up while a channel is busy, rate limited or was sent to in the last
+        window seconds are merged into one message. Errors and embeds go ahead of
+        them and are sent on their own """
+
+    def __init__(self, http, metrics, window=0.5, max_length=2000):
+        self.http = http
+        self.window = window
+        self.max_length = max_length
+        self._channels = {}
+        self.queued = metrics.counter("ultex_outbox_queued_total", "Replies queued to be sent, by kind",
+                                      labels=("kind",))
+        self.sent = metrics.counter("ultex_outbox_sent_total", "Messages sent for the queued replies, by kind",
+                                    labels=("kind",))
+        self.delay = metrics.histogram("ultex_outbox_delay_seconds", "Time from a reply being queued to it "
+                                       "being sent, by kind", labels=("kind",),
+                                       buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+        metrics.gauge("ultex_outbox_pending", "Replies waiting to be sent",
+                      callback=lambda: sum(len(q.urgent) + len(q.plain) for q in self._channels.values()))
+
+    async def send(self, destination, content=None, *, embed=None, error=False, wait=False):
+        """ Queue a reply to a channel or context. With wait, returns the
+            Message it went out in, otherwise returns straight away """
+        channel = getattr(destination, "channel", destination)
+        loop = asyncio.get_event_loop()
+
+        if (queue := self._channels.get(channel.id)) is None:
+            queue = self._channels[channel.id] = _ChannelQueue(channel)
+
+        pending = _Pending(content, embed, loop.create_future() if wait else None, loop.time())
+        kind = "urgent" if error or embed is not None else "plain"
+        getattr(queue, kind).append(pending)
+        self.queued.inc(kind)
+
+        if queue.task is None:
+            queue.task = loop.create_task(self._drain(queue))
+
+        if pending.future is not None:
+            return await pending.future
+
+    def close(self):
+        """ Drop everything that hasn't been sent """
+        for queue in self._channels.values():
+            if queue.task is not None:
+                queue.task.cancel()
+
+            for pending in (*queue.urgent, *queue.plain):
+                if pending.future is not None:
+                    pending.future.cancel()
+
+        self._channels.clear()
+
+    async def _drain(self, queue):
+        loop = asyncio.get_event_loop()
+
+        try:
+            while queue.urgent or queue.plain:
+                await self._wait_for_bucket(queue.channel)
+
+                if queue.urgent:
+                    batch, kind = [queue.urgent.popleft()], "urgent"
+                elif (delay := queue.last_sent + self.window - loop.time()) > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                else:
+                    batch, kind = self._merge(queue.plain), "plain"
+
+                await self._deliver(queue.channel, batch, kind)
+                queue.last_sent = loop.time()
+        finally:
+            queue.task = None
+            if not (queue.urgent or queue.plain):
+                # Keep the queue until its window is up so replies sent straight after still merge
+                loop.call_later(self.window, self._forget, queue)
+
+    def _forget(self, queue):
+        if queue.task is None and not (queue.urgent or queue.plain) and self._channels.get(queue.channel.id) is queue:
+            del self._channels[queue.channel.id]
+
+    async def _wait_for_bucket(self, channel):
+        """ discord.py holds a route's lock while a request is in flight and until
+            its rate limit resets, so waiting on it lets replies pile up to be merged
+            instead of queueing behind each other inside the HTTP client """
+        if not self.http._global_over.is_set():
+            await self.http._global_over.wait()
+
+        bucket = Route("POST", "/channels/{channel_id}/messages", channel_id=channel.id).bucket
+        if (lock := self.http._locks.get(bucket)) is not None and lock.locked():
+            async with lock:
+                pass
+
+    def _merge(self, plain):
+        batch = [plain.popleft()]
+        length = len(batch[0].content or "")
+
+        while plain and length + 1 + len(plain[0].content or "") <= self.max_length:
+            length += 1 + len(plain[0].content or "")
+            batch.append(plain.popleft())
+
+        return batch
+
+    async def _deliver(self, channel, batch, kind):
+        content = "\n".join(p.content for p in batch if p.content) or None
+
+        try:
+            msg = await channel.send(content, embed=batch[0].embed)
+        except discord.HTTPException as e:
+            log.warning("Couldn't send a message to channel %s: %s", channel.id, e)
+            for pending in batch:
+                if pending.future is not None and not pending.future.done():
+                    pending.future.set_exception(e)
+        else:
+            self.sent.inc(kind)
+            now = asyncio.get_event_loop().time()
+            for pending in batch:
+                self.delay.observe(now - pending.queued, kind)
+                if pending.future is not None and not pending.future.done():
+                    pending.future.set_result(msg)
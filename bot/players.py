@@ -0,0 +1,169 @@
+"""
+players.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+from collections import OrderedDict
+
+
+class PlayerRegistry:
+    """ The music players the bot has, by guild, least recently active first.
+        Players that have been idle for idle_timeout seconds are torn down by
+        evict_idle, and the least recently active idle ones go early if the
+        players' estimated memory would pass budget bytes.
+        footprint(player) estimates a player's memory and is_active(player) says
+        whether it's doing anything that eviction would interrupt. Players have to
+        be resized whenever their footprint changes, so the budget is kept to.
+        on_evict(reason, count) is called after players are evicted """
+
+    def __init__(self, footprint, is_active, idle_timeout=600, budget=None, on_evict=None):
+        self.footprint = footprint
+        self.is_active = is_active
+        self.idle_timeout = idle_timeout
+        self.budget = budget
+        self.on_evict = on_evict
+        self.memory = 0
+        self.evicted = {"idle": 0, "budget": 0}
+        self._players = OrderedDict()
+        # The footprint each player was last counted at
+        self._sizes = {}
+
+    def __len__(self):
+        return len(self._players)
+
+    def __iter__(self):
+        return iter(self._players.values())
+
+    def get(self, guild_id):
+        """ Return the guild's player, or None if it doesn't have one """
+        if (player := self._players.get(guild_id)) is not None:
+            # Players destroyed behind our back, e.g. by wavelink, are forgotten here
+            if player.node.players.get(guild_id) is not player:
+                self.forget(guild_id)
+                return None
+
+        return player
+
+    def add(self, player):
+        """ Keep track of a player that was just made. Returns False if it would take
+            the players past the memory budget and evicting idle players can't make room """
+        size = self.footprint(player)
+        if not self._make_room(size):
+            return False
+
+        self._players[player.guild_id] = player
+        self._sizes[player.guild_id] = size
+        self.memory += size
+        self.touch(player)
+        return True
+
+    def resize(self, player):
+        """ Count a player's footprint again after its queue grew or shrank. Returns
+            False, leaving it counted at its new size, if that takes the players past
+            the memory budget and evicting idle players can't make room """
+        if (counted := self._sizes.get(player.guild_id)) is None:
+            return True
+
+        size = self._sizes[player.guild_id] = self.footprint(player)
+        self.memory += size - counted
+        return size <= counted or self._make_room(0, player)
+
+    def touch(self, player):
+        """ Note that the player was just used """
+        player.last_active = asyncio.get_event_loop().time()
+        if player.guild_id in self._players:
+            self._players.move_to_end(player.guild_id)
+
+    def forget(self, guild_id):
+        if self._players.pop(guild_id, None) is not None:
+            self.memory = max(0, self.memory - self._sizes.pop(guild_id))
+
+    async def evict(self, player):
+        """ Tear a player down and forget it """
+        self.forget(player.guild_id)
+        await player.teardown()
+
+    def idle(self):
+        """ The players that have been idle for at least idle_timeout. Players are
+            in order of activity, so this stops at the first one used since then.
+            Active players it passes are counted as used now """
+        cutoff = asyncio.get_event_loop().time() - self.idle_timeout
+        idle = []
+
+        for player in list(self._players.values()):
+            if player.last_active > cutoff:
+                break
+
+            if self.is_active(player):
+                self.touch(player)
+            else:
+                idle.append(player)
+
+        return idle
+
+    async def evict_idle(self):
+        """ Tear down players that have been idle too long, then re-estimate the
+            memory the rest use and evict more if that's over budget. Returns the
+            number of players evicted """
+        evicting = self.idle()
+        for player in evicting:
+            self.forget(player.guild_id)
+        self._count("idle", len(evicting))
+
+        # In case a footprint changed without a resize
+        self._sizes = {guild_id: self.footprint(player) for guild_id, player in self._players.items()}
+        self.memory = sum(self._sizes.values())
+        if self.budget is not None and self.memory > self.budget:
+            over, _ = self._room_for(0)
+            for player in over:
+                self.forget(player.guild_id)
+            self._count("budget", len(over))
+            evicting.extend(over)
+
+        await asyncio.gather(*(p.teardown() for p in evicting), return_exceptions=True)
+        return len(evicting)
+
+    def _make_room(self, needed, keep=None):
+        """ Evict idle players, other than keep, for needed more bytes to fit in the
+            budget. Nothing is evicted if that wouldn't be enough """
+        if self.budget is None:
+            return True
+
+        victims, fits = self._room_for(needed, keep)
+        if not fits:
+            return False
+
+        for victim in victims:
+            self.forget(victim.guild_id)
+            # Left to finish on its own, the command that wants the room shouldn't wait on it
+            teardown = asyncio.ensure_future(victim.teardown())
+            teardown.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        self._count("budget", len(victims))
+        return True
+
+    def _room_for(self, needed, keep=None):
+        """ Return the idle players to evict, least recently active first, for needed
+            more bytes to fit in the budget, and whether that's enough for them to """
+        victims = []
+        memory = self.memory
+
+        for guild_id, player in self._players.items():
+            if memory + needed <= self.budget:
+                break
+
+            if player is not keep and not self.is_active(player):
+                victims.append(player)
+                memory -= self._sizes[guild_id]
+
+        return victims, memory + needed <= self.budget
+
+    def _count(self, reason, evicted):
+        if evicted:
+            self.evicted[reason] += evicted
+            if self.on_evict is not None:
+                self.on_evict(reason, evicted)
@@ -0,0 +1,39 @@
+"""
+prefixes.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import threading
+
+from . import db
+
+
+class PrefixStore:
+    """ SQLite file holding each guild's custom command prefix, one row per guild,
+        so clusters setting prefixes for their own guilds don't undo each other's """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS prefixes (guild_id INTEGER PRIMARY KEY, prefix TEXT)")
+        self._db.commit()
+
+    def load(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT guild_id, prefix FROM prefixes").fetchall())
+
+    def set(self, guild_id, prefix):
+        """ Save a guild's prefix, or with None forget it """
+        with self._lock:
+            with self._db:
+                if prefix is None:
+                    self._db.execute("DELETE FROM prefixes WHERE guild_id = ?", (guild_id,))
+                else:
+                    self._db.execute("REPLACE INTO prefixes VALUES (?, ?)", (guild_id, prefix))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,171 @@
+"""
+profiler.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from . import logs
+
+log = logging.getLogger(__name__)
+
+# Deeper stacks are cut off at the event loop end, which is the same for every sample
+MAX_DEPTH = 128
+
+
+class Capture:
+    __slots__ = ("path", "samples", "seconds", "cpu", "tags")
+
+    def __init__(self, path, samples, seconds, cpu, tags):
+        self.path = path
+        self.samples = samples
+        self.seconds = seconds
+        # CPU time the sampling took, most of it holding the GIL the event loop needs
+        self.cpu = cpu
+        # Samples taken for each command, event or task
+        self.tags = tags
+
+
+class SamplingProfiler:
+    """ Samples the event loop thread's stack every interval seconds from a thread
+        of its own, for as long as a capture runs. Each sample is put under the
+        command or player event being handled, or the task running if it's neither,
+        and the samples are written to directory as collapsed stacks, one
+        "tag;outer;...;inner count" line per distinct stack. That's the format
+        flamegraph.pl, inferno and speedscope read to draw flame graphs """
+
+    def __init__(self, directory="logs", interval=0.01):
+        self.directory = Path(directory)
+        self.interval = interval
+        self._loop = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._labels = {}
+        self.ends_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, seconds):
+        """ Start a capture of the thread this is called from, which must be running
+            the event loop. Returns a future for the Capture, finished once it's been
+            written out """
+        if self.running:
+            raise RuntimeError("A capture is already running")
+
+        self._loop = asyncio.get_event_loop()
+        future = self._loop.create_future()
+        self._stop.clear()
+        self.ends_at = time.monotonic() + seconds
+        self._thread = threading.Thread(target=self._run, args=(threading.get_ident(), seconds, future),
+                                        name="profiler", daemon=True)
+        self._thread.start()
+        log.info("Profiling the event loop for %.0f s, every %.1f ms", seconds, self.interval * 1000)
+        return future
+
+    def stop(self):
+        """ End the running capture early. It's still written out """
+        self._stop.set()
+
+    def _run(self, thread_id, seconds, future):
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        start = time.perf_counter()
+        start_cpu = time.thread_time()
+
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            if (stack := self.sample(thread_id)) is not None:
+                stacks[stack] += 1
+
+        took = time.perf_counter() - start
+        cpu = time.thread_time() - start_cpu
+        # Don't keep code objects alive between captures, e.g. those of a cog that was reloaded
+        self._labels.clear()
+        try:
+            capture = self.write(stacks, took, cpu)
+        except Exception as exc:
+            log.warning("Couldn't write the profile: %s", exc)
+            self._finish(future, exc)
+        else:
+            log.info("Wrote %d samples over %.1f s to %s (%.1f%% of a core spent sampling)", capture.samples, took,
+                     capture.path, cpu / took * 100)
+            self._finish(future, capture)
+
+    def _finish(self, future, result):
+        def finish():
+            self._thread = None
+            self.ends_at = None
+            if future.done():
+                return
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        try:
+            self._loop.call_soon_threadsafe(finish)
+        except RuntimeError:
+            # The loop closed during the capture, nothing is waiting for it now
+            self._thread = None
+
+    def sample(self, thread_id):
+        """ The thread's stack, outermost frame first, behind a tag for what it's doing """
+        if (frame := sys._current_frames().get(thread_id)) is None:
+            return None
+
+        innermost = frame.f_code
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+
+        stack.append(self._tag(innermost))
+        stack.reverse()
+        return tuple(stack)
+
+    def _label(self, code):
+        if (label := self._labels.get(code)) is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self._labels[code] = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+        return label
+
+    def _tag(self, innermost):
+        # current_task is a lookup in a dict keyed by loop, so it's safe to call from here
+        if (task := asyncio.current_task(self._loop)) is None:
+            # Waiting in the selector for something to happen
+            return "(idle)" if os.path.basename(innermost.co_filename) == "selectors.py" else "(callbacks)"
+
+        fields = logs.task_context(task)
+        if "command" in fields:
+            return f"command {fields['command']}"
+        if "event" in fields:
+            return f"event {fields['event']}"
+
+        return f"task {getattr(task.get_coro(), '__qualname__', task.get_name())}"
+
+    def write(self, stacks, seconds, cpu):
+        """ Write the stacks out in collapsed form, most sampled first """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded"
+
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in stacks.most_common():
+                file.write(f"{';'.join(stack)} {count}\n")
+
+        tags = Counter()
+        for stack, count in stacks.items():
+            tags[stack[0]] += count
+
+        return Capture(path, sum(stacks.values()), seconds, cpu, tags)
@@ -0,0 +1,70 @@
+"""
+profiles.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import discord
+
+
+def minimal_music():
+    """ Only what the bot's commands use: guilds, messages and voice states.
+        Members are only cached while they're in a voice channel, which is all
+        the Music cog looks at, and guilds are never chunked """
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.dm_messages = True
+    intents.voice_states = True
+
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.voice = True
+
+    return {
+        "intents": intents,
+        "member_cache_flags": member_cache_flags,
+        # Nothing waits on edits, deletes or reactions to earlier messages
+        "max_messages": None,
+        "chunk_guilds_at_startup": False
+    }
+
+
+def standard():
+    """ discord.py's default intents (no members or presences) with its default caches """
+    intents = discord.Intents.default()
+
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.from_intents(intents),
+        "max_messages": 1000,
+        "chunk_guilds_at_startup": False
+    }
+
+
+def full():
+    """ Every intent and every cache, like the bot used to run """
+    intents = discord.Intents.all()
+
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.all(),
+        "max_messages": 1000,
+        "chunk_guilds_at_startup": True
+    }
+
+
+PROFILES = {
+    "minimal-music": minimal_music,
+    "standard": standard,
+    "full": full
+}
+
+
+def get_profile(name):
+    """ Return the discord.Client keyword arguments for the named profile """
+    try:
+        return PROFILES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown intent profile '{name}', expected one of: {', '.join(PROFILES)}") from None
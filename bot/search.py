@@ -0,0 +1,125 @@
+"""
+search.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+WOLFRAM_URL = "https://api.wolframalpha.com/v2/query"
+WIKIPEDIA_URL = "https://en.wikipedia.org/w/api.php"
+
+
+def normalize_query(query):
+    return " ".join(query.casefold().split())
+
+
+class SearchBackend:
+    """ Ask Wolfram|Alpha and Wikipedia at the same time without blocking
+        the event loop. The first good answer wins and the other request is
+        cancelled. Answers are cached by normalized query for ttl seconds """
+
+    def __init__(self, wolfram_app_id, wolfram_url=WOLFRAM_URL, wikipedia_url=WIKIPEDIA_URL,
+                 wolfram_timeout=8.0, wikipedia_timeout=5.0, max_concurrency=4, ttl=60 * 60, maxsize=512):
+        self.wolfram_app_id = wolfram_app_id
+        self.wolfram_url = wolfram_url
+        self.wikipedia_url = wikipedia_url
+        self.timeouts = {self.wolfram: wolfram_timeout, self.wikipedia: wikipedia_timeout}
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._cache = OrderedDict()
+        self._session = None
+
+    async def search(self, query):
+        """ Return an answer for query, or None if neither backend found one """
+        key = normalize_query(query)
+
+        if (cached := self._cache.get(key)) is not None and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            return cached[1]
+
+        async with self._limit:
+            answer = await self._race(query)
+
+        if answer is not None:
+            self._cache[key] = (time.monotonic() + self.ttl, answer)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        return answer
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _race(self, query):
+        pending = {asyncio.ensure_future(self._ask(backend, query)) for backend in self.timeouts}
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if (answer := task.result()) is not None:
+                        return answer
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return None
+
+    async def _ask(self, backend, query):
+        """ Run one backend with its own timeout. Failures just mean no answer """
+        try:
+            return await asyncio.wait_for(backend(query), self.timeouts[backend])
+        except (asyncio.TimeoutError, aiohttp.ClientError, KeyError, IndexError, TypeError, ValueError):
+            return None
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+
+        return self._session
+
+    async def wolfram(self, query):
+        params = {"appid": self.wolfram_app_id, "input": query, "format": "plaintext", "output": "json"}
+
+        async with self.session.get(self.wolfram_url, params=params) as resp:
+            data = await resp.json(content_type=None)
+
+        result = data["queryresult"]
+        if not result.get("success"):
+            return None
+
+        for pod in result.get("pods", []):
+            if pod.get("primary") and (text := pod["subpods"][0].get("plaintext")):
+                return text
+
+    async def wikipedia(self, query):
+        params = {
+            "action": "query",
+            "format": "json",
+            "prop": "extracts",
+            "exintro": 1,
+            "explaintext": 1,
+            "exsentences": 2,
+            "redirects": 1,
+            "generator": "search",
+            "gsrsearch": query,
+            "gsrlimit": 1
+        }
+
+        async with self.session.get(self.wikipedia_url, params=params) as resp:
+            data = await resp.json(content_type=None)
+
+        for page in data.get("query", {}).get("pages", {}).values():
+            if text := page.get("extract"):
+                return text
@@ -0,0 +1,141 @@
+"""
+snapshots.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import base64
+import binascii
+import struct
+import threading
+import time
+import zlib
+
+from . import db
+
+
+def _read_utf(data, pos):
+    """ Read a string written by Java's DataOutput.writeUTF """
+    length, = struct.unpack_from(">H", data, pos)
+    start, end = pos + 2, pos + 2 + length
+    if end > len(data):
+        raise ValueError("String runs past the end of the track")
+
+    # Java's "modified UTF-8" writes NUL as two bytes and supplementary characters as surrogate pairs
+    raw = data[start:end].replace(b"\xc0\x80", b"\x00")
+    text = raw.decode("utf-8", "surrogatepass").encode("utf-16", "surrogatepass").decode("utf-16")
+    return text, end
+
+
+def decode_track(track):
+    """ Read the info out of a lavalink track string without asking lavalink.
+        Only the fields every track format version starts with are read """
+    try:
+        data = base64.b64decode(track, validate=True)
+        header, = struct.unpack_from(">I", data)
+        if header & 0x3FFFFFFF != len(data) - 4:
+            raise ValueError("Track length doesn't match its header")
+
+        pos, version = 4, 1
+        if header >> 30 & 1:
+            version, pos = data[pos], pos + 1
+
+        title, pos = _read_utf(data, pos)
+        author, pos = _read_utf(data, pos)
+        length, = struct.unpack_from(">q", data, pos)
+        identifier, pos = _read_utf(data, pos + 8)
+        is_stream, pos = bool(data[pos]), pos + 1
+
+        uri = None
+        if version < 2 or data[pos]:
+            uri, pos = _read_utf(data, pos + (version >= 2))
+
+    except (binascii.Error, struct.error, IndexError, UnicodeError) as e:
+        raise ValueError(f"Not a lavalink track: {e}") from None
+
+    return {
+        "title": title,
+        "author": author,
+        "length": length,
+        "identifier": identifier,
+        "isStream": is_stream,
+        "isSeekable": not is_stream,
+        "uri": uri
+    }
+
+
+def pack_tracks(ids):
+    return zlib.compress("\n".join(ids).encode())
+
+
+def unpack_tracks(blob):
+    return zlib.decompress(blob).decode().split("\n") if blob else []
+
+
+class QueueSnapshot:
+    """ Everything needed to put a guild's player back: the track ids in the queue,
+        where in it and in the current track the player was and the voice channel """
+    __slots__ = ("guild_id", "node", "channel_id", "position", "repeat_mode", "track_position", "paused",
+                 "volume", "tracks", "saved")
+
+    def __init__(self, guild_id, node, channel_id, position, repeat_mode, track_position, paused, volume, tracks,
+                 saved=None):
+        self.guild_id = guild_id
+        self.node = node
+        self.channel_id = channel_id
+        self.position = position
+        self.repeat_mode = repeat_mode
+        self.track_position = track_position
+        self.paused = paused
+        self.volume = volume
+        self.tracks = tracks
+        self.saved = time.time() if saved is None else saved
+
+    def row(self):
+        return (self.guild_id, self.node, self.channel_id, self.position, self.repeat_mode, self.track_position,
+                int(self.paused), self.volume, pack_tracks(self.tracks), self.saved)
+
+    @classmethod
+    def from_row(cls, row):
+        *fields, tracks, saved = row
+        return cls(*fields, unpack_tracks(tracks), saved)
+
+
+class SnapshotStore:
+    """ SQLite file holding one queue snapshot per guild """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS queues (guild_id INTEGER PRIMARY KEY, node TEXT, "
+                         "channel_id INTEGER, position INTEGER, repeat_mode INTEGER, track_position INTEGER, "
+                         "paused INTEGER, volume INTEGER, tracks BLOB, saved REAL)")
+        self._db.commit()
+
+    def load(self, max_age=None):
+        """ Return every snapshot saved in the last max_age seconds, keyed by guild id """
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM queues WHERE saved >= ?",
+                                    (0 if max_age is None else time.time() - max_age,)).fetchall()
+
+        return {row[0]: QueueSnapshot.from_row(row) for row in rows}
+
+    def save(self, snapshots=(), positions=(), removed=()):
+        """ Write whole snapshots for queues that changed, just the track position
+            for ones that are still playing through the same queue, and drop
+            guilds that no longer have a queue. All in one transaction """
+        now = time.time()
+
+        with self._lock:
+            with self._db:
+                self._db.executemany("REPLACE INTO queues VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                     [s.row() for s in snapshots])
+                self._db.executemany("UPDATE queues SET track_position = ?, paused = ?, saved = ? "
+                                     "WHERE guild_id = ?", [(p, int(paused), now, g) for g, p, paused in positions])
+                self._db.executemany("DELETE FROM queues WHERE guild_id = ?", [(g,) for g in removed])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,134 @@
+"""
+supervisor.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import logging
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+
+log = logging.getLogger(__name__)
+
+
+class LavalinkSupervisor:
+    """ Run lavalink as a child process, report when its REST/WS port
+        is actually answering and restart it with backoff if it dies """
+
+    def __init__(self, command=("java", "-jar", "lavalink.jar"), host="127.0.0.1", port=2333,
+                 password="youshallnotpass", ready_timeout=60, max_backoff=60, on_restart=None):
+        self.command = list(command)
+        self.url = f"http://{host}:{port}/version"
+        self.password = password
+        self.ready_timeout = ready_timeout
+        self.max_backoff = max_backoff
+        self.on_restart = on_restart
+        self.restarts = 0
+        self._process = None
+        self._stopping = threading.Event()
+        # Held while checking for a stop and launching, so stop() can't miss a process launched as it runs
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    @property
+    def is_running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        """ Launch lavalink and block until it's ready (or the timeout passes).
+            Returns the number of seconds it took """
+        took = self._launch() or 0.0
+        self._watcher = threading.Thread(target=self._watch, name="lavalink-supervisor", daemon=True)
+        self._watcher.start()
+        return took
+
+    def stop(self):
+        """ Stop lavalink, and the watcher from starting it again """
+        with self._lock:
+            self._stopping.set()
+            process = self._process
+
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def probe(self):
+        """ Return True if lavalink's HTTP server answers. Any response,
+            even an auth error, means the port is up and serving """
+        request = urllib.request.Request(self.url, headers={"Authorization": self.password})
+        try:
+            with urllib.request.urlopen(request, timeout=1):
+                return True
+        except urllib.error.HTTPError:
+            return True
+        except (urllib.error.URLError, OSError):
+            return False
+
+    def wait_until_ready(self):
+        start = time.perf_counter()
+        delay = 0.05
+
+        while time.perf_counter() - start < self.ready_timeout:
+            if self.probe():
+                return True
+
+            if not self.is_running:
+                return False
+
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+        return False
+
+    def _launch(self):
+        """ Start lavalink and wait for it to be ready. Returns the seconds that took,
+            or None without starting it if the supervisor is stopping """
+        start = time.perf_counter()
+        with self._lock:
+            if self._stopping.is_set():
+                return None
+            self._process = subprocess.Popen(self.command)
+
+        ready = self.wait_until_ready()
+        took = time.perf_counter() - start
+
+        if ready:
+            log.info("Lavalink ready after %.2fs (pid %s)", took, self._process.pid)
+        else:
+            log.warning("Lavalink wasn't ready after %.2fs, continuing anyway", took)
+
+        return took
+
+    def _watch(self):
+        backoff = 1
+
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            code = self._process.wait()
+
+            if self._stopping.is_set():
+                return
+
+            # Only back off further if it keeps dying soon after starting
+            if time.monotonic() - started > self.max_backoff:
+                backoff = 1
+
+            log.error("Lavalink exited with code %s, restarting in %ss", code, backoff)
+            if self._stopping.wait(backoff):
+                return
+            backoff = min(backoff * 2, self.max_backoff)
+
+            if self._launch() is None:
+                return
+            self.restarts += 1
+
+            if self.on_restart is not None:
+                self.on_restart()
@@ -0,0 +1,48 @@
+"""
+voice.py
+Ultex
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+
+class VoiceOccupancy:
+    """ How many non-bot members are in the voice channel the bot is in, per guild.
+        A channel is counted once, the first time it's asked about, and after that
+        kept up to date from voice state updates, so each update costs O(1) """
+
+    def __init__(self):
+        self._channels = {}
+
+    def __len__(self):
+        return len(self._channels)
+
+    def humans(self, channel):
+        """ Return the number of non-bot members in channel, counting them if it
+            isn't the channel already tracked for its guild """
+        entry = self._channels.get(channel.guild.id)
+
+        if entry is None or entry[0] != channel.id:
+            entry = self._channels[channel.guild.id] = [channel.id, sum(1 for m in channel.members if not m.bot)]
+
+        return entry[1]
+
+    def update(self, channel, before, after):
+        """ Apply a non-bot member's voice state update to the count for channel,
+            the channel the bot is in. The member cache already reflects the update
+            when it's dispatched, so an untracked channel is simply counted.
+            Returns the count, or None if the update didn't touch channel """
+        if before.channel != channel and after.channel != channel:
+            return None
+
+        entry = self._channels.get(channel.guild.id)
+        if entry is None or entry[0] != channel.id:
+            return self.humans(channel)
+
+        entry[1] += (after.channel == channel) - (before.channel == channel)
+        return entry[1]
+
+    def forget(self, guild_id):
+        """ Stop tracking a guild, e.g. when the bot leaves or moves channel """
+        self._channels.pop(guild_id, None)
@@ -8,37 +8,88 @@ Created by Kaleb Rosborough on 12/07/2021
 Copyright © Shock9616 2021 All rights reserved
 """
 
-import multiprocessing
-import subprocess
-import time
-
 from bot import Bot
+from bot.cluster import launch, recommended_shards
+from bot.logs import start_logging
+from bot.supervisor import LavalinkSupervisor
 from config import secrets
 
 TOKEN = secrets.DISCORD_TOKEN
 EMAIL_PASSWD = secrets.EMAIL_PASSWD
+LAVALINK_NODES = getattr(secrets, "LAVALINK_NODES", None)
+WOLFRAM_APP_ID = getattr(secrets, "WOLFRAM_APP_ID", "AA92HA-R4TPUE59R9")
+CLUSTERS = getattr(secrets, "CLUSTERS", 1)
+SHARD_COUNT = getattr(secrets, "SHARD_COUNT", None)
+METRICS_PORT = getattr(secrets, "METRICS_PORT", 9616)
+LOG_LEVEL = getattr(secrets, "LOG_LEVEL", "INFO")
+# Keep one in this many of each logger's records below WARNING
+LOG_SAMPLE = {"bot.cogs.Music.tracks": 20}
 
 
-def main():
+def main(lavalink=None, cluster=None, shard_ids=None, shard_count=None):
     """ Create the main Bot instance and run it """
     ultex = Bot(name="Ultex",
                 email="ultexbot@gmail.com",
                 passwd=EMAIL_PASSWD,
                 excluded_cogs=["RossRoadYouth"],
+                eager_cogs=["Music"],
+                profile="minimal-music",
+                track_cache_path="data/track_cache.db",
+                snapshot_path="data/queues.db",
+                history_path="data/history.db",
+                prefixes_path="data/prefixes.db",
+                nodes=LAVALINK_NODES,
+                wolfram_app_id=WOLFRAM_APP_ID,
+                shard_ids=shard_ids,
+                shard_count=shard_count,
+                cluster=cluster,
+                metrics_port=METRICS_PORT + (cluster.cluster_id if cluster is not None else 0),
                 token=TOKEN)
 
+    if lavalink is not None:
+        lavalink.on_restart = ultex.lavalink_restarted
+
     ultex.run()
 
 
+def run_cluster(cluster, shard_ids, shard_count):
+    """ Run one cluster's bot for its range of shards, logging to its own file """
+    logs = start_logging(f"logs/ultex-cluster{cluster.cluster_id}.log", level=LOG_LEVEL, sample=LOG_SAMPLE)
+
+    try:
+        main(cluster=cluster, shard_ids=shard_ids, shard_count=shard_count)
+    finally:
+        logs.stop()
+
+
+def launch_clusters(lavalink):
+    """ Split the shards across CLUSTERS processes. Lavalink restarts
+        are passed on to every cluster through the hub """
+    shard_count = SHARD_COUNT or recommended_shards(TOKEN)
+
+    def on_hub(hub):
+        lavalink.on_restart = lambda: hub.dispatch("lavalink_restart")
+
+    launch(run_cluster, shard_count, CLUSTERS, on_hub=on_hub)
+
+
 def launch_lavalink():
-    """ Launch the lavalink server so that music can be played """
-    subprocess.run(["java", "-jar", "lavalink.jar"])
+    """ Launch the lavalink server so that music can be played.
+        Blocks until lavalink is answering requests """
+    lavalink = LavalinkSupervisor(["java", "-jar", "lavalink.jar"])
+    lavalink.start()
+    return lavalink
 
 
 if __name__ == "__main__":
-    lavalink = multiprocessing.Process(target=launch_lavalink)
-    bot = multiprocessing.Process(target=main)
+    logs = start_logging("logs/ultex.log", level=LOG_LEVEL, sample=LOG_SAMPLE)
+    lavalink = launch_lavalink()
 
-    lavalink.start()
-    time.sleep(6)
-    bot.start()
+    try:
+        if CLUSTERS > 1:
+            launch_clusters(lavalink)
+        else:
+            main(lavalink)
+    finally:
+        lavalink.stop()
+        logs.stop()
@@ -0,0 +1,42 @@
+"""
+conftest.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import base64
+import inspect
+import struct
+
+import pytest
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """ Run async def tests to completion on an event loop of their own """
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+
+    args = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**args))
+    return True
+
+
+def _utf(text):
+    data = text.encode()
+    return struct.pack(">H", len(data)) + data
+
+
+@pytest.fixture
+def encode_track():
+    """ Encode track info into a track string the way lavaplayer does (track info version 2) """
+    def encode(identifier, title=None, length=180000, author="Someone", is_stream=False):
+        body = (bytes([2]) + _utf(title or f"Track {identifier}") + _utf(author) + struct.pack(">q", length)
+                + _utf(identifier) + bytes([is_stream]) + b"\x01" + _utf(f"https://www.youtube.com/watch?v={identifier}")
+                + _utf("youtube") + struct.pack(">q", 0))
+        return base64.b64encode(struct.pack(">I", len(body) | 1 << 30) + body).decode()
+
+    return encode
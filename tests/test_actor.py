@@ -0,0 +1,112 @@
+"""
+test_actor.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import contextvars
+
+import pytest
+
+from bot.actor import Actor, ActorFull
+
+
+async def test_jobs_run_one_at_a_time_in_order():
+    actor, ran = Actor(), []
+
+    async def job(n):
+        ran.append(("start", n))
+        await asyncio.sleep(0)
+        ran.append(("end", n))
+        return n
+
+    assert await asyncio.gather(*(actor.submit(job, n) for n in range(3))) == [0, 1, 2]
+    assert ran == [("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+
+
+async def test_a_burst_of_the_same_job_is_merged_into_the_waiting_one():
+    actor, seen = Actor(), []
+
+    async def skip(n):
+        seen.append(n)
+        return n
+
+    def add(waiting, new):
+        return (waiting[0] + new[0],)
+
+    futures = [actor.submit(skip, 1, merge=add) for _ in range(3)]
+    assert await asyncio.gather(*futures) == [3, 3, 3]
+    assert seen == [3] and actor.merged == 2 and actor.ran == 1
+
+
+async def test_jobs_that_cant_be_merged_keep_their_own_arguments():
+    actor = Actor()
+
+    async def job(n):
+        return n
+
+    first = actor.submit(job, 1, merge=lambda waiting, new: None)
+    second = actor.submit(job, 2, merge=lambda waiting, new: None)
+    assert await asyncio.gather(first, second) == [1, 2]
+
+
+async def test_submissions_past_maxsize_are_rejected_unless_forced():
+    actor = Actor(maxsize=2)
+
+    async def job():
+        pass
+
+    actor.submit(job)
+    actor.submit(job)
+    with pytest.raises(ActorFull):
+        actor.submit(job)
+
+    forced = actor.submit(job, force=True)
+    assert actor.rejected == 1 and len(actor) == 3
+    await forced
+
+
+async def test_a_failing_job_doesnt_stop_the_ones_after_it():
+    actor = Actor()
+
+    async def fail():
+        raise ValueError
+
+    async def job():
+        return "ran"
+
+    failed, after = actor.submit(fail), actor.submit(job)
+    with pytest.raises(ValueError):
+        await failed
+    assert await after == "ran"
+
+
+async def test_cancel_drops_the_waiting_jobs():
+    actor = Actor()
+
+    async def job():
+        pass
+
+    waiting = actor.submit(job)
+    actor.cancel()
+
+    assert waiting.cancelled() and len(actor) == 0
+
+
+
+
+
+async def test_jobs_dont_run_in_the_log_context_of_whoever_started_the_worker():
+    actor = Actor()
+
+    caller = contextvars.ContextVar("caller", default=None)
+
+    async def job():
+        return caller.get()
+
+    caller.set("first")
+    first = actor.submit(job)
+    assert await first is None
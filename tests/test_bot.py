@@ -0,0 +1,80 @@
+"""
+test_bot.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from discord.ext import commands
+
+from bot.bot import Bot, valid_prefix
+
+
+@commands.command(name="ping", aliases=["p"])
+async def ping_command(ctx):
+    pass
+
+
+def make_bot(prefixes_path=None):
+    """ Has to be called with the event loop running, like discord.py expects """
+    bot = Bot("Ultex", "ultex@example.com", "", "", prefixes_path=prefixes_path, eager_cogs=[])
+    bot.add_command(ping_command.copy())
+    return bot
+
+
+def message(content, guild_id=1):
+    return SimpleNamespace(content=content, guild=SimpleNamespace(id=guild_id))
+
+
+@pytest.mark.parametrize("prefix", ["!", "ultex.", "$" * 10])
+def test_valid_prefix_accepts_short_prefixes(prefix):
+    assert valid_prefix(prefix)
+
+
+@pytest.mark.parametrize("prefix", ["", "u ", "\n", "$" * 11, None, 5])
+def test_valid_prefix_rejects_empty_long_and_spaced_prefixes(prefix):
+    assert not valid_prefix(prefix)
+
+
+async def test_invoked_name_finds_commands_and_aliases_in_any_case():
+    bot = make_bot()
+
+    assert bot.invoked_name(message("!ping")) == "ping"
+    assert bot.invoked_name(message("!PING now")) == "ping"
+    assert bot.invoked_name(message("!p")) == "p"
+
+
+@pytest.mark.parametrize("content", ["", "ping", "hello !ping", "! ping", "!", "!pong", "?ping"])
+async def test_invoked_name_rejects_ordinary_chat(content):
+    assert make_bot().invoked_name(message(content)) is None
+
+
+async def test_custom_prefix_only_applies_to_its_guild():
+    bot = make_bot()
+    bot.set_prefix(1, "?")
+
+    assert bot.invoked_name(message("?ping", guild_id=1)) == "ping"
+    assert bot.invoked_name(message("!ping", guild_id=1)) is None
+    assert bot.invoked_name(message("!ping", guild_id=2)) == "ping"
+    assert bot.invoked_name(message("?ping", guild_id=2)) is None
+
+
+async def test_setting_the_default_prefix_resets_the_guild():
+    bot = make_bot()
+    bot.set_prefix(1, "?")
+    bot.set_prefix(1, "!")
+
+    assert 1 not in bot.prefixes
+    assert bot.invoked_name(message("?ping")) is None
+
+
+async def test_invalid_prefixes_are_refused():
+    bot = make_bot()
+
+    with pytest.raises(ValueError):
+        bot.set_prefix(1, "two words")
+    assert bot.prefixes == {}
@@ -0,0 +1,173 @@
+"""
+test_cache.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import time
+
+import pytest
+import wavelink
+
+from bot.cache import DiskTier, TrackCache, normalize_query
+
+
+def test_disk_tier_drops_expired_rows_at_startup(tmp_path):
+    disk = DiskTier(tmp_path / "cache.db")
+    disk.set("old", time.time() - 1, "[]")
+    disk.set("new", time.time() + 60, "[]")
+    disk.close()
+
+    disk = DiskTier(tmp_path / "cache.db")
+    assert len(disk) == 1 and disk.get("new") is not None
+    disk.close()
+
+
+def test_disk_tier_keeps_the_rows_expiring_last_past_maxsize(tmp_path):
+    disk = DiskTier(tmp_path / "cache.db", maxsize=3, prune_every=5)
+    now = time.time()
+    for i in range(5):
+        disk.set(str(i), now + 60 + i, "[]")
+
+    assert len(disk) == 3
+    assert [disk.get(str(i)) is not None for i in range(5)] == [False, False, True, True, True]
+    disk.close()
+
+
+def test_disk_tier_only_prunes_every_so_many_writes(tmp_path):
+    disk = DiskTier(tmp_path / "cache.db", maxsize=1, prune_every=10)
+    for i in range(3):
+        disk.set(str(i), time.time() + 60, "[]")
+
+    assert len(disk) == 3
+    disk.prune()
+    assert len(disk) == 1
+    disk.close()
+
+
+@pytest.mark.parametrize("a, b", [
+    ("https://www.youtube.com/watch?v=abc&feature=share", "https://youtube.com/watch?v=abc"),
+    ("https://youtu.be/abc?si=xyz", "https://m.youtube.com/watch/?v=abc"),
+    ("ytsearch:Never  Gonna GIVE", "YTSEARCH:never gonna give"),
+])
+def test_equivalent_queries_share_a_key(a, b):
+    assert normalize_query(a) == normalize_query(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("https://youtube.com/watch?v=abc", "https://youtube.com/watch?v=abd"),
+    ("https://youtube.com/playlist?list=x&index=2", "https://youtube.com/playlist?list=x&index=3"),
+    ("ytsearch:song", "scsearch:song"),
+])
+def test_different_queries_dont_share_a_key(a, b):
+    assert normalize_query(a) != normalize_query(b)
+
+
+class Lavalink:
+    """ Counts lookups, each taking a moment so others can pile up behind it """
+
+    def __init__(self, result=("track",), error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+
+    async def get_tracks(self, query):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return list(self.result)
+
+
+async def test_repeated_lookups_are_answered_from_the_cache():
+    cache, lavalink = TrackCache(), Lavalink()
+
+    assert await cache.get_tracks("ytsearch:song", lavalink.get_tracks) == ["track"]
+    assert await cache.get_tracks("YTSEARCH:  song", lavalink.get_tracks) == ["track"]
+    assert lavalink.calls == 1 and (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_callers_cant_change_what_is_cached():
+    cache, lavalink = TrackCache(), Lavalink()
+
+    (await cache.get_tracks("ytsearch:song", lavalink.get_tracks)).clear()
+    assert await cache.get_tracks("ytsearch:song", lavalink.get_tracks) == ["track"]
+
+
+async def test_lookups_in_flight_are_shared():
+    cache, lavalink = TrackCache(), Lavalink()
+
+    results = await asyncio.gather(*(cache.get_tracks("ytsearch:song", lavalink.get_tracks) for _ in range(5)))
+    assert results == [["track"]] * 5 and lavalink.calls == 1
+
+
+async def test_cancelling_the_first_caller_leaves_the_lookup_for_the_others():
+    cache, lavalink = TrackCache(), Lavalink()
+
+    first = asyncio.ensure_future(cache.get_tracks("ytsearch:song", lavalink.get_tracks))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(cache.get_tracks("ytsearch:song", lavalink.get_tracks))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == ["track"] and lavalink.calls == 1
+
+
+async def test_errors_reach_every_caller_and_arent_cached():
+    cache, lavalink = TrackCache(), Lavalink(error=RuntimeError("lavalink is down"))
+
+    results = await asyncio.gather(*(cache.get_tracks("ytsearch:song", lavalink.get_tracks) for _ in range(2)),
+                                   return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    lavalink.error = None
+    assert await cache.get_tracks("ytsearch:song", lavalink.get_tracks) == ["track"]
+    assert lavalink.calls == 2
+
+
+async def test_empty_results_arent_cached():
+    cache, lavalink = TrackCache(), Lavalink(result=())
+
+    await cache.get_tracks("ytsearch:nothing", lavalink.get_tracks)
+    await cache.get_tracks("ytsearch:nothing", lavalink.get_tracks)
+    assert lavalink.calls == 2
+
+
+async def test_least_recently_used_entries_go_past_maxsize():
+    cache, lavalink = TrackCache(maxsize=2), Lavalink()
+
+    for query in ("ytsearch:a", "ytsearch:b", "ytsearch:a", "ytsearch:c"):
+        await cache.get_tracks(query, lavalink.get_tracks)
+
+    assert len(cache) == 2
+    await cache.get_tracks("ytsearch:a", lavalink.get_tracks)
+    assert lavalink.calls == 3
+
+
+def track():
+    return wavelink.Track("id", {"title": "Song", "length": 1000, "identifier": "x"})
+
+
+async def test_lookups_survive_a_restart_on_disk(tmp_path):
+    lavalink = Lavalink(result=[track()])
+    cache = TrackCache(path=tmp_path / "cache.db")
+    await cache.get_tracks("ytsearch:song", lavalink.get_tracks)
+    cache.close()
+
+    cache = TrackCache(path=tmp_path / "cache.db")
+    tracks = await cache.get_tracks("ytsearch:song", lavalink.get_tracks)
+    assert [(track.id, track.title) for track in tracks] == [("id", "Song")] and lavalink.calls == 1
+    cache.close()
+
+
+async def test_invalidate_forgets_a_query_everywhere(tmp_path):
+    cache, lavalink = TrackCache(path=tmp_path / "cache.db"), Lavalink(result=[track()])
+    await cache.get_tracks("ytsearch:song", lavalink.get_tracks)
+
+    cache.invalidate("ytsearch:song")
+    await cache.get_tracks("ytsearch:song", lavalink.get_tracks)
+    assert lavalink.calls == 2
+    cache.close()
@@ -0,0 +1,61 @@
+"""
+test_content.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import os
+
+from bot.content import ContentStore, LineFile
+
+
+def test_blank_lines_and_line_endings_are_skipped(tmp_path):
+    path = tmp_path / "jokes.txt"
+    path.write_bytes(b"first\r\n\n   \nsecond\nthird")
+    lines = LineFile(path)
+
+    assert len(lines) == 3
+    assert [lines[i] for i in range(3)] == ["first", "second", "third"]
+
+
+def test_random_line_only_returns_real_lines(tmp_path):
+    path = tmp_path / "verses.txt"
+    path.write_text("one\n\ntwo ✝\n", encoding="utf-8")
+    lines = LineFile(path)
+
+    assert {lines.random_line() for _ in range(50)} == {"one", "two ✝"}
+
+
+def test_empty_and_missing_files_have_no_lines(tmp_path):
+    (tmp_path / "empty.txt").write_text("\n\n")
+
+    assert LineFile(tmp_path / "empty.txt").random_line() is None
+    assert LineFile(tmp_path / "missing.txt").random_line() is None
+
+
+def test_changed_files_are_reloaded(tmp_path):
+    path = tmp_path / "jokes.txt"
+    path.write_text("old\n")
+    lines = LineFile(path, check_interval=0)
+
+    path.write_text("new\nnewer\n")
+    os.utime(path, ns=(0, 10 ** 9))
+    assert [lines[0], lines[1]] == ["new", "newer"]
+
+
+def test_files_that_appear_later_are_picked_up(tmp_path):
+    lines = LineFile(tmp_path / "jokes.txt", check_interval=0)
+    assert len(lines) == 0
+
+    (tmp_path / "jokes.txt").write_text("finally\n")
+    assert lines.random_line() == "finally"
+
+
+def test_store_loads_each_file_once(tmp_path):
+    (tmp_path / "jokes.txt").write_text("a joke\n")
+    store = ContentStore(tmp_path)
+
+    assert store.random_line("jokes") == "a joke"
+    assert store["jokes"] is store["jokes"]
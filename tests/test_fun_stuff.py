@@ -0,0 +1,48 @@
+"""
+test_fun_stuff.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+from types import SimpleNamespace
+
+from bot.cogs.FunStuff import FunStuff, NothingToSay
+from bot.content import ContentStore
+
+
+class Outbox:
+    def __init__(self):
+        self.replies = []
+
+    async def send(self, destination, content=None, *, error=False, **kwargs):
+        self.replies.append((content, error))
+
+
+ctx = SimpleNamespace(channel=SimpleNamespace(id=1))
+
+
+def make_cog(directory):
+    return FunStuff(SimpleNamespace(content=ContentStore(directory), outbox=Outbox()))
+
+
+async def test_joke_and_verse_reply_through_the_outbox(tmp_path):
+    (tmp_path / "jokes.txt").write_text("A joke\n")
+    (tmp_path / "verses.txt").write_text("A verse\n")
+    cog = make_cog(tmp_path)
+
+    await cog.joke_command.callback(cog, ctx)
+    await cog.verse_command.callback(cog, ctx)
+    assert cog.client.outbox.replies == [("A joke", False), ("A verse", False)]
+
+
+async def test_missing_content_is_an_error_reply(tmp_path):
+    cog = make_cog(tmp_path)
+
+    try:
+        await cog.joke_command.callback(cog, ctx)
+    except NothingToSay as e:
+        await cog.cog_command_error(ctx, e)
+
+    assert cog.client.outbox.replies == [("There's nothing to send right now, try again later", True)]
@@ -0,0 +1,73 @@
+"""
+test_history.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+from types import SimpleNamespace
+
+from bot.history import GuildIndex, PlayHistory, trigrams
+
+
+def make_index():
+    index = GuildIndex()
+    index.add("a", "Rick Astley - Never Gonna Give You Up (Official Video)", 212000, None)
+    index.add("b", "Daft Punk - Get Lucky", 248000, None)
+    index.add("c", "Daft Punk - Get Lucky (Radio Edit)", 248000, None, plays=5)
+    index.add("d", "Never Gonna Give You Up - Piano Cover of a Very Long Title Indeed", 180000, None)
+    return index
+
+
+def test_trigrams_ignore_case_punctuation_and_brackets():
+    assert trigrams("Get LUCKY!") == trigrams("get lucky (Official Video)")
+
+
+def test_search_hits_the_title_the_query_names():
+    assert make_index().search("rick astley never gonna give you up").id == "a"
+
+
+def test_search_hit_ignores_bracketed_text():
+    assert make_index().search("Rick Astley - Never Gonna Give You Up [Lyrics]").id == "a"
+
+
+def test_search_tie_goes_to_the_more_played_track():
+    # Both titles are the same once the brackets are gone
+    assert make_index().search("daft punk get lucky").id == "c"
+
+
+def test_search_misses_an_unknown_title():
+    assert make_index().search("bohemian rhapsody") is None
+
+
+def test_search_misses_a_title_much_longer_than_the_query():
+    index = GuildIndex()
+    index.add("d", "Never Gonna Give You Up - Piano Cover of a Very Long Title Indeed", 180000, None)
+    assert index.search("never gonna give you up") is None
+
+
+def test_search_misses_a_query_too_short_to_match_on():
+    assert make_index().search("up") is None
+
+
+def test_search_misses_when_too_many_trigrams_are_missing():
+    assert make_index().search("daft punk get lucky tonight") is None
+
+
+def test_plays_taken_while_an_index_is_read_are_counted_once(tmp_path):
+    history = PlayHistory(tmp_path / "history.db")
+    track = SimpleNamespace(id="t", title="Some Song", length=1000, uri=None)
+
+    history.record(1, track)
+    history.write(history.take())
+    history.record(1, track)
+    rows = history.take()
+
+    # The index is read while the second play is taken but not written yet
+    index = history.set_index(1, history.read_guild(1))
+    history.write(rows)
+    history.record(1, track)
+
+    assert index.tracks["t"].plays == 3
+    history.close()
@@ -0,0 +1,84 @@
+"""
+test_loader.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import pytest
+
+import bot.cogs.Music  # noqa: F401, so the reload checks see it was imported
+from bot.bot import Bot, CogNotReloadable
+from bot.loader import scan_cog
+
+
+def make_bot():
+    return Bot("Ultex", "ultex@example.com", "", "", eager_cogs=[])
+
+
+async def test_music_cant_be_reloaded():
+    client = make_bot()
+
+    with pytest.raises(CogNotReloadable):
+        client.reload_cogs("Music")
+
+
+async def test_a_changed_music_cog_is_skipped_when_reloading_changed_cogs(caplog):
+    client = make_bot()
+    client._loaded_mtimes["Music"] = 0
+
+    assert client.reload_cogs() == []
+    assert "Music changed but can't be reloaded" in caplog.text
+
+
+COG = '''
+from discord.ext import commands
+
+
+class Example(commands.Cog):
+    @commands.command(name="Play", aliases=["p", "PLAYNOW"])
+    async def play_command(self, ctx):
+        pass
+
+    @commands.command()
+    async def skip(self, ctx):
+        pass
+
+    def helper(self):
+        pass
+'''
+
+
+def test_scan_cog_reads_command_names_and_aliases_without_importing(tmp_path):
+    path = tmp_path / "Example.py"
+    path.write_text(COG + "raise RuntimeError('imported')\n")
+
+    info = scan_cog(path)
+    assert (info.name, info.commands, info.listeners) == ("Example", ["play", "p", "playnow", "skip"], False)
+
+
+def test_scan_cog_notices_listeners(tmp_path):
+    path = tmp_path / "Listens.py"
+    path.write_text(COG + '''
+    @commands.Cog.listener()
+    async def on_message(self, msg):
+        pass
+''')
+
+    assert scan_cog(path).listeners
+
+
+def test_every_cog_in_the_bot_can_be_scanned():
+    for cog in ("Admin", "FunStuff", "Music", "Utilities"):
+        info = scan_cog(f"bot/cogs/{cog}.py")
+        assert info.commands or info.listeners
+
+
+async def test_lazy_cogs_are_registered_by_their_commands():
+    client = Bot("Ultex", "ultex@example.com", "", "", excluded_cogs=["Admin", "Music", "Utilities"])
+    client.setup()
+
+    # FunStuff has no listeners, so it waits for its first command
+    assert client._lazy["joke"] == client._lazy["bibleverse"] == "FunStuff"
+    assert "bot.cogs.FunStuff" not in client.extensions
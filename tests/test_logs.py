@@ -0,0 +1,96 @@
+"""
+test_logs.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import json
+import logging
+import queue
+
+import pytest
+
+from bot import logs
+
+
+@pytest.fixture
+def root_logger():
+    """ Put the root and quietened loggers' levels back after start_logging changes them """
+    loggers = [logging.getLogger(), *map(logging.getLogger, logs.QUIET)]
+    levels = [logger.level for logger in loggers]
+    yield loggers[0]
+    for logger, level in zip(loggers, levels):
+        logger.setLevel(level)
+
+
+def record(name="bot.test", level=logging.INFO, msg="hello %s", args=("there",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+async def test_log_context_nests_and_is_seen_by_tasks_it_starts():
+    async def child():
+        return logs._context.get()
+
+    with logs.log_context(guild=1):
+        with logs.log_context(command="play"):
+            assert logs.task_context(asyncio.current_task()) == {"guild": 1, "command": "play"}
+            assert await asyncio.create_task(child()) == {"guild": 1, "command": "play"}
+        assert logs.task_context(asyncio.current_task()) == {"guild": 1}
+
+    assert logs.task_context(asyncio.current_task()) == {}
+    assert logs._context.get() == {}
+
+
+def test_queue_handler_formats_records_and_drops_when_behind():
+    handler = logs.ContextQueueHandler(queue.SimpleQueue(), maxsize=1)
+
+    with logs.log_context(user=5):
+        handler.handle(record())
+        handler.handle(record())
+        handler.handle(record(level=logging.WARNING))
+        handler.handle(record(level=logging.WARNING))
+
+    queued = handler.queue.get_nowait()
+    assert (queued.msg, queued.args, queued.context) == ("hello there", None, {"user": 5})
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
+
+
+def test_json_formatter_puts_context_at_the_top_level():
+    entry = record()
+    entry.context, entry.sampled = {"guild": 1}, 10
+
+    line = json.loads(logs.JsonFormatter().format(entry))
+
+    assert line["message"] == "hello there"
+    assert line["level"] == "INFO" and line["logger"] == "bot.test"
+    assert line["guild"] == 1 and line["sampled"] == 10
+
+
+def test_sample_filter_keeps_one_in_n_below_warning():
+    sample = logs.SampleFilter({"wavelink": 3})
+
+    kept = [sample.filter(record("wavelink.player")) for _ in range(6)]
+
+    assert kept == [True, False, False, True, False, False]
+    assert sample.filter(record("wavelink.player", level=logging.WARNING))
+    assert sample.filter(record("bot.cogs.Music"))
+
+
+def test_start_logging_writes_json_lines_from_a_thread(tmp_path, root_logger):
+    path = tmp_path / "logs" / "ultex.log"
+    pipeline = logs.start_logging(path, console=False)
+
+    try:
+        with logs.log_context(command="ping"):
+            logging.getLogger("bot.test").info("pong in %sms", 12)
+    finally:
+        pipeline.stop()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line["message"], line["command"]) for line in lines] == [("pong in 12ms", "ping")]
+    assert pipeline.handler not in root_logger.handlers
+    assert logging.getLogger("discord").level >= logging.WARNING
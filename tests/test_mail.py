@@ -0,0 +1,117 @@
+"""
+test_mail.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import smtplib
+import threading
+from email.mime.text import MIMEText
+
+from bot.mail import MailDispatcher
+
+
+class FakeServer:
+    """ Accepts every message, except that each address in refuse is refused
+        once with the code it maps to """
+
+    def __init__(self, refuse=None, hold=None):
+        self.refuse = dict(refuse or {})
+        self.hold = hold
+        self.delivered = []
+
+    def send_message(self, msg):
+        if self.hold is not None:
+            self.hold.wait()
+        if (code := self.refuse.pop(msg["To"], None)) is not None:
+            return {msg["To"]: (code, b"no")}
+        self.delivered.append(msg["To"])
+        return {}
+
+    def noop(self):
+        return 250, b"ok"
+
+    def quit(self):
+        pass
+
+
+class Dispatcher(MailDispatcher):
+    def __init__(self, server, **kwargs):
+        super().__init__("ultex@example.com", "", **kwargs)
+        self.server = server
+
+    def _connect(self):
+        self._server = self.server
+        return self.server
+
+
+def email(to):
+    msg = MIMEText("Hello")
+    msg["To"] = to
+    return msg
+
+
+async def test_queued_emails_are_sent_before_close_returns():
+    mail = Dispatcher(FakeServer(), batch_size=2)
+    mail.start(asyncio.get_running_loop())
+    for to in ("a@x", "b@x", "c@x"):
+        await mail.send(email(to))
+
+    await mail.close()
+    assert mail.server.delivered == ["a@x", "b@x", "c@x"]
+    assert (mail.sent, mail.failed, mail.pending) == (3, 0, 0)
+
+
+async def test_temporary_rejections_are_retried_and_permanent_ones_counted():
+    mail = Dispatcher(FakeServer(refuse={"a@x": 450, "b@x": 550}))
+    mail.start(asyncio.get_running_loop())
+    for to in ("a@x", "b@x"):
+        await mail.send(email(to))
+
+    await mail.close()
+    assert mail.server.delivered == ["a@x"]
+    assert (mail.sent, mail.failed) == (1, 1)
+
+
+async def test_close_logs_each_email_it_drops(caplog):
+    hold = threading.Event()
+    mail = Dispatcher(FakeServer(hold=hold), batch_size=1)
+    mail.start(asyncio.get_running_loop())
+    for to in ("a@x", "b@x"):
+        await mail.send(email(to))
+    await asyncio.sleep(0.01)
+
+    await mail.close(timeout=0.01)
+    hold.set()
+
+    # a@x was already on its way to the server
+    dropped = [r.getMessage() for r in caplog.records if r.name == "bot.mail"]
+    assert dropped == ["Dropped email to b@x, the mail dispatcher closed before it was sent"]
+    assert mail.failed == 1
+
+
+async def test_close_without_starting_drops_what_was_queued():
+    mail = Dispatcher(FakeServer())
+    await mail.send(email("a@x"))
+
+    await mail.close()
+    assert mail.failed == 1 and mail.server.delivered == []
+
+
+async def test_a_failed_login_isnt_retried():
+    class LoginFails(Dispatcher):
+        attempts = 0
+
+        def _connect(self):
+            self.attempts += 1
+            raise smtplib.SMTPAuthenticationError(535, b"bad password")
+
+    mail = LoginFails(FakeServer())
+    mail.start(asyncio.get_running_loop())
+    await mail.send(email("a@x"))
+
+    await mail.close()
+    assert (mail.attempts, mail.failed) == (1, 1)
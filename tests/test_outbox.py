@@ -0,0 +1,118 @@
+"""
+test_outbox.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from bot.metrics import Registry
+from bot.outbox import Outbox
+
+
+class Channel:
+    def __init__(self, id_=1, fail=False):
+        self.id = id_
+        self.fail = fail
+        self.sent = []
+
+    async def send(self, content=None, *, embed=None):
+        await asyncio.sleep(0)
+        if self.fail:
+            raise discord.HTTPException(SimpleNamespace(status=500, reason="Server Error"), "down")
+        self.sent.append(content if embed is None else ("embed", content))
+        return len(self.sent)
+
+
+def make_outbox(**kwargs):
+    global_over = asyncio.Event()
+    global_over.set()
+    return Outbox(SimpleNamespace(_global_over=global_over, _locks={}), Registry(), **kwargs)
+
+
+async def test_replies_that_pile_up_are_merged_into_one_message():
+    outbox, channel = make_outbox(window=0.05), Channel()
+
+    await outbox.send(channel, "first")
+    await asyncio.sleep(0.01)
+    for text in ("second", "third"):
+        await outbox.send(channel, text)
+    await asyncio.sleep(0.1)
+
+    assert channel.sent == ["first", "second\nthird"]
+
+
+async def test_a_reply_straight_after_a_send_waits_out_the_window():
+    outbox, channel = make_outbox(window=0.05), Channel()
+
+    await outbox.send(channel, "first")
+    await asyncio.sleep(0.01)
+    await outbox.send(channel, "second")
+    await asyncio.sleep(0)
+
+    assert channel.sent == ["first"]
+    await asyncio.sleep(0.1)
+    assert channel.sent == ["first", "second"]
+
+
+async def test_errors_and_embeds_go_ahead_on_their_own():
+    outbox, channel = make_outbox(window=0.05), Channel()
+
+    await outbox.send(channel, "first")
+    await asyncio.sleep(0.01)
+    await outbox.send(channel, "plain")
+    await outbox.send(channel, "oops", error=True)
+    await outbox.send(channel, "listing", embed=discord.Embed())
+    await asyncio.sleep(0.1)
+
+    assert channel.sent == ["first", "oops", ("embed", "listing"), "plain"]
+
+
+async def test_merged_messages_stay_under_max_length():
+    outbox, channel = make_outbox(window=0.05, max_length=10), Channel()
+
+    await outbox.send(channel, "first")
+    await asyncio.sleep(0.01)
+    for text in ("aaaa", "bbbb", "cccc"):
+        await outbox.send(channel, text)
+    await asyncio.sleep(0.2)
+
+    assert channel.sent == ["first", "aaaa\nbbbb", "cccc"]
+
+
+async def test_channels_dont_wait_on_each_other():
+    outbox, first, second = make_outbox(window=0.05), Channel(1), Channel(2)
+
+    await outbox.send(first, "a")
+    await outbox.send(second, "b")
+    await asyncio.sleep(0.01)
+
+    assert first.sent == ["a"] and second.sent == ["b"]
+
+
+async def test_wait_returns_the_message_or_raises_what_sending_did():
+    outbox = make_outbox()
+
+    assert await outbox.send(Channel(), "hello", wait=True) == 1
+    with pytest.raises(discord.HTTPException):
+        await outbox.send(Channel(2, fail=True), "hello", wait=True)
+
+
+async def test_close_drops_what_hasnt_been_sent():
+    outbox, channel = make_outbox(window=1), Channel()
+
+    await outbox.send(channel, "first")
+    await asyncio.sleep(0.01)
+    waiting = asyncio.ensure_future(outbox.send(channel, "second", wait=True))
+    await asyncio.sleep(0.01)
+    outbox.close()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert channel.sent == ["first"]
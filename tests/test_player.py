@@ -0,0 +1,65 @@
+"""
+test_player.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import wavelink
+
+from bot.cogs.Music import PLAYLIST_CHUNK, Player, PlaylistTruncated
+
+
+class FakeNode:
+    """ Keeps what the player sends to lavalink """
+
+    def __init__(self):
+        self.players = {}
+        self.sent = []
+
+    async def _send(self, **data):
+        self.sent.append(data)
+
+
+def make_player(max_tracks):
+    node = FakeNode()
+    player = Player(SimpleNamespace(transition_lead=None), 1, node)
+    player.channel_id = 10
+    node.players[1] = player
+    # Stands in for the registry's memory budget
+    player.on_resize = lambda p: p.queue.length + len(p._pending) <= max_tracks
+    return player, node
+
+
+def playlist(n):
+    return wavelink.TrackPlaylist({"playlistInfo": {"name": "Playlist"}, "tracks": [
+        {"track": f"track {i}", "info": {"title": f"Track {i}", "length": 1000, "identifier": str(i)}}
+        for i in range(n)
+    ]})
+
+
+async def test_playlist_too_big_for_the_budget_still_starts_an_idle_player():
+    player, node = make_player(max_tracks=PLAYLIST_CHUNK + 10)
+
+    with pytest.raises(PlaylistTruncated):
+        await player.add_tracks(None, playlist(PLAYLIST_CHUNK * 3))
+
+    assert player.queue.length == PLAYLIST_CHUNK
+    assert [data["op"] for data in node.sent] == ["play"]
+    assert node.sent[0]["track"] == "track 0"
+
+
+async def test_playlist_within_the_budget_is_queued_in_the_background():
+    player, node = make_player(max_tracks=PLAYLIST_CHUNK * 5)
+
+    await player.add_tracks(None, playlist(PLAYLIST_CHUNK * 3))
+    assert [data["op"] for data in node.sent] == ["play"]
+
+    while player._ingest is not None:
+        await asyncio.sleep(0)
+    assert player.queue.length == PLAYLIST_CHUNK * 3
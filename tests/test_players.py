@@ -0,0 +1,128 @@
+"""
+test_players.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from bot.players import PlayerRegistry
+
+
+class FakePlayer:
+    def __init__(self, guild_id, size, active=False):
+        self.guild_id = guild_id
+        self.size = size
+        self.active = active
+        self.last_active = 0.0
+        self.torn_down = False
+        self.node = SimpleNamespace(players={guild_id: self})
+
+    async def teardown(self):
+        self.torn_down = True
+
+
+def make_registry(*players, budget=None, idle_timeout=600):
+    evictions = []
+    registry = PlayerRegistry(lambda p: p.size, lambda p: p.active, idle_timeout=idle_timeout, budget=budget,
+                              on_evict=lambda reason, n: evictions.append((reason, n)))
+    for player in players:
+        assert registry.add(player)
+
+    return registry, evictions
+
+
+async def test_add_evicts_the_least_recently_active_idle_players_for_room():
+    first, busy, last = FakePlayer(1, 100), FakePlayer(2, 100, active=True), FakePlayer(3, 100)
+    registry, evictions = make_registry(first, busy, last, budget=300)
+
+    assert registry.add(FakePlayer(4, 50))
+    await asyncio.sleep(0)
+
+    assert first.torn_down and not last.torn_down
+    assert registry.get(1) is None and registry.memory == 250
+    assert evictions == [("budget", 1)]
+
+
+async def test_add_leaves_a_player_that_was_used_recently():
+    first, last = FakePlayer(1, 100), FakePlayer(2, 100)
+    registry, _ = make_registry(first, last, budget=200)
+
+    registry.touch(first)
+    assert registry.add(FakePlayer(3, 100))
+    assert registry.get(1) is first and registry.get(2) is None
+
+
+async def test_add_refuses_without_evicting_when_there_is_no_room():
+    idle, busy = FakePlayer(1, 100), FakePlayer(2, 100, active=True)
+    registry, evictions = make_registry(idle, busy, budget=200)
+
+    assert not registry.add(FakePlayer(3, 150))
+    assert len(registry) == 2 and evictions == []
+
+
+async def test_resize_counts_a_growing_queue_against_the_budget():
+    idle, growing = FakePlayer(1, 100), FakePlayer(2, 100)
+    registry, _ = make_registry(idle, growing, budget=300)
+
+    growing.size = 200
+    assert registry.resize(growing)
+    assert registry.memory == 300
+
+    growing.size = 400
+    assert not registry.resize(growing)
+    # The idle player wasn't evicted for room that wouldn't have been enough
+    assert registry.get(1) is idle
+
+
+async def test_resize_evicts_others_but_never_the_player_that_grew():
+    idle, growing = FakePlayer(1, 100), FakePlayer(2, 100)
+    # The grown player is the least recently active, so it would be the first to go
+    registry, _ = make_registry(growing, idle, budget=250)
+
+    growing.size = 200
+    assert registry.resize(growing)
+    assert registry.get(2) is growing and registry.get(1) is None
+
+
+async def test_players_destroyed_elsewhere_are_forgotten():
+    player = FakePlayer(1, 100)
+    registry, _ = make_registry(player)
+
+    player.node.players.clear()
+    assert registry.get(1) is None
+    assert len(registry) == 0 and registry.memory == 0
+
+
+async def test_idle_stops_at_the_first_recently_used_player():
+    old, busy, recent = FakePlayer(1, 1), FakePlayer(2, 1, active=True), FakePlayer(3, 1)
+    registry, _ = make_registry(old, busy, recent, idle_timeout=60)
+
+    old.last_active = busy.last_active = asyncio.get_running_loop().time() - 120
+
+    assert registry.idle() == [old]
+    # The busy player was counted as used, so it moved behind the recent one
+    assert list(registry) == [old, recent, busy]
+
+
+async def test_evict_idle_tears_players_down_and_counts_them():
+    old = FakePlayer(1, 10)
+    registry, evictions = make_registry(old, idle_timeout=60)
+    old.last_active -= 120
+
+    assert await registry.evict_idle() == 1
+    assert old.torn_down and len(registry) == 0 and registry.memory == 0
+    assert evictions == [("idle", 1)]
+
+
+async def test_evict_idle_recounts_footprints_that_changed_without_a_resize():
+    first, second = FakePlayer(1, 100), FakePlayer(2, 100)
+    registry, evictions = make_registry(first, second, budget=300)
+
+    second.size = 250
+    assert await registry.evict_idle() == 1
+    assert registry.get(1) is None and registry.memory == 250
+    assert evictions == [("budget", 1)]
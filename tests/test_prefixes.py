@@ -0,0 +1,46 @@
+"""
+test_prefixes.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+from bot.bot import Bot
+from bot.prefixes import PrefixStore
+
+
+def test_store_saves_and_forgets_one_guild_at_a_time(tmp_path):
+    store = PrefixStore(tmp_path / "prefixes.db")
+    store.set(1, "?")
+    store.set(2, ">")
+    store.set(1, None)
+
+    assert store.load() == {2: ">"}
+    store.close()
+
+
+def test_stores_sharing_a_file_only_change_their_own_guilds(tmp_path):
+    # Like two clusters, each with its own connection
+    first, second = PrefixStore(tmp_path / "prefixes.db"), PrefixStore(tmp_path / "prefixes.db")
+    first.set(1, "?")
+    second.set(2, ">")
+    first.set(1, "$")
+
+    assert second.load() == {1: "$", 2: ">"}
+    first.close()
+    second.close()
+
+
+async def test_bot_keeps_prefixes_across_restarts_and_skips_invalid_ones(tmp_path):
+    store = PrefixStore(tmp_path / "prefixes.db")
+    store.set(3, "bad prefix")
+    store.close()
+
+    bot = Bot("Ultex", "ultex@example.com", "", "", prefixes_path=tmp_path / "prefixes.db", eager_cogs=[])
+    bot.set_prefix(1, "?")
+    await bot.shutdown()
+
+    bot = Bot("Ultex", "ultex@example.com", "", "", prefixes_path=tmp_path / "prefixes.db", eager_cogs=[])
+    assert bot.prefixes == {1: "?"}
+    await bot.shutdown()
@@ -0,0 +1,69 @@
+"""
+test_profiler.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import time
+from collections import Counter
+
+import pytest
+
+from bot.logs import log_context
+from bot.profiler import SamplingProfiler
+
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def test_capture_samples_under_the_command_being_handled(tmp_path):
+    profiler = SamplingProfiler(tmp_path, interval=0.002)
+    capture = profiler.start(0.3)
+
+    async def play():
+        with log_context(command="play"):
+            for _ in range(20):
+                spin(0.01)
+                await asyncio.sleep(0)
+
+    await play()
+    capture = await capture
+
+    assert capture.samples > 0 and capture.tags["command play"] > 0
+    assert not profiler.running and profiler.ends_at is None
+    lines = capture.path.read_text().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == capture.samples
+    assert any(line.startswith("command play;") and "spin (test_profiler.py:" in line for line in lines)
+
+
+async def test_only_one_capture_runs_at_a_time_and_stop_ends_it_early(tmp_path):
+    profiler = SamplingProfiler(tmp_path, interval=0.002)
+    capture = profiler.start(60)
+
+    with pytest.raises(RuntimeError):
+        profiler.start(60)
+
+    await asyncio.sleep(0.05)
+    profiler.stop()
+    capture = await asyncio.wait_for(capture, 5)
+
+    assert capture.seconds < 5
+    assert capture.tags["(idle)"] > 0
+
+
+def test_write_puts_the_most_sampled_stacks_first(tmp_path):
+    profiler = SamplingProfiler(tmp_path / "profiles")
+    stacks = Counter({("(idle)", "select"): 2, ("command skip", "run", "skip"): 5, ("command skip", "run"): 1})
+
+    capture = profiler.write(stacks, 1.0, 0.01)
+
+    assert capture.path.read_text().splitlines() == ["command skip;run;skip 5", "(idle);select 2",
+                                                     "command skip;run 1"]
+    assert capture.samples == 8
+    assert capture.tags == {"command skip": 6, "(idle)": 2}
@@ -0,0 +1,81 @@
+"""
+test_queue.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import pytest
+
+from bot.cogs.Music import Queue, QueueIsEmpty, RepeatMode, TrackRecord
+
+
+def make_queue(n, title="Track {}"):
+    queue = Queue()
+    queue.add(*(TrackRecord(str(i), title.format(i), 1000) for i in range(n)))
+    return queue
+
+
+def test_move_stops_at_either_end():
+    queue = make_queue(5)
+
+    assert queue.move(2).id == "2"
+    assert queue.move(10).id == "4"
+    assert queue.move(-10).id == "0"
+
+
+def test_move_wraps_round_with_repeat_all():
+    queue = make_queue(5)
+    queue.repeat_mode = RepeatMode.ALL
+
+    assert queue.move(-1).id == "4"
+    assert queue.move(3).id == "2"
+
+
+def test_move_on_an_empty_queue_raises():
+    with pytest.raises(QueueIsEmpty):
+        Queue().move(1)
+
+
+def test_get_next_track_stops_at_the_end_unless_repeating():
+    queue = make_queue(2)
+    assert queue.get_next_track().id == "1"
+    assert queue.get_next_track() is None
+
+    queue = make_queue(2)
+    queue.repeat_mode = RepeatMode.ALL
+    queue.get_next_track()
+    assert queue.get_next_track().id == "0"
+
+
+def test_up_next_and_history_are_windows_either_side_of_the_position():
+    queue = make_queue(6)
+    queue.move(2)
+
+    assert [record.id for record in queue.up_next] == ["3", "4", "5"]
+    assert [record.id for record in queue.history] == ["0", "1"]
+    assert [record.id for record in queue.up_next[1:]] == ["4", "5"]
+    assert len(queue.up_next) == 3 and queue.up_next[-1].id == "5"
+
+
+def test_shuffle_only_moves_the_upcoming_tracks():
+    queue = make_queue(20)
+    queue.move(5)
+    queue.shuffle()
+
+    assert [record.id for record in queue.history] == [str(i) for i in range(5)]
+    assert queue.current_track.id == "5"
+    assert sorted(int(record.id) for record in queue.up_next) == list(range(6, 20))
+
+
+def test_resolve_keeps_what_the_record_doesnt_store(encode_track):
+    track = TrackRecord.from_id(encode_track("abcdefghijk", "Some Song", 1000, author="Artist")).resolve()
+
+    assert (track.title, track.length, track.author, track.identifier, track.is_stream) == \
+           ("Some Song", 1000, "Artist", "abcdefghijk", False)
+
+
+def test_resolve_a_record_that_isnt_a_lavalink_track():
+    track = TrackRecord("not a track", "Some Song", 1000).resolve()
+    assert (track.title, track.author, track.is_stream) == ("Some Song", None, False)
@@ -0,0 +1,56 @@
+"""
+test_queue_page.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import pytest
+
+from bot.cogs.Music import EMBED_FIELD_LENGTH, Queue, QueueIsEmpty, TrackRecord
+
+
+def make_queue(n, title="Track {}"):
+    queue = Queue()
+    queue.add(*(TrackRecord(str(i), title.format(i), 1000) for i in range(n)))
+    return queue
+
+
+def test_page_numbers_the_upcoming_tracks():
+    queue = make_queue(25)
+
+    number, pages, listing = queue.page(2)
+    assert (number, pages) == (2, 3)
+    assert listing.splitlines()[0] == "**11.** Track 11"
+
+
+def test_page_number_is_clamped_to_the_pages_there_are():
+    queue = make_queue(25)
+
+    assert queue.page(99)[0] == 3
+    assert queue.page(-1)[0] == 1
+
+
+def test_page_of_an_empty_queue_raises():
+    with pytest.raises(QueueIsEmpty):
+        Queue().page(1)
+
+
+def test_page_is_rebuilt_after_the_queue_changes():
+    queue = make_queue(3)
+    before = queue.page(1)[2]
+
+    queue.move(1)
+    assert queue.page(1)[2] != before
+
+
+@pytest.mark.parametrize("first", [0, 99_990])
+def test_page_fits_in_an_embed_field_however_long_the_titles_and_numbers(first):
+    queue = make_queue(first + 11, title="A very long title " * 10 + "{}")
+    queue.move(first)
+
+    for number in range(1, queue.page(1)[1] + 1):
+        listing = queue.page(number)[2]
+        assert len(listing) <= EMBED_FIELD_LENGTH
+        assert all(line.endswith("…") or line[-1].isdigit() for line in listing.splitlines())
@@ -0,0 +1,96 @@
+"""
+test_search.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import asyncio
+import contextlib
+
+from aiohttp import web
+
+from bot.search import SearchBackend
+
+
+class Apis:
+    """ Local stand-ins for Wolfram|Alpha and Wikipedia. Each answers with its
+        answer (None for no answer) after its delay in seconds """
+
+    def __init__(self, wolfram=None, wikipedia=None, wolfram_delay=0.0, wikipedia_delay=0.0):
+        self.answers = {"wolfram": wolfram, "wikipedia": wikipedia}
+        self.delays = {"wolfram": wolfram_delay, "wikipedia": wikipedia_delay}
+        self.requests = {"wolfram": 0, "wikipedia": 0}
+
+    async def wolfram(self, request):
+        await self._wait("wolfram")
+        if (answer := self.answers["wolfram"]) is None:
+            return web.json_response({"queryresult": {"success": False}})
+
+        return web.json_response({"queryresult": {"success": True, "pods": [
+            {"primary": False, "subpods": [{"plaintext": "Input"}]},
+            {"primary": True, "subpods": [{"plaintext": answer}]}
+        ]}})
+
+    async def wikipedia(self, request):
+        await self._wait("wikipedia")
+        pages = {} if self.answers["wikipedia"] is None else {"1": {"extract": self.answers["wikipedia"]}}
+        return web.json_response({"query": {"pages": pages}})
+
+    async def _wait(self, name):
+        self.requests[name] += 1
+        await asyncio.sleep(self.delays[name])
+
+
+@contextlib.asynccontextmanager
+async def serve(apis, **kwargs):
+    app = web.Application()
+    app.router.add_get("/wolfram", apis.wolfram)
+    app.router.add_get("/wikipedia", apis.wikipedia)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    backend = SearchBackend("app id", wolfram_url=f"{url}/wolfram", wikipedia_url=f"{url}/wikipedia", **kwargs)
+    try:
+        yield backend
+    finally:
+        await backend.close()
+        await runner.cleanup()
+
+
+async def test_the_first_answer_wins():
+    async with serve(Apis(wolfram="42", wikipedia="A number", wolfram_delay=0.2)) as backend:
+        assert await backend.search("meaning of life") == "A number"
+
+
+async def test_a_backend_without_an_answer_waits_for_the_other():
+    async with serve(Apis(wolfram="42", wikipedia=None, wolfram_delay=0.05)) as backend:
+        assert await backend.search("meaning of life") == "42"
+
+
+async def test_a_backend_that_times_out_counts_as_no_answer():
+    apis = Apis(wolfram="42", wikipedia="A number", wolfram_delay=0.2, wikipedia_delay=0.2)
+    async with serve(apis, wikipedia_timeout=0.05, wolfram_timeout=0.05) as backend:
+        assert await backend.search("meaning of life") is None
+
+
+async def test_answers_are_cached_by_normalised_query():
+    apis = Apis(wikipedia="A number")
+    async with serve(apis) as backend:
+        await backend.search("Meaning of  Life")
+        assert await backend.search("meaning of life") == "A number"
+
+    assert apis.requests["wikipedia"] == 1
+
+
+async def test_no_answer_isnt_cached():
+    apis = Apis()
+    async with serve(apis) as backend:
+        assert await backend.search("nothing") is None
+        assert await backend.search("nothing") is None
+
+    assert apis.requests["wikipedia"] == 2
@@ -0,0 +1,72 @@
+"""
+test_snapshots.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import base64
+
+import pytest
+
+from bot.snapshots import QueueSnapshot, SnapshotStore, decode_track, pack_tracks, unpack_tracks
+
+
+def test_decode_track_reads_what_lavalink_encoded(encode_track):
+    track = encode_track("dQw4w9WgXcQ", "Never Gonna Give You Up ✨", 212000, author="Rick Astley")
+
+    assert decode_track(track) == {
+        "title": "Never Gonna Give You Up ✨",
+        "author": "Rick Astley",
+        "length": 212000,
+        "identifier": "dQw4w9WgXcQ",
+        "isStream": False,
+        "isSeekable": True,
+        "uri": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    }
+
+
+def test_decode_track_reads_streams(encode_track):
+    info = decode_track(encode_track("live", is_stream=True))
+    assert info["isStream"] and not info["isSeekable"]
+
+
+@pytest.mark.parametrize("track", [
+    "not base64!",
+    base64.b64encode(b"\x00\x00\x00\x05abc").decode(),
+    base64.b64encode(b"\x00\x00\x00\x02\x00\x09").decode(),
+])
+def test_decode_track_rejects_anything_else(track):
+    with pytest.raises(ValueError):
+        decode_track(track)
+
+
+def test_packed_tracks_unpack_in_order(encode_track):
+    ids = [encode_track(str(i)) for i in range(3)]
+
+    assert unpack_tracks(pack_tracks(ids)) == ids
+    assert unpack_tracks(None) == []
+
+
+def snapshot(guild_id, tracks=("a", "b"), saved=None):
+    return QueueSnapshot(guild_id, "main", 10, 1, 0, 5000, False, 100, list(tracks), saved=saved)
+
+
+def test_store_saves_whole_snapshots_positions_and_removals(tmp_path):
+    store = SnapshotStore(tmp_path / "snapshots.db")
+    store.save(snapshots=[snapshot(1), snapshot(2), snapshot(3)])
+    store.save(positions=[(1, 9000, True)], removed=[2])
+
+    loaded = store.load()
+    assert sorted(loaded) == [1, 3]
+    assert (loaded[1].tracks, loaded[1].track_position, loaded[1].paused) == (["a", "b"], 9000, 1)
+    store.close()
+
+
+def test_store_leaves_out_old_snapshots(tmp_path):
+    store = SnapshotStore(tmp_path / "snapshots.db")
+    store.save(snapshots=[snapshot(1, saved=0), snapshot(2)])
+
+    assert list(store.load(max_age=60)) == [2]
+    store.close()
@@ -0,0 +1,58 @@
+"""
+test_supervisor.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+import socket
+import sys
+import threading
+
+from bot.supervisor import LavalinkSupervisor
+
+SLEEPS = (sys.executable, "-c", "import time; time.sleep(30)")
+EXITS = (sys.executable, "-c", "pass")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_supervisor(command, **kwargs):
+    return LavalinkSupervisor(command, port=free_port(), ready_timeout=0.2, **kwargs)
+
+
+def test_stop_terminates_lavalink():
+    supervisor = make_supervisor(SLEEPS)
+    supervisor.start()
+    assert supervisor.is_running
+
+    supervisor.stop()
+    supervisor._watcher.join(5)
+    assert not supervisor.is_running and not supervisor._watcher.is_alive()
+
+
+def test_nothing_is_launched_once_stopped():
+    supervisor = make_supervisor(SLEEPS)
+    supervisor.stop()
+
+    assert supervisor._launch() is None
+    assert supervisor._process is None
+
+
+def test_stop_while_restarting_leaves_nothing_running():
+    restarted = threading.Event()
+    supervisor = make_supervisor(EXITS, on_restart=restarted.set)
+    supervisor.start()
+
+    # The process exits straight away, so the watcher is forever restarting it
+    assert restarted.wait(5)
+    supervisor.stop()
+    supervisor._watcher.join(5)
+
+    assert not supervisor._watcher.is_alive()
+    assert supervisor._process.poll() is not None
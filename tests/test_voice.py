@@ -0,0 +1,65 @@
+"""
+test_voice.py
+Ultex/tests
+
+Created by Kaleb Rosborough on 18/10/2026
+Copyright © Shock9616 2021 All rights reserved
+"""
+
+from types import SimpleNamespace
+
+from bot.voice import VoiceOccupancy
+
+
+def member(bot=False):
+    return SimpleNamespace(bot=bot)
+
+
+def channel(id_, members, guild_id=1):
+    return SimpleNamespace(id=id_, guild=SimpleNamespace(id=guild_id), members=members)
+
+
+def state(voice_channel=None):
+    return SimpleNamespace(channel=voice_channel)
+
+
+def test_humans_counts_non_bot_members_once():
+    occupancy = VoiceOccupancy()
+    voice = channel(10, [member(), member(), member(bot=True)])
+
+    assert occupancy.humans(voice) == 2
+    voice.members.append(member())
+    assert occupancy.humans(voice) == 2
+    assert len(occupancy) == 1
+
+
+def test_updates_move_the_count():
+    occupancy = VoiceOccupancy()
+    voice, other = channel(10, [member()]), channel(11, [])
+    occupancy.humans(voice)
+
+    assert occupancy.update(voice, state(), state(voice)) == 2
+    assert occupancy.update(voice, state(voice), state(other)) == 1
+    assert occupancy.update(voice, state(voice), state()) == 0
+    assert occupancy.update(voice, state(other), state()) is None
+
+
+def test_untracked_or_moved_channels_are_counted_from_the_member_cache():
+    occupancy = VoiceOccupancy()
+    voice, moved = channel(10, [member()]), channel(11, [member(), member()])
+
+    assert occupancy.update(voice, state(), state(voice)) == 1
+    assert occupancy.humans(moved) == 2
+    assert occupancy.update(moved, state(moved), state()) == 1
+    assert len(occupancy) == 1
+
+
+def test_forget_stops_tracking_a_guild():
+    occupancy = VoiceOccupancy()
+    occupancy.humans(channel(10, [member()]))
+    occupancy.humans(channel(20, [], guild_id=2))
+
+    occupancy.forget(1)
+    occupancy.forget(3)
+
+    assert len(occupancy) == 1